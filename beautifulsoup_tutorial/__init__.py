@@ -1,7 +1,7 @@
 """Scrape metadata from target URL."""
 import pprint
 
-from beautifulsoup_tutorial.fetch import fetch_html_from_url
+from beautifulsoup_tutorial.fetch import default_client
 from beautifulsoup_tutorial.scrape import scrape_page_metadata
 
 from config import TARGET_URL
@@ -13,7 +13,7 @@ def init_script() -> dict:
 
     returns: dict
     """
-    resp = fetch_html_from_url(TARGET_URL)
+    resp = default_client.fetch(TARGET_URL)
     metadata = scrape_page_metadata(resp, TARGET_URL)
     pp = pprint.PrettyPrinter(indent=4, width=120, sort_dicts=False)
     pp.pprint(metadata)
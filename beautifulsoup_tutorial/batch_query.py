@@ -0,0 +1,315 @@
+"""Send prompts through the OpenAI Batch API, or a local stand-in for it."""
+import json
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from openai import OpenAI
+
+from beautifulsoup_tutorial.query_runner import QueryRunner
+
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+# Batch states after which the batch won't change anymore
+TERMINAL_STATES = ("completed", "failed", "expired", "cancelled")
+# Limits of the Batch API on one input file
+MAX_BATCH_REQUESTS = 50000
+MAX_BATCH_BYTES = 200 * 1024 * 1024
+
+
+class BatchStatus(NamedTuple):
+    """State of a batch, its output and error file ids once there are any, and the errors that failed it."""
+
+    state: str
+    output_file_id: Optional[str]
+    error_file_id: Optional[str]
+    errors: Optional[Any]
+
+
+def write_batch_files(
+    items: Iterable[Dict[str, Any]],
+    path_prefix: str,
+    model: str,
+    system_message: str,
+    temperature: float = 0,
+    max_requests: int = MAX_BATCH_REQUESTS,
+    max_bytes: int = MAX_BATCH_BYTES,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Write one chat completion request per item's `"prompt"` to batch input JSONL files of at most `max_requests`
+    requests and `max_bytes` bytes each, `<path_prefix>_<n>.jsonl`. Each file comes with
+    `<path_prefix>_<n>.items.jsonl`, holding the items by the `custom_id` of their request, so their results can be
+    matched after a restart.
+
+    :param Iterable[Dict[str, Any]] items: Items holding a `"prompt"`.
+    :param str path_prefix: Path of the batch input files, without the part number and extension.
+    :param str model: Model to query.
+    :param str system_message: System message sent before every prompt.
+    :param float temperature: Sampling temperature.
+    :param int max_requests: Max number of requests per file.
+    :param int max_bytes: Max size of a file in bytes.
+
+    :return: Iterator[Tuple[str, str]] of the paths of each input file and its items file, once it is complete
+    """
+    part = 0
+    f = items_file = None
+    count = size = 0
+    for index, item in enumerate(items):
+        body = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": item["prompt"]},
+            ],
+            "temperature": temperature,
+        }
+        custom_id = f"request-{index}"
+        request = {"custom_id": custom_id, "method": "POST", "url": CHAT_COMPLETIONS_ENDPOINT, "body": body}
+        line = (json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8")
+        if f is not None and (count >= max_requests or size + len(line) > max_bytes):
+            f.close()
+            items_file.close()
+            yield f.name, items_file.name
+            f = None
+        if f is None:
+            f = open(f"{path_prefix}_{part}.jsonl", "wb")
+            items_file = open(f"{path_prefix}_{part}.items.jsonl", "w", encoding="utf-8")
+            part += 1
+            count = size = 0
+        f.write(line)
+        items_file.write(json.dumps({"custom_id": custom_id, "item": item}, ensure_ascii=False) + "\n")
+        count += 1
+        size += len(line)
+    if f is not None:
+        f.close()
+        items_file.close()
+        yield f.name, items_file.name
+
+
+def read_batch_items(items_path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    :param str items_path: Items file written along with a batch input file by `write_batch_files`.
+
+    :return: Dict[str, Dict[str, Any]] of the items by the `custom_id` of their request
+    """
+    with open(items_path, encoding="utf-8") as f:
+        return {entry["custom_id"]: entry["item"] for entry in map(json.loads, f)}
+
+
+def parse_batch_output(text: str) -> Iterator[Tuple[str, Union[str, Exception]]]:
+    """
+    Parse a batch output JSONL file.
+
+    :param str text: Contents of the output file.
+
+    :return: Iterator[Tuple[str, Union[str, Exception]]] of (custom_id, response content or error)
+    """
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if result.get("error") or response.get("status_code") != 200:
+            error = result.get("error") or response.get("body", {}).get("error") or response
+            yield result["custom_id"], RuntimeError(f"Batch request failed: {error}")
+        else:
+            yield result["custom_id"], response["body"]["choices"][0]["message"]["content"]
+
+
+class OpenAIBatchSubmitter:
+    """Submit batch input files to the OpenAI Batch API and fetch their output."""
+
+    def __init__(self, client: OpenAI, completion_window: str = "24h"):
+        """
+        :param OpenAI client: Client for the API.
+        :param str completion_window: Time the API is given to finish a batch.
+        """
+        self.client = client
+        self.completion_window = completion_window
+
+    def submit(self, path: str) -> str:
+        """
+        Upload a batch input file and start the batch.
+
+        :param str path: Batch input JSONL file.
+
+        :return: str batch id
+        """
+        with open(path, "rb") as f:
+            input_file = self.client.files.create(file=f, purpose="batch")
+        # Through the generic request methods, which work with client versions predating `client.batches`
+        batch = self.client.post(
+            "/batches",
+            body={
+                "input_file_id": input_file.id,
+                "endpoint": CHAT_COMPLETIONS_ENDPOINT,
+                "completion_window": self.completion_window,
+            },
+            cast_to=object,
+        )
+        return batch["id"]
+
+    def status(self, batch_id: str) -> BatchStatus:
+        """
+        :param str batch_id: Batch id.
+
+        :return: BatchStatus
+        """
+        batch = self.client.get(f"/batches/{batch_id}", cast_to=object)
+        return BatchStatus(
+            batch["status"], batch.get("output_file_id"), batch.get("error_file_id"), batch.get("errors")
+        )
+
+    def output(self, file_id: str) -> str:
+        """
+        :param str file_id: Output or error file id given by `status`.
+
+        :return: str contents of the file
+        """
+        return self.client.files.content(file_id).text
+
+
+class LocalBatchSubmitter:
+    """
+    Stand-in for the Batch API that runs the requests right away with a `QueryRunner`,
+    e.g. against a local OpenAI-compatible server, and writes the output file next to the input.
+    """
+
+    def __init__(self, runner: QueryRunner):
+        """
+        :param QueryRunner runner: Runner sending the requests.
+        """
+        self.runner = runner
+
+    def submit(self, path: str) -> str:
+        with open(path, encoding="utf-8") as f:
+            requests = [json.loads(line) for line in f if line.strip()]
+        items = ({"custom_id": r["custom_id"], "prompt": r["body"]["messages"][-1]["content"]} for r in requests)
+        output_path = path + ".output"
+        with open(output_path, "w", encoding="utf-8") as f:
+            for item, response in self.runner.run(items):
+                if isinstance(response, Exception):
+                    result = {"custom_id": item["custom_id"], "response": None, "error": {"message": str(response)}}
+                else:
+                    body = {"choices": [{"message": {"role": "assistant", "content": response}}]}
+                    result = {"custom_id": item["custom_id"], "response": {"status_code": 200, "body": body}}
+                f.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return output_path
+
+    def status(self, batch_id: str) -> BatchStatus:
+        return BatchStatus("completed", batch_id, None, None)
+
+    def output(self, file_id: str) -> str:
+        with open(file_id, encoding="utf-8") as f:
+            return f.read()
+
+
+Submitter = Union[OpenAIBatchSubmitter, LocalBatchSubmitter]
+
+
+class SubmittedBatches:
+    """
+    Append-only JSONL log of the batches submitted and not collected yet, as `{"batch_id", "items"}` records
+    followed by `{"batch_id", "collected": true}` once their results are in, so a restarted run polls the
+    batches it already paid for instead of submitting them again.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param str path: Log file, created if it doesn't exist.
+        """
+        self.path = path
+        # Batch ids to the items file of their requests, in submission order
+        self._pending: Dict[str, str] = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Partly written last line of a crashed run
+                        continue
+                    if record.get("collected"):
+                        self._pending.pop(record["batch_id"], None)
+                    else:
+                        self._pending[record["batch_id"]] = record["items"]
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def pending(self) -> List[Tuple[str, str]]:
+        """
+        :return: List[Tuple[str, str]] of the batch ids not collected yet and the items files of their requests
+        """
+        return list(self._pending.items())
+
+    def _append(self, record: Dict[str, Any]):
+        os.write(self._fd, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def record_submitted(self, batch_id: str, items_path: str):
+        """
+        :param str batch_id: Batch id.
+        :param str items_path: Items file of its requests, from `write_batch_files`.
+        """
+        self._append({"batch_id": batch_id, "items": items_path})
+        self._pending[batch_id] = items_path
+
+    def record_collected(self, batch_id: str):
+        """
+        :param str batch_id: Batch id whose results were all handed out.
+        """
+        self._append({"batch_id": batch_id, "collected": True})
+        self._pending.pop(batch_id, None)
+
+    def close(self):
+        os.close(self._fd)
+
+
+def wait_for_batch(submitter: Submitter, batch_id: str, poll_interval: float = 60) -> BatchStatus:
+    """
+    Poll a batch until it is in one of `TERMINAL_STATES`.
+
+    :param submitter: Submitter the batch was started with.
+    :param str batch_id: Batch id.
+    :param float poll_interval: Seconds between status checks.
+
+    :return: BatchStatus
+    """
+    status = submitter.status(batch_id)
+    while status.state not in TERMINAL_STATES:
+        print(f"Batch {batch_id} is {status.state}. Checking again in {poll_interval} seconds")
+        time.sleep(poll_interval)
+        status = submitter.status(batch_id)
+    print(f"Batch {batch_id} {status.state}")
+    return status
+
+
+def collect_batch(
+    submitter: Submitter, batch_id: str, items_path: str, poll_interval: float = 60
+) -> Iterator[Tuple[Dict[str, Any], Union[str, Exception]]]:
+    """
+    Wait for a batch to finish and yield the results of its requests, from its output and error files.
+    Requests with neither, e.g. of a batch that failed validation or expired part way, get an error saying why.
+
+    :param submitter: Submitter the batch was started with.
+    :param str batch_id: Batch id.
+    :param str items_path: Items file of its requests, from `write_batch_files`.
+    :param float poll_interval: Seconds between status checks.
+
+    :return: Iterator[Tuple[Dict[str, Any], Union[str, Exception]]] of (item, response content or error)
+    """
+    status = wait_for_batch(submitter, batch_id, poll_interval)
+    by_id = read_batch_items(items_path)
+    for file_id in (status.output_file_id, status.error_file_id):
+        if file_id is None:
+            continue
+        for custom_id, response in parse_batch_output(submitter.output(file_id)):
+            item = by_id.pop(custom_id, None)
+            if item is not None:
+                yield item, response
+    if by_id:
+        reason = f"Batch {batch_id} ended as {status.state}"
+        if status.errors:
+            reason += f" with errors: {status.errors}"
+        for item in by_id.values():
+            yield item, RuntimeError(f"No result in batch output. {reason}")
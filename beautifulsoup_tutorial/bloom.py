@@ -0,0 +1,160 @@
+"""Compact, approximate set of strings for huge crawls, optionally persisted to disk through mmap."""
+import hashlib
+import math
+import mmap
+import os
+import struct
+from typing import Iterable, List, Optional
+
+_MAGIC = b"BLOOM001"
+# Magic, capacity, false positive rate, count, number of bits, number of hashes
+_HEADER = struct.Struct("<8sQdQQQ")
+_COUNT_OFFSET = 8 + 8 + 8
+
+
+class _BloomLayer:
+    """Fixed-size Bloom filter over a memory map, anonymous or backed by a file."""
+
+    def __init__(self, capacity: int, error_rate: float, path: Optional[str] = None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        size = _HEADER.size + (self.num_bits + 7) // 8
+        if path is None:
+            self._file = None
+            self._map = mmap.mmap(-1, size)
+        else:
+            self._file = open(path, "w+b")
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+        self._map[: _HEADER.size] = _HEADER.pack(_MAGIC, capacity, error_rate, 0, self.num_bits, self.num_hashes)
+
+    @classmethod
+    def open(cls, path: str) -> "_BloomLayer":
+        """Map a layer written before."""
+        layer = cls.__new__(cls)
+        layer._file = open(path, "r+b")
+        layer._map = mmap.mmap(layer._file.fileno(), 0)
+        magic, layer.capacity, layer.error_rate, layer.count, layer.num_bits, layer.num_hashes = _HEADER.unpack(
+            layer._map[: _HEADER.size]
+        )
+        if magic != _MAGIC:
+            raise ValueError(f"Not a Bloom filter file: {path}")
+        return layer
+
+    def _positions(self, digest: bytes) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        h1, h2 = struct.unpack("<QQ", digest)
+        for i in range(self.num_hashes):
+            yield _HEADER.size * 8 + (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, digest: bytes) -> bool:
+        data = self._map
+        return all(data[position >> 3] & (1 << (position & 7)) for position in self._positions(digest))
+
+    def add(self, digest: bytes):
+        data = self._map
+        for position in self._positions(digest):
+            data[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+        self._map[_COUNT_OFFSET : _COUNT_OFFSET + 8] = struct.pack("<Q", self.count)
+
+    def flush(self):
+        if self._file is not None:
+            self._map.flush()
+
+    def close(self):
+        self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+
+class ScalableBloomFilter:
+    """
+    Set of strings taking a couple of bytes per item whatever their length, at the cost of
+    occasional false positives: an item never added may be reported as present, at a rate
+    of at most `error_rate`. Items added are always reported as present.
+
+    Capacity isn't fixed up front: once a layer is full, a new one twice as large and with
+    half the false positive rate is added, so the overall rate stays under `error_rate`.
+    With a `path`, each layer is a file `<path>.<n>` mapped into memory, so the pages of the
+    filter are left to the OS and the filter is reopened as it was by the next run.
+
+    Supports the `add`, `update`, `in` and `len` operations of a set, to stand in for one.
+    """
+
+    def __init__(
+        self, path: Optional[str] = None, capacity: int = 1000000, error_rate: float = 0.001, reset: bool = False
+    ):
+        """
+        :param Optional[str] path: Prefix of the layer files. Kept in memory only if None.
+        :param int capacity: Number of items of the first layer.
+        :param float error_rate: Max false positive rate of the whole filter.
+        :param bool reset: Delete layers left by a previous run instead of reopening them.
+        """
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._layers: List[_BloomLayer] = []
+        if path is not None:
+            index = 0
+            while os.path.exists(self._layer_path(index)):
+                if reset:
+                    os.remove(self._layer_path(index))
+                else:
+                    self._layers.append(_BloomLayer.open(self._layer_path(index)))
+                index += 1
+
+    def _layer_path(self, index: int) -> str:
+        return f"{self.path}.{index}"
+
+    def _add_layer(self):
+        index = len(self._layers)
+        # Halve the false positive rate of each new layer, so the rates sum to at most error_rate
+        error_rate = self.error_rate / 2 ** (index + 1)
+        path = self._layer_path(index) if self.path is not None else None
+        self._layers.append(_BloomLayer(self.capacity * 2**index, error_rate, path))
+
+    @staticmethod
+    def _digest(item: str) -> bytes:
+        return hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+
+    def __contains__(self, item: str) -> bool:
+        digest = self._digest(item)
+        return any(digest in layer for layer in self._layers)
+
+    def __len__(self) -> int:
+        return sum(layer.count for layer in self._layers)
+
+    def add(self, item: str) -> bool:
+        """
+        Add an item, unless it is (or looks) already present.
+
+        :param str item: Item to add.
+
+        :return: bool whether the item was added
+        """
+        digest = self._digest(item)
+        if any(digest in layer for layer in self._layers):
+            return False
+        if not self._layers or self._layers[-1].count >= self._layers[-1].capacity:
+            self._add_layer()
+        self._layers[-1].add(digest)
+        return True
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def flush(self):
+        """Write the mapped layers to their files."""
+        for layer in self._layers:
+            layer.flush()
+
+    def close(self):
+        self.flush()
+        for layer in self._layers:
+            layer.close()
+        self._layers = []
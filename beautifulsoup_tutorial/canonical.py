@@ -0,0 +1,132 @@
+"""Canonical forms of Wikipedia URLs and page titles, so variants of the same page are recognized as one."""
+import re
+from typing import Dict, Iterable, MutableSet, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit, urlunsplit
+
+BASE_URL = "https://en.wikipedia.org"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def canonical_title(title: str) -> str:
+    """
+    Normalize a page title the way MediaWiki does: underscores read as spaces, runs of
+    whitespace collapsed, the first letter capitalized, and any "#section" fragment dropped.
+
+    :param str title: Page title or link target.
+
+    :return: str
+    """
+    title = _WHITESPACE.sub(" ", title.partition("#")[0].replace("_", " ")).strip()
+    return title[:1].upper() + title[1:]
+
+
+def canonical_url(url: str, base_url: str = BASE_URL) -> str:
+    """
+    Normalize a page URL: relative and protocol-relative URLs are made absolute, the scheme
+    is https, the host is lowercased and mobile hosts map to the desktop site, the fragment is
+    dropped, and the title in "/wiki/<title>" or "/w/index.php?title=<title>" is decoded and
+    normalized with `canonical_title`, written with underscores.
+
+    :param str url: Absolute or relative page URL.
+    :param str base_url: Site relative URLs are resolved against.
+
+    :return: str
+    """
+    url = url.strip().partition("#")[0]
+    if url.startswith("//"):
+        url = "https:" + url
+    elif url.startswith("/"):
+        url = base_url + url
+    parts = urlsplit(url)
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme
+    host = parts.netloc.lower().replace(".m.wikipedia.org", ".wikipedia.org")
+    path, query = parts.path, parts.query
+    if path == "/w/index.php":
+        params = parse_qsl(query)
+        # Only a plain view of a page is the same as its /wiki/ URL
+        if len(params) == 1 and params[0][0] == "title":
+            path, query = "/wiki/" + params[0][1], ""
+    if path.startswith("/wiki/"):
+        path = "/wiki/" + canonical_title(unquote(path[6:])).replace(" ", "_")
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class CanonicalIndex:
+    """
+    Hash index of the canonical URLs and titles of seen pages, with the redirects learned
+    from loading them, so checking whether any variant of a page was seen is O(1).
+
+    URLs and titles are kept in sets by default. Any store with the `add`, `update`, `in` and
+    `len` operations of a set can be given instead, e.g. a `ScalableBloomFilter` for huge crawls,
+    along with `max_aliases` so the redirects, kept as full strings, don't grow without bound.
+    """
+
+    def __init__(
+        self,
+        urls: Iterable[str] = (),
+        titles: Iterable[str] = (),
+        url_set: Optional[MutableSet[str]] = None,
+        title_set: Optional[MutableSet[str]] = None,
+        max_aliases: Optional[int] = None,
+    ):
+        """
+        :param Iterable[str] urls: Seen page URLs, in any form.
+        :param Iterable[str] titles: Seen page titles, in any form.
+        :param Optional[MutableSet[str]] url_set: Store to keep the canonical URLs in. Defaults to a set.
+        :param Optional[MutableSet[str]] title_set: Store to keep the canonical titles in. Defaults to a set.
+        :param Optional[int] max_aliases: Max number of redirects remembered, the oldest being forgotten first.
+        0 remembers none. No limit if None.
+        """
+        self.urls: MutableSet[str] = url_set if url_set is not None else set()
+        self.titles: MutableSet[str] = title_set if title_set is not None else set()
+        self.urls.update(canonical_url(url) for url in urls)
+        self.titles.update(canonical_title(title) for title in titles)
+        # Canonical title a page was requested as, to the canonical title it resolved to
+        self.aliases: Dict[str, str] = {}
+        self.max_aliases = max_aliases
+
+    def resolve(self, title: str) -> str:
+        """
+        Canonical title of the page a title leads to, following learned redirects.
+
+        :param str title: Page title.
+
+        :return: str
+        """
+        title = canonical_title(title)
+        return self.aliases.get(title, title)
+
+    def add(self, url: Optional[str] = None, title: Optional[str] = None, resolved_title: Optional[str] = None):
+        """
+        Record a seen page.
+
+        :param Optional[str] url: URL the page resolved to.
+        :param Optional[str] title: Name the page was requested with.
+        :param Optional[str] resolved_title: Title the page was found under, when it differs from `title`
+        because of a redirect or normalization.
+        """
+        if url is not None:
+            self.urls.add(canonical_url(url))
+        if title is not None:
+            self.titles.add(canonical_title(title))
+        if resolved_title is not None:
+            resolved = canonical_title(resolved_title)
+            self.titles.add(resolved)
+            if title is not None and canonical_title(title) != resolved:
+                self._add_alias(canonical_title(title), resolved)
+
+    def _add_alias(self, title: str, resolved: str):
+        if self.max_aliases is not None:
+            if self.max_aliases <= 0:
+                return
+            while len(self.aliases) >= self.max_aliases:
+                # Dicts keep insertion order, so the first key is the oldest redirect
+                del self.aliases[next(iter(self.aliases))]
+        self.aliases[title] = resolved
+
+    def has_url(self, url: str) -> bool:
+        return canonical_url(url) in self.urls
+
+    def has_title(self, title: str) -> bool:
+        return self.resolve(title) in self.titles
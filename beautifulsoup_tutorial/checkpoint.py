@@ -0,0 +1,162 @@
+"""Incremental on-disk checkpoint of crawl state."""
+import ast
+import sqlite3
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+class CrawlCheckpoint:
+    """
+    Append-only SQLite store of seen urls, seen page titles and the pending frontier.
+
+    Every write is committed as it happens, so a crashed crawl can be resumed from
+    exactly where it stopped instead of from the last clean exit.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param str path: SQLite database file, created if it doesn't exist.
+        """
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # WAL keeps each commit to an append, instead of rewriting pages of the database
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS seen_urls (url TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS seen_titles (title TEXT PRIMARY KEY) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS frontier (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT UNIQUE, depth INTEGER, score INTEGER
+            );
+            """
+        )
+        # Checkpoints written before depths were recorded
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(frontier)")}
+        if "depth" not in columns:
+            self.conn.execute("ALTER TABLE frontier ADD COLUMN depth INTEGER")
+            self.conn.execute("ALTER TABLE frontier ADD COLUMN score INTEGER")
+        self.conn.commit()
+
+    def reset(self):
+        """Forget all recorded state, to start a fresh crawl in the same file."""
+        with self.conn:
+            self.conn.execute("DELETE FROM seen_urls")
+            self.conn.execute("DELETE FROM seen_titles")
+            self.conn.execute("DELETE FROM frontier")
+
+    def record_seen(self, url: str, title: str):
+        """
+        Record a crawled page.
+
+        :param str url: URL the page resolved to.
+        :param str title: Name the page was requested with.
+        """
+        with self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO seen_urls VALUES (?)", (url,))
+            self.conn.execute("INSERT OR IGNORE INTO seen_titles VALUES (?)", (title,))
+
+    def record_seen_many(self, urls: Iterable[str] = (), titles: Iterable[str] = ()):
+        """
+        Record previously crawled urls and titles in one transaction, e.g. when importing old state.
+
+        :param Iterable[str] urls: Seen urls.
+        :param Iterable[str] titles: Seen page titles.
+        """
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO seen_urls VALUES (?)", ((url,) for url in urls))
+            self.conn.executemany("INSERT OR IGNORE INTO seen_titles VALUES (?)", ((title,) for title in titles))
+
+    def record_queued(self, names: List[str], depth: Optional[int] = None, parent_score: Optional[int] = None):
+        """
+        Append page names to the pending frontier.
+
+        :param List[str] names: Newly queued page names, in queue order.
+        :param Optional[int] depth: Levels of the pages below the start pages, if tracked.
+        :param Optional[int] parent_score: Keyword score of the page linking to them, if tracked.
+        """
+        if names:
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO frontier (name, depth, score) VALUES (?, ?, ?)",
+                    ((name, depth, parent_score) for name in names),
+                )
+
+    def record_done(self, name: str, url: Optional[str] = None, titles: Iterable[str] = ()):
+        """
+        Remove a page name from the pending frontier once it has been processed, recording the page as seen
+        in the same transaction, so a crash leaves it either pending and unseen or done and seen.
+
+        :param str name: Page name.
+        :param Optional[str] url: URL the page resolved to, if it was crawled.
+        :param Iterable[str] titles: Titles to record as seen along with it.
+        """
+        with self.conn:
+            if url is not None:
+                self.conn.execute("INSERT OR IGNORE INTO seen_urls VALUES (?)", (url,))
+            self.conn.executemany("INSERT OR IGNORE INTO seen_titles VALUES (?)", ((title,) for title in titles))
+            self.conn.execute("DELETE FROM frontier WHERE name = ?", (name,))
+
+    def seen_urls(self) -> Iterator[str]:
+        return (row[0] for row in self.conn.execute("SELECT url FROM seen_urls"))
+
+    def seen_titles(self) -> Iterator[str]:
+        return (row[0] for row in self.conn.execute("SELECT title FROM seen_titles"))
+
+    def pending(self) -> List[str]:
+        """
+        Return the pending frontier in queue order.
+
+        :return: List[str]
+        """
+        return [row[0] for row in self.conn.execute("SELECT name FROM frontier ORDER BY seq")]
+
+    def pending_entries(self) -> List[Tuple[str, Optional[int], Optional[int]]]:
+        """
+        Return the pending frontier in queue order, with the depth and parent score each name was queued with.
+
+        :return: List[Tuple[str, Optional[int], Optional[int]]]
+        """
+        return self.conn.execute("SELECT name, depth, score FROM frontier ORDER BY seq").fetchall()
+
+    def close(self):
+        self.conn.close()
+
+
+def is_checkpoint_file(path: str) -> bool:
+    """
+    Check whether a file is a SQLite checkpoint rather than a legacy text dump.
+
+    :param str path: File path.
+
+    :return: bool
+    """
+    with open(path, "rb") as f:
+        return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+
+def load_seen(path: str, kind: str) -> List[str]:
+    """
+    Load seen urls or page titles from a checkpoint, or from a legacy `seen_urls.txt`/
+    `seen_page_titles.txt` file holding the `str()` of a list or set.
+
+    :param str path: Checkpoint or legacy text file.
+    :param str kind: Either "urls" or "titles".
+
+    :return: List[str]
+    """
+    if is_checkpoint_file(path):
+        checkpoint = CrawlCheckpoint(path)
+        seen = list(checkpoint.seen_urls() if kind == "urls" else checkpoint.seen_titles())
+        checkpoint.close()
+        return seen
+    with open(path, "r") as f:
+        line = f.readline()
+    try:
+        return list(ast.literal_eval(line.strip()))
+    except (ValueError, SyntaxError):
+        # Truncated dump: fall back to splitting on commas between the brackets
+        start = line.find("[") + 1 if line.find("[") != -1 else 0
+        end = line.find("]") if line.find("]") != -1 else len(line)
+        return [x.replace("'", "").strip() for x in line[start:end].split(",")]
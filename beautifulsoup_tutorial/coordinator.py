@@ -0,0 +1,333 @@
+"""Shared frontier and seen-set for a crawl split between several worker processes or machines."""
+import hmac
+import json
+import sqlite3
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, List, Optional, Tuple, Union
+
+import requests
+
+from beautifulsoup_tutorial.canonical import canonical_title, canonical_url
+
+# Header carrying the token shared by a `CoordinatorServer` and its workers
+TOKEN_HEADER = "X-Coordinator-Token"
+
+# States of a page in the coordinator
+QUEUED = 0
+TAKEN = 1
+DONE = 2
+
+
+def partition_of(title: str, num_partitions: int) -> int:
+    """
+    Worker owning a page, by a stable hash of its canonical title, so every worker agrees on it.
+
+    :param str title: Page title, in any form.
+    :param int num_partitions: Number of workers.
+
+    :return: int
+    """
+    return zlib.crc32(canonical_title(title).encode("utf-8")) % num_partitions
+
+
+class SQLiteCoordinator:
+    """
+    Frontier and seen-set shared by the workers of a crawl through one SQLite database.
+
+    Pages are queued once, by canonical title, into the partition of the worker that owns
+    them, along with their BFS depth. Each worker takes the pages of its own partition in
+    the order they were queued and marks them done once their neighbors are queued, so the
+    crawl is over when no page is queued or taken anywhere. SQLite's file locking serializes
+    the workers, which makes this backend fit for several processes on one machine, and the
+    backing store of `CoordinatorServer` for workers on other machines.
+    """
+
+    def __init__(self, path: str, num_partitions: int, timeout: float = 60):
+        """
+        :param str path: SQLite database file, created if it doesn't exist.
+        :param int num_partitions: Number of workers. Must be the same for every worker and run.
+        :param float timeout: Seconds to wait for another worker's lock.
+        """
+        self.path = path
+        self.num_partitions = num_partitions
+        self.conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS pages (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                title TEXT UNIQUE,
+                name TEXT,
+                partition INTEGER,
+                depth INTEGER,
+                state INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS pages_by_partition ON pages (partition, state, seq);
+            CREATE INDEX IF NOT EXISTS pages_by_state ON pages (state);
+            CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, title TEXT) WITHOUT ROWID;
+            """
+        )
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO meta VALUES ('num_partitions', ?)", (str(num_partitions),))
+            (stored,) = self.conn.execute("SELECT value FROM meta WHERE key = 'num_partitions'").fetchone()
+        if int(stored) != num_partitions:
+            raise ValueError(f"Coordinator {path} was started with {stored} partitions, not {num_partitions}")
+
+    def push(self, names: Iterable[str], depth: int) -> int:
+        """
+        Queue page names for the workers owning them, unless they were ever queued or seen.
+
+        :param Iterable[str] names: Page names.
+        :param int depth: BFS depth of the pages.
+
+        :return: int number of names newly queued
+        """
+        rows = [(canonical_title(name), name, partition_of(name, self.num_partitions), depth) for name in names]
+        with self._lock, self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO pages (title, name, partition, depth, state) VALUES (?, ?, ?, ?, {QUEUED})",
+                rows,
+            )
+            return self.conn.total_changes - before
+
+    def unknown(self, names: Iterable[str]) -> List[str]:
+        """
+        Keep the page names no worker has queued or seen yet, e.g. to only check those for relevance.
+
+        :param Iterable[str] names: Page names.
+
+        :return: List[str] in their original order
+        """
+        names = list(names)
+        titles = [canonical_title(name) for name in names]
+        known = set()
+        with self._lock:
+            # Chunked under SQLite's limit on the number of parameters of a query
+            for start in range(0, len(titles), 500):
+                chunk = titles[start : start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self.conn.execute(f"SELECT title FROM pages WHERE title IN ({placeholders})", chunk)
+                known.update(row[0] for row in rows)
+        return [name for name, title in zip(names, titles) if title not in known]
+
+    def pop(self, partition: int, n: int = 1) -> List[Tuple[str, int]]:
+        """
+        Take the oldest queued pages of a partition.
+
+        :param int partition: Partition of the worker.
+        :param int n: Max number of pages.
+
+        :return: List[Tuple[str, int]] of page names and depths
+        """
+        # One statement, so no other process takes the same pages between the lookup and the update
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                f"""
+                UPDATE pages SET state = {TAKEN} WHERE seq IN (
+                    SELECT seq FROM pages WHERE partition = ? AND state = {QUEUED} ORDER BY seq LIMIT ?
+                ) RETURNING seq, name, depth
+                """,
+                (partition, n),
+            ).fetchall()
+        return [(name, depth) for _, name, depth in sorted(rows)]
+
+    def requeue(self, partition: int) -> int:
+        """
+        Put back the pages a partition's worker took but didn't finish, e.g. before it crashed.
+
+        :param int partition: Partition of the worker.
+
+        :return: int number of pages put back
+        """
+        with self._lock, self.conn:
+            return self.conn.execute(
+                f"UPDATE pages SET state = {QUEUED} WHERE partition = ? AND state = {TAKEN}", (partition,)
+            ).rowcount
+
+    def claim(self, url: str, name: str, titles: Iterable[str] = ()) -> bool:
+        """
+        Record a loaded page, so no other worker writes it again under another name.
+        The page stays claimed by the name it was taken under, so if its worker dies before it is done
+        and the page is requeued, the page can be claimed again under that name and written.
+
+        :param str url: URL the page resolved to.
+        :param str name: Page name it was taken under, as returned by `pop`.
+        :param Iterable[str] titles: Titles the page is known under, e.g. the one it redirected to, recorded as seen.
+
+        :return: bool whether the page wasn't claimed before under another name
+        """
+        title = canonical_title(name)
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO urls VALUES (?, ?)", (canonical_url(url), title))
+            (owner,) = self.conn.execute("SELECT title FROM urls WHERE url = ?", (canonical_url(url),)).fetchone()
+            rows = [(canonical_title(t), t, partition_of(t, self.num_partitions)) for t in titles if t]
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO pages (title, name, partition, depth, state) VALUES (?, ?, ?, NULL, {DONE})",
+                rows,
+            )
+            return owner == title
+
+    def done(self, names: Iterable[str]):
+        """
+        Mark taken pages as finished. Their neighbors must be queued first, so the crawl doesn't look over early.
+
+        :param Iterable[str] names: Page names as returned by `pop`.
+        """
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"UPDATE pages SET state = {DONE} WHERE title = ?", [(canonical_title(name),) for name in names]
+            )
+
+    def finished(self) -> bool:
+        """
+        Whether no page is queued or being crawled by any worker.
+
+        :return: bool
+        """
+        with self._lock:
+            row = self.conn.execute(f"SELECT 1 FROM pages WHERE state IN ({QUEUED}, {TAKEN}) LIMIT 1").fetchone()
+        return row is None
+
+    def close(self):
+        self.conn.close()
+
+
+class HttpCoordinator:
+    """Client for a coordinator served by `CoordinatorServer`, with the same methods as `SQLiteCoordinator`."""
+
+    def __init__(self, url: str, timeout: float = 60, token: Optional[str] = None):
+        """
+        :param str url: Base URL of the server, e.g. "http://crawl-host:8700".
+        :param float timeout: Seconds to wait for a response.
+        :param Optional[str] token: Token the server was started with, if any.
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token is not None:
+            self.session.headers[TOKEN_HEADER] = token
+        self.num_partitions = self._call("num_partitions")
+
+    def _call(self, method: str, **params):
+        response = self.session.post(f"{self.url}/{method}", json=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()["result"]
+
+    def push(self, names: Iterable[str], depth: int) -> int:
+        return self._call("push", names=list(names), depth=depth)
+
+    def unknown(self, names: Iterable[str]) -> List[str]:
+        return self._call("unknown", names=list(names))
+
+    def pop(self, partition: int, n: int = 1) -> List[Tuple[str, int]]:
+        return [tuple(page) for page in self._call("pop", partition=partition, n=n)]
+
+    def requeue(self, partition: int) -> int:
+        return self._call("requeue", partition=partition)
+
+    def claim(self, url: str, name: str, titles: Iterable[str] = ()) -> bool:
+        return self._call("claim", url=url, name=name, titles=list(titles))
+
+    def done(self, names: Iterable[str]):
+        self._call("done", names=list(names))
+
+    def finished(self) -> bool:
+        return self._call("finished")
+
+    def close(self):
+        self.session.close()
+
+
+Coordinator = Union[SQLiteCoordinator, HttpCoordinator]
+
+# Methods of the coordinator the server exposes
+_SERVED_METHODS = ("push", "unknown", "pop", "requeue", "claim", "done", "finished")
+
+
+class CoordinatorServer(ThreadingHTTPServer):
+    """
+    Serve a `SQLiteCoordinator` over HTTP to workers on other machines, one JSON `POST /<method>`
+    per call, answered with `{"result": ...}`.
+
+    Only local workers can connect by default. When listening on other interfaces, give a
+    `token`: requests without it in their `X-Coordinator-Token` header are then refused.
+    """
+
+    def __init__(
+        self, coordinator: SQLiteCoordinator, host: str = "127.0.0.1", port: int = 8700, token: Optional[str] = None
+    ):
+        """
+        :param SQLiteCoordinator coordinator: Coordinator to serve.
+        :param str host: Interface to listen on.
+        :param int port: Port to listen on.
+        :param Optional[str] token: Token the workers must send. Requests aren't checked if None.
+        """
+        self.coordinator = coordinator
+        self.token = token
+        super().__init__((host, port), _CoordinatorHandler)
+
+
+class _CoordinatorHandler(BaseHTTPRequestHandler):
+    server: CoordinatorServer
+
+    def do_POST(self):
+        token = self.server.token
+        if token is not None and not hmac.compare_digest(self.headers.get(TOKEN_HEADER, ""), token):
+            self.send_error(401, "Missing or wrong coordinator token")
+            return
+        method = self.path.strip("/")
+        if method != "num_partitions" and method not in _SERVED_METHODS:
+            self.send_error(404, f"Unknown coordinator method: {method}")
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if method == "num_partitions":
+                result = self.server.coordinator.num_partitions
+            else:
+                result = getattr(self.server.coordinator, method)(**params)
+        except (ValueError, KeyError, TypeError) as e:
+            # Malformed JSON, or parameters that don't fit the method
+            self.send_error(400, str(e))
+            return
+        except sqlite3.Error as e:
+            self.send_error(500, str(e))
+            return
+        body = json.dumps({"result": result}, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        # Keep the console for the crawl output
+        pass
+
+
+def open_coordinator(location: str, num_partitions: Optional[int] = None, token: Optional[str] = None) -> Coordinator:
+    """
+    Open a coordinator from a SQLite file path, or connect to a server from its http(s) URL.
+
+    :param str location: SQLite file, or URL of a `CoordinatorServer`.
+    :param Optional[int] num_partitions: Number of workers, required for a SQLite file and checked against the server.
+    :param Optional[str] token: Token the server was started with, if any.
+
+    :return: Coordinator
+    """
+    if location.startswith(("http://", "https://")):
+        coordinator = HttpCoordinator(location, token=token)
+        if num_partitions is not None and coordinator.num_partitions != num_partitions:
+            raise ValueError(
+                f"Coordinator {location} has {coordinator.num_partitions} partitions, not {num_partitions}"
+            )
+        return coordinator
+    if num_partitions is None:
+        raise ValueError("The number of partitions is needed to open a SQLite coordinator")
+    return SQLiteCoordinator(location, num_partitions)
@@ -0,0 +1,133 @@
+"""Sinks for the scraped article sections: one text file per article, or sharded JSONL."""
+import glob
+import gzip
+import json
+import os
+from typing import Iterable, Tuple, Union
+
+SHARD_PREFIX = "shard-"
+INDEX_NAME = "index.jsonl"
+
+
+class TextCorpusWriter:
+    """
+    Write each article to its own `<title>.txt` under `data_path`, one "header path<TAB>description" line per section.
+    An article whose file already exists gets a `_SeenUrls<N>` suffix instead of overwriting it.
+    """
+
+    def __init__(self, data_path: str):
+        """
+        :param str data_path: Directory to write the article files to.
+        """
+        self.data_path = data_path
+
+    def write_article(self, title: str, url: str, sections: Iterable[Tuple[str, str]], seen_count: int = 0) -> int:
+        """
+        Write the sections of one article.
+
+        :param str title: Article title.
+        :param str url: Article URL.
+        :param Iterable[Tuple[str, str]] sections: `(header_path, description)` records.
+        :param int seen_count: Number of urls seen so far, used to name a duplicate title's file.
+
+        :return: int number of sections written
+        """
+        # Replace spaces in article with underscore, replace / with hyphen
+        article_path = os.path.join(self.data_path, title.replace(" ", "_").replace("/", "-"))
+        if os.path.exists(article_path + ".txt"):
+            article_path += "_SeenUrls" + str(seen_count)
+        num_sections = 0
+        with open(article_path + ".txt", "w") as writer:
+            for header_path, description in sections:
+                writer.write(header_path + "\t" + description + "\n")
+                num_sections += 1
+        return num_sections
+
+    def close(self):
+        pass
+
+
+class ShardedCorpusWriter:
+    """
+    Append `{"title", "url", "header_path", "description"}` records to JSONL shards in `directory`.
+
+    A new shard is started once the current one holds `max_shard_bytes` of (uncompressed)
+    records; articles are never split across shards. Every article also gets a line in
+    `index.jsonl` with its shard and the byte offset and length of its records in the
+    uncompressed shard, so readers can seek straight to it. Reopening the directory adds
+    new shards after the existing ones.
+    """
+
+    def __init__(self, directory: str, max_shard_bytes: int = 256 * 1024 * 1024, compress: bool = False):
+        """
+        :param str directory: Directory to write the shards and index to, created if it doesn't exist.
+        :param int max_shard_bytes: Uncompressed size at which a new shard is started.
+        :param bool compress: Gzip the shards.
+        """
+        self.directory = directory
+        self.max_shard_bytes = max_shard_bytes
+        self.compress = compress
+        os.makedirs(directory, exist_ok=True)
+        self._next_shard = len(glob.glob(os.path.join(directory, SHARD_PREFIX + "*")))
+        self._index = open(os.path.join(directory, INDEX_NAME), "a", encoding="utf-8")
+        self._shard = None
+        self._shard_name = None
+        self._shard_bytes = 0
+
+    def _open_shard(self):
+        if self._shard is not None:
+            self._shard.close()
+        self._shard_name = f"{SHARD_PREFIX}{self._next_shard:05d}.jsonl" + (".gz" if self.compress else "")
+        path = os.path.join(self.directory, self._shard_name)
+        self._shard = gzip.open(path, "wb") if self.compress else open(path, "wb")
+        self._shard_bytes = 0
+        self._next_shard += 1
+
+    def write_article(self, title: str, url: str, sections: Iterable[Tuple[str, str]], seen_count: int = 0) -> int:
+        """
+        Append the sections of one article.
+
+        :param str title: Article title.
+        :param str url: Article URL.
+        :param Iterable[Tuple[str, str]] sections: `(header_path, description)` records.
+        :param int seen_count: Unused, duplicate titles are told apart by url in the index.
+
+        :return: int number of sections written
+        """
+        data = b"".join(
+            json.dumps(
+                {"title": title, "url": url, "header_path": header_path, "description": description},
+                ensure_ascii=False,
+            ).encode("utf-8")
+            + b"\n"
+            for header_path, description in sections
+        )
+        if self._shard is None or (self._shard_bytes and self._shard_bytes + len(data) > self.max_shard_bytes):
+            self._open_shard()
+        offset = self._shard_bytes
+        self._shard.write(data)
+        self._shard_bytes += len(data)
+        num_sections = data.count(b"\n")
+        entry = {
+            "title": title,
+            "url": url,
+            "shard": self._shard_name,
+            "offset": offset,
+            "length": len(data),
+            "records": num_sections,
+        }
+        self._index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        # Flush each article so a crash never leaves an index line pointing past the shard data
+        self._shard.flush()
+        self._index.flush()
+        return num_sections
+
+    def close(self):
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+        self._index.close()
+
+
+# Either sink, as taken by the crawlers
+CorpusWriter = Union[TextCorpusWriter, ShardedCorpusWriter]
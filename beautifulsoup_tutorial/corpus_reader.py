@@ -0,0 +1,148 @@
+"""Stream the section records of a scraped corpus, written as text files or JSONL shards."""
+import gzip
+import json
+import mmap
+import os
+import zlib
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from beautifulsoup_tutorial.corpus import SHARD_PREFIX
+
+
+class CorpusRecord(NamedTuple):
+    """One section of an article."""
+
+    file: str  # File the record was read from, relative to the corpus directory
+    line: int  # Line of the record in the file
+    section: int  # Position of the section in its article, 0 for the text before the first heading
+    title: str
+    url: Optional[str]  # Only known for shards
+    header_path: str
+    description: str
+
+
+def parse_line(line: str) -> Tuple[str, str]:
+    """
+    Split a "header path<TAB>description" line of an article file. Only the first tab separates
+    the two, so descriptions containing tabs are kept whole.
+
+    :param str line: Line of an article file.
+
+    :return: Tuple[str, str] of the header path and description
+    """
+    header_path, _, description = line.rstrip("\r\n").partition("\t")
+    return header_path, description
+
+
+def list_corpus_files(path: str) -> List[str]:
+    """
+    List the article text files, or the JSONL shards if there are any, in a corpus directory, by name.
+
+    :param str path: Corpus directory.
+
+    :return: List[str]
+    """
+    with os.scandir(path) as entries:
+        names = [entry.name for entry in entries if entry.is_file()]
+    shards = [name for name in names if name.startswith(SHARD_PREFIX)]
+    return sorted(shards or [name for name in names if name.endswith(".txt")])
+
+
+def partition_files(files: Iterable[str], partition: int = 0, num_partitions: int = 1) -> List[str]:
+    """
+    Keep the files belonging to one partition, so several processes can split a corpus between them.
+    Files are assigned by a stable hash of their name, so every process agrees on the split.
+
+    :param Iterable[str] files: File names.
+    :param int partition: Partition to keep, from 0 to `num_partitions - 1`.
+    :param int num_partitions: Number of partitions.
+
+    :return: List[str]
+    """
+    return [file for file in files if zlib.crc32(file.encode("utf-8")) % num_partitions == partition]
+
+
+def _iter_lines(path: str, use_mmap: bool) -> Iterator[str]:
+    if path.endswith(".gz"):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            yield from f
+        return
+    if use_mmap and os.path.getsize(path) > 0:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for line in iter(mapped.readline, b""):
+                yield line.decode("utf-8")
+        return
+    with open(path, encoding="utf-8") as f:
+        yield from f
+
+
+def iter_text_file(path: str, name: Optional[str] = None, use_mmap: bool = False) -> Iterator[CorpusRecord]:
+    """
+    Stream the records of one article text file. The title is the header of the first line,
+    or is derived from the file name if the file is empty.
+
+    :param str path: Article file.
+    :param Optional[str] name: Name to report as the record's file. Defaults to the file name.
+    :param bool use_mmap: Read the file through a memory map.
+
+    :return: Iterator[CorpusRecord]
+    """
+    name = name or os.path.basename(path)
+    title = name[: name.find(".txt")].replace("_", " ")
+    for line_num, line in enumerate(_iter_lines(path, use_mmap)):
+        header_path, description = parse_line(line)
+        if line_num == 0:
+            title = header_path
+        yield CorpusRecord(name, line_num, line_num, title, None, header_path, description)
+
+
+def iter_shard(path: str, name: Optional[str] = None, use_mmap: bool = False) -> Iterator[CorpusRecord]:
+    """
+    Stream the records of one JSONL shard, plain or gzipped.
+
+    :param str path: Shard file.
+    :param Optional[str] name: Name to report as the record's file. Defaults to the file name.
+    :param bool use_mmap: Read an uncompressed shard through a memory map.
+
+    :return: Iterator[CorpusRecord]
+    """
+    name = name or os.path.basename(path)
+    article = None
+    section = 0
+    for line_num, line in enumerate(_iter_lines(path, use_mmap)):
+        record = json.loads(line)
+        # Articles are written in one piece, so a new (title, url) starts a new article
+        if (record["title"], record["url"]) != article:
+            article = (record["title"], record["url"])
+            section = 0
+        yield CorpusRecord(
+            name, line_num, section, record["title"], record["url"], record["header_path"], record["description"]
+        )
+        section += 1
+
+
+def iter_corpus(
+    path: str,
+    files: Optional[Iterable[str]] = None,
+    partition: int = 0,
+    num_partitions: int = 1,
+    use_mmap: bool = False,
+) -> Iterator[CorpusRecord]:
+    """
+    Lazily stream the records of a corpus, one file at a time, so memory stays flat however large it is.
+
+    :param str path: Corpus directory, holding article text files or JSONL shards.
+    :param Optional[Iterable[str]] files: Files in `path` to read. Defaults to `list_corpus_files(path)`.
+    :param int partition: Partition of the files to read, from 0 to `num_partitions - 1`.
+    :param int num_partitions: Number of partitions the files are split into.
+    :param bool use_mmap: Read uncompressed files through a memory map.
+
+    :return: Iterator[CorpusRecord]
+    """
+    files = list_corpus_files(path) if files is None else list(files)
+    for file in partition_files(files, partition, num_partitions):
+        file_path = os.path.join(path, file)
+        if file.startswith(SHARD_PREFIX):
+            yield from iter_shard(file_path, file, use_mmap)
+        else:
+            yield from iter_text_file(file_path, file, use_mmap)
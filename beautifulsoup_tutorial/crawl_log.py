@@ -0,0 +1,145 @@
+"""Buffered JSON-lines logging for the crawlers, written out by a background thread."""
+import collections
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from logging import DEBUG, ERROR, INFO, WARNING
+from typing import Optional, Union
+
+
+class CrawlLogger:
+    """
+    Log records as JSON lines, e.g. `{"time": ..., "level": "INFO", "msg": "Exploring url", "url": ...}`.
+
+    Records below `level` are dropped right away. The rest go into a bounded in-memory buffer
+    that a background thread writes out every `flush_interval` seconds, so the crawl never
+    waits on disk. When the buffer is full, new records below WARNING are dropped and
+    counted, while warnings and errors wait for room. Files rotate once they reach
+    `max_bytes` or are `rotate_every` seconds old, under one subdirectory of `log_dir` per day.
+    """
+
+    def __init__(
+        self,
+        log_dir: str,
+        level: Union[int, str] = INFO,
+        max_bytes: int = 64 * 1024 * 1024,
+        rotate_every: Optional[float] = 3600,
+        buffer_size: int = 10000,
+        flush_interval: float = 1.0,
+    ):
+        """
+        :param str log_dir: Directory to write the log files under.
+        :param Union[int, str] level: Lowest level logged, as a `logging` level or its name.
+        :param int max_bytes: Size at which a log file is rotated.
+        :param Optional[float] rotate_every: Seconds after which a log file is rotated, or None to only rotate by size.
+        :param int buffer_size: Max number of records waiting to be written.
+        :param float flush_interval: Seconds between writes to disk.
+        """
+        self.log_dir = log_dir
+        self.level = logging.getLevelName(level.upper()) if isinstance(level, str) else level
+        self.max_bytes = max_bytes
+        self.rotate_every = rotate_every
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.path: Optional[str] = None
+        self.dropped = 0
+        self._file = None
+        self._size = 0
+        self._opened_at = 0.0
+        self._buffer = collections.deque()
+        self._closed = False
+        self._cond = threading.Condition()
+        self._writer = threading.Thread(target=self._run, name="crawl-log-writer", daemon=True)
+        self._writer.start()
+
+    def log(self, level: int, msg: str, **fields):
+        """
+        Queue a record for writing.
+
+        :param int level: `logging` level of the record.
+        :param str msg: Message.
+        :param fields: Extra JSON-serializable fields of the record.
+        """
+        if level < self.level:
+            return
+        record = {"time": time.time(), "level": logging.getLevelName(level), "msg": msg, **fields}
+        with self._cond:
+            while len(self._buffer) >= self.buffer_size and not self._closed:
+                if level < WARNING:
+                    self.dropped += 1
+                    return
+                self._cond.notify_all()
+                self._cond.wait()
+            self._buffer.append(record)
+            if len(self._buffer) >= self.buffer_size // 2:
+                self._cond.notify_all()
+
+    def debug(self, msg: str, **fields):
+        self.log(DEBUG, msg, **fields)
+
+    def info(self, msg: str, **fields):
+        self.log(INFO, msg, **fields)
+
+    def warning(self, msg: str, **fields):
+        self.log(WARNING, msg, **fields)
+
+    def error(self, msg: str, **fields):
+        self.log(ERROR, msg, **fields)
+
+    def _open(self, now: float):
+        """Start a new log file, named by the time it was opened."""
+        if self._file is not None:
+            self._file.close()
+        opened = datetime.datetime.fromtimestamp(now)
+        day_dir = os.path.join(self.log_dir, f"{opened.year}-{opened.month}-{opened.day}")
+        os.makedirs(day_dir, exist_ok=True)
+        self.path = os.path.join(day_dir, opened.strftime("crawl_%Y_%m_%d_%H_%M_%S_%f.jsonl"))
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._size = 0
+        self._opened_at = now
+
+    def _write(self, records):
+        for record in records:
+            if (
+                self._file is None
+                or self._size >= self.max_bytes
+                or (self.rotate_every is not None and record["time"] - self._opened_at >= self.rotate_every)
+            ):
+                self._open(record["time"])
+            record["time"] = datetime.datetime.fromtimestamp(record["time"]).isoformat()
+            line = json.dumps(record, default=str) + "\n"
+            self._file.write(line)
+            self._size += len(line)
+        if self._file is not None:
+            self._file.flush()
+
+    def _run(self):
+        """Background thread writing the buffered records out."""
+        while True:
+            with self._cond:
+                # Write in batches, sooner if the buffer is filling up
+                if not self._closed and len(self._buffer) < self.buffer_size // 2:
+                    self._cond.wait(self.flush_interval)
+                records = self._buffer
+                self._buffer = collections.deque()
+                closed = self._closed
+                # Wake loggers waiting for room in the buffer
+                self._cond.notify_all()
+            self._write(records)
+            if closed:
+                return
+
+    def close(self):
+        """Write out the buffered records and close the log file."""
+        if self.dropped:
+            self.warning("Dropped log records while the buffer was full", dropped=self.dropped)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._writer.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,28 +1,158 @@
 """Fetch raw HTML from a URL."""
-from typing import Optional
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Union
+from urllib.parse import urlsplit
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
 
+from beautifulsoup_tutorial.ratelimit import TokenBucket, wikipedia_rate_limiter
 
-def fetch_html_from_url(url: str) -> Optional[str]:
+DEFAULT_HEADERS = {
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Methods": "GET",
+    "Access-Control-Allow-Headers": "Content-Type",
+    "Access-Control-Max-Age": "3600",
+    "User-Agent": "CoolBot/0.0 (https://example.org/coolbot/; coolbot@example.org)",
+}
+
+
+class FetchClient:
+    """
+    HTTP client keeping connections alive in a `requests.Session`, so repeated fetches
+    from the same host skip the TCP and TLS handshakes.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 7,
+        max_connections_per_host: int = 10,
+        headers: Optional[dict] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+    ):
+        """
+        :param float timeout: Seconds to wait for a response.
+        :param int max_connections_per_host: Size of the connection pool kept for each host.
+        :param Optional[dict] headers: Headers sent with every request.
+        :param Optional[TokenBucket] rate_limiter: Limiter to take a token from before each request.
+        """
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.max_connections_per_host = max_connections_per_host
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        # pool_block caps open connections per host instead of opening throwaway extras
+        adapter = HTTPAdapter(pool_maxsize=max_connections_per_host, pool_block=True)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url: str) -> requests.Response:
+        """
+        `GET` a URL, raising on connection errors and error statuses.
+
+        :param str url: URL to `GET` contents from.
+
+        :return: requests.Response
+        """
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def fetch_many(self, urls: List[str]) -> List[Union[requests.Response, Exception]]:
+        """
+        Fetch several URLs concurrently over the pooled connections.
+
+        :param List[str] urls: URLs to `GET`.
+
+        :return: List[Union[requests.Response, Exception]] in the order of `urls`, holding the error for failed fetches.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_connections_per_host) as executor:
+            futures = [executor.submit(self.fetch, url) for url in urls]
+        return [future.exception() or future.result() for future in futures]
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncFetchClient:
+    """Asyncio counterpart of `FetchClient`, backed by a pooled `httpx.AsyncClient`."""
+
+    def __init__(
+        self,
+        timeout: float = 7,
+        max_connections_per_host: int = 10,
+        headers: Optional[dict] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+    ):
+        """
+        :param float timeout: Seconds to wait for a response.
+        :param int max_connections_per_host: Number of requests in flight to each host.
+        :param Optional[dict] headers: Headers sent with every request.
+        :param Optional[TokenBucket] rate_limiter: Limiter to take a token from before each request.
+        """
+        self.rate_limiter = rate_limiter
+        self.max_connections_per_host = max_connections_per_host
+        self.client = httpx.AsyncClient(
+            headers=headers or DEFAULT_HEADERS,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=max_connections_per_host),
+        )
+        # httpx only limits connections overall, so cap each host separately
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def fetch(self, url: str) -> httpx.Response:
+        """
+        `GET` a URL, raising on connection errors and error statuses.
+
+        :param str url: URL to `GET` contents from.
+
+        :return: httpx.Response
+        """
+        host = urlsplit(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_connections_per_host)
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire_async()
+        async with self._host_limits[host]:
+            response = await self.client.get(url)
+        response.raise_for_status()
+        return response
+
+    async def fetch_many(self, urls: List[str]) -> List[Union[httpx.Response, Exception]]:
+        """
+        Fetch several URLs concurrently.
+
+        :param List[str] urls: URLs to `GET`.
+
+        :return: List[Union[httpx.Response, Exception]] in the order of `urls`, holding the error for failed fetches.
+        """
+        return await asyncio.gather(*(self.fetch(url) for url in urls), return_exceptions=True)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+# Shared by the module-level helpers so every call reuses the same connections and rate limit
+default_client = FetchClient(rate_limiter=wikipedia_rate_limiter)
+
+
+def fetch_html_from_url(url: str) -> Optional[requests.Response]:
     """
     Fetch raw HTML from a URL.
 
     :param str url: URL to `GET` contents from.
 
-    :return: Optional[str]
+    :return: Optional[requests.Response]
     Original User-Agent: "Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:52.0) Gecko/20100101 Firefox/52.0"
     """
     try:
-        headers = {
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Methods": "GET",
-            "Access-Control-Allow-Headers": "Content-Type",
-            "Access-Control-Max-Age": "3600",
-            "User-Agent": "CoolBot/0.0 (https://example.org/coolbot/; coolbot@example.org)",
-        }
-        return requests.get(url, headers=headers, timeout=7)
+        return default_client.fetch(url)
     except HTTPError as e:
         print(f"HTTP error occurred: {e}")
     except Exception as e:
@@ -0,0 +1,403 @@
+"""Crawl frontier: pages waiting to be crawled and the index of pages already seen."""
+import heapq
+from collections import deque
+from itertools import islice
+from typing import Dict, Iterable, List, MutableSet, Optional, Tuple
+
+from beautifulsoup_tutorial.canonical import CanonicalIndex
+from beautifulsoup_tutorial.checkpoint import CrawlCheckpoint
+from beautifulsoup_tutorial.relevance import RelevanceScorer
+
+
+class CrawlFrontier:
+    """
+    FIFO queue of page names to crawl, with constant-time bookkeeping.
+
+    A name is queued at most once over the lifetime of the frontier, and never if its
+    title was already seen, so neighbors shared by many pages don't pile up as duplicates.
+    Names, titles and urls are compared in their canonical forms, and redirects learned from
+    loaded pages are followed, so "Contract_law", "contract law" and a redirect to
+    "Contract law" all count as the same page.
+    When given a checkpoint, every change is also recorded there as it happens. A popped name
+    stays in the checkpoint's frontier until `done` is called for it, and a page it loads is
+    only recorded as seen in the checkpoint then, so a crash in between crawls it again.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str] = (),
+        seen_urls: Iterable[str] = (),
+        seen_titles: Iterable[str] = (),
+        checkpoint: Optional[CrawlCheckpoint] = None,
+        url_set: Optional[MutableSet[str]] = None,
+        title_set: Optional[MutableSet[str]] = None,
+        queued_set: Optional[MutableSet[str]] = None,
+        max_aliases: Optional[int] = None,
+    ):
+        """
+        :param Iterable[str] names: Page names to start the crawl from.
+        :param Iterable[str] seen_urls: URLs of pages already crawled.
+        :param Iterable[str] seen_titles: Page names already crawled.
+        :param Optional[CrawlCheckpoint] checkpoint: Store to record crawl state in.
+        :param Optional[MutableSet[str]] url_set: Store for the seen urls, e.g. a Bloom filter. Defaults to a set.
+        :param Optional[MutableSet[str]] title_set: Store for the seen titles. Defaults to a set.
+        :param Optional[MutableSet[str]] queued_set: Store for the names ever queued. Defaults to a set.
+        :param Optional[int] max_aliases: Max number of redirects remembered. No limit if None.
+        """
+        self._queue = deque()
+        self._enqueued = queued_set if queued_set is not None else set()
+        # Names popped and not done yet, to the seen page they loaded, recorded in the checkpoint once they are done
+        self._in_progress: Dict[str, Optional[Tuple[str, str, Optional[str]]]] = {}
+        self.index = CanonicalIndex(seen_urls, seen_titles, url_set, title_set, max_aliases)
+        self.checkpoint = checkpoint
+        self.extend(names)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __bool__(self) -> bool:
+        return bool(self._queue)
+
+    @property
+    def seen_urls(self) -> MutableSet[str]:
+        """Canonical URLs of the pages crawled."""
+        return self.index.urls
+
+    @property
+    def seen_titles(self) -> MutableSet[str]:
+        """Canonical titles of the pages crawled."""
+        return self.index.titles
+
+    def _claim(self, name: str) -> bool:
+        """Remember a name as queued, unless it was already queued or seen."""
+        key = self.index.resolve(name)
+        if key in self._enqueued or key in self.index.titles:
+            return False
+        self._enqueued.add(key)
+        return True
+
+    def _push(self, name: str) -> bool:
+        if not self._claim(name):
+            return False
+        self._queue.append(name)
+        return True
+
+    def _start(self, name: str):
+        """Track a popped name as in progress until `done` is called for it."""
+        self._in_progress[name] = None
+
+    def push(self, name: str) -> bool:
+        """
+        Queue a page name unless it was already queued or seen.
+
+        :param str name: Page name.
+
+        :return: bool
+        """
+        return self.extend([name]) == 1
+
+    def extend(self, names: Iterable[str]) -> int:
+        """
+        Queue several page names, returning how many were new.
+
+        :param Iterable[str] names: Page names.
+
+        :return: int
+        """
+        added = [name for name in names if self._push(name)]
+        if self.checkpoint is not None:
+            self.checkpoint.record_queued(added)
+        return len(added)
+
+    def restore(self, entries: Iterable[Tuple[str, Optional[int], Optional[int]]]) -> int:
+        """
+        Queue the pending names of a checkpoint again, returning how many were new.
+
+        :param Iterable[Tuple[str, Optional[int], Optional[int]]] entries: Names with the depth and parent score
+        they were queued with, as returned by `CrawlCheckpoint.pending_entries`.
+
+        :return: int
+        """
+        return sum(1 for name, _, _ in entries if self._push(name))
+
+    def pop(self) -> str:
+        """
+        Pop the oldest queued page name. It stays in the checkpoint's frontier until `done` is called for it.
+
+        :return: str
+        """
+        name = self._queue.popleft()
+        self._start(name)
+        return name
+
+    def done(self, name: str):
+        """
+        Mark a popped page name as processed, once its article is written and its neighbors are queued.
+        It leaves the checkpoint's frontier, and the page it loaded is recorded there as seen.
+
+        :param str name: Page name, as popped.
+        """
+        seen = self._in_progress.pop(name, None)
+        if self.checkpoint is None:
+            return
+        if seen is None:
+            self.checkpoint.record_done(name)
+        else:
+            url, title, resolved_title = seen
+            self.checkpoint.record_done(name, url, [t for t in (title, resolved_title) if t is not None])
+
+    def peek_last(self) -> Optional[str]:
+        """
+        Return the most recently queued page name, if any.
+
+        :return: Optional[str]
+        """
+        return self._queue[-1] if self._queue else None
+
+    def upcoming(self, n: int) -> List[str]:
+        """
+        Return the next `n` page names without popping them.
+
+        :param int n: Number of names.
+
+        :return: List[str]
+        """
+        return list(islice(self._queue, n))
+
+    def mark_seen(self, url: str, title: str, resolved_title: Optional[str] = None):
+        """
+        Record a crawled page.
+
+        :param str url: URL the page resolved to.
+        :param str title: Name the page was requested with.
+        :param Optional[str] resolved_title: Title the page was found under, which links to it may use as well.
+        """
+        self.index.add(url, title, resolved_title)
+        if title in self._in_progress:
+            # Recorded in the checkpoint with the page's removal from the frontier
+            self._in_progress[title] = (url, title, resolved_title)
+        elif self.checkpoint is not None:
+            self.checkpoint.record_seen(url, title)
+            if resolved_title is not None and resolved_title != title:
+                self.checkpoint.record_seen_many(titles=[resolved_title])
+
+    def has_seen_url(self, url: str) -> bool:
+        return self.index.has_url(url)
+
+    def has_seen_title(self, title: str) -> bool:
+        return self.index.has_title(title)
+
+    def is_known(self, name: str) -> bool:
+        """
+        Whether a page name was ever queued or seen, in which case queuing it again does nothing.
+
+        :param str name: Page name.
+
+        :return: bool
+        """
+        key = self.index.resolve(name)
+        return key in self._enqueued or key in self.index.titles
+
+
+class PriorityCrawlFrontier(CrawlFrontier):
+    """
+    Best-first variant of `CrawlFrontier`, popping the most promising page name first.
+
+    A name's priority is set when it is queued, from the keyword hits of the title itself,
+    the keyword score of the page linking to it, and its depth below the start pages:
+    `title_weight * title hits + parent_weight * parent score - depth_penalty * depth`.
+    Names of equal priority come out in the order they were queued. There are no BFS levels,
+    so `peek_last` returns None; the depth of the page popped last is in `depth`.
+    """
+
+    def __init__(
+        self,
+        names: Iterable[str] = (),
+        scorer: Optional[RelevanceScorer] = None,
+        title_weight: float = 3,
+        parent_weight: float = 1,
+        depth_penalty: float = 0.5,
+        **kwargs,
+    ):
+        """
+        :param Iterable[str] names: Page names to start the crawl from, at depth 0.
+        :param Optional[RelevanceScorer] scorer: Scorer matching keywords in titles. Defaults to the law keywords.
+        :param float title_weight: Priority per distinct keyword in the title.
+        :param float parent_weight: Priority per distinct keyword of the linking page.
+        :param float depth_penalty: Priority lost per level below the start pages.
+        :param kwargs: Seen state and stores, as for `CrawlFrontier`.
+        """
+        self.scorer = scorer or RelevanceScorer()
+        self.title_weight = title_weight
+        self.parent_weight = parent_weight
+        self.depth_penalty = depth_penalty
+        self.depth = 0
+        # (negated priority, queue order, depth, name), so the smallest entry is the best page queued first
+        self._heap: List[Tuple[float, int, int, str]] = []
+        self._order = 0
+        super().__init__(names, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+    def priority(self, name: str, parent_score: int = 0, depth: int = 0) -> float:
+        """
+        :param str name: Page name.
+        :param int parent_score: Keyword score of the page linking to it.
+        :param int depth: Levels below the start pages.
+
+        :return: float
+        """
+        title_hits = self.scorer.score(name).score
+        return self.title_weight * title_hits + self.parent_weight * parent_score - self.depth_penalty * depth
+
+    def extend(self, names: Iterable[str], parent_score: int = 0, depth: int = 0) -> int:
+        """
+        Queue several page names linked from the same page, returning how many were new.
+
+        :param Iterable[str] names: Page names.
+        :param int parent_score: Keyword score of the page linking to them.
+        :param int depth: Levels below the start pages.
+
+        :return: int
+        """
+        added = [name for name in names if self._push_at(name, parent_score, depth)]
+        if self.checkpoint is not None:
+            self.checkpoint.record_queued(added, depth, parent_score)
+        return len(added)
+
+    def _push_at(self, name: str, parent_score: int, depth: int) -> bool:
+        if not self._claim(name):
+            return False
+        heapq.heappush(self._heap, (-self.priority(name, parent_score, depth), self._order, depth, name))
+        self._order += 1
+        return True
+
+    def restore(self, entries: Iterable[Tuple[str, Optional[int], Optional[int]]]) -> int:
+        """
+        Queue the pending names of a checkpoint again at the depth and with the parent score they were queued with,
+        so their priorities are the same as before. Names queued without them count as start pages.
+
+        :param Iterable[Tuple[str, Optional[int], Optional[int]]] entries: Names with their depth and parent score.
+
+        :return: int
+        """
+        return sum(1 for name, depth, parent_score in entries if self._push_at(name, parent_score or 0, depth or 0))
+
+    def pop(self) -> str:
+        """
+        Pop the page name with the highest priority, setting `depth` to its depth.
+        It stays in the checkpoint's frontier until `done` is called for it.
+
+        :return: str
+        """
+        _, _, self.depth, name = heapq.heappop(self._heap)
+        self._start(name)
+        return name
+
+    def peek_last(self) -> Optional[str]:
+        return None
+
+    def upcoming(self, n: int) -> List[str]:
+        """
+        Return the next `n` page names without popping them.
+
+        :param int n: Number of names.
+
+        :return: List[str]
+        """
+        # Walk the heap from its root, a child becoming a candidate once its parent is taken, which is O(n log n)
+        heap = self._heap
+        names = []
+        candidates = [(heap[0], 0)] if heap else []
+        while candidates and len(names) < n:
+            entry, index = heapq.heappop(candidates)
+            names.append(entry[3])
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(candidates, (heap[child], child))
+        return names
+
+
+class DepthFirstCrawlFrontier(CrawlFrontier):
+    """
+    Depth-first variant of `CrawlFrontier`, a stack popping the page name queued last.
+
+    Names are queued with their depth below the start pages, which the checkpoint records
+    along with them, so the pending names of a stopped crawl restore the stack as it was.
+    The depth of the page popped last is in `depth`.
+    """
+
+    def __init__(self, names: Iterable[str] = (), **kwargs):
+        """
+        :param Iterable[str] names: Page names to start the crawl from, at depth 0.
+        :param kwargs: Seen state and stores, as for `CrawlFrontier`.
+        """
+        self.depth = 0
+        # (depth, name), popped from the end
+        self._stack: List[Tuple[int, str]] = []
+        super().__init__(names, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self._stack)
+
+    def __bool__(self) -> bool:
+        return bool(self._stack)
+
+    def extend(self, names: Iterable[str], depth: int = 0) -> int:
+        """
+        Push several page names at the same depth, returning how many were new. The last one is popped first.
+
+        :param Iterable[str] names: Page names.
+        :param int depth: Levels below the start pages.
+
+        :return: int
+        """
+        added = [name for name in names if self._push_at(name, depth)]
+        if self.checkpoint is not None:
+            self.checkpoint.record_queued(added, depth)
+        return len(added)
+
+    def _push_at(self, name: str, depth: int) -> bool:
+        if not self._claim(name):
+            return False
+        self._stack.append((depth, name))
+        return True
+
+    def restore(self, entries: Iterable[Tuple[str, Optional[int], Optional[int]]]) -> int:
+        """
+        Push the pending names of a checkpoint again in the order they were queued, at the depth they were queued at.
+        Names queued without one count as start pages.
+
+        :param Iterable[Tuple[str, Optional[int], Optional[int]]] entries: Names with their depth and parent score.
+
+        :return: int
+        """
+        return sum(1 for name, depth, _ in entries if self._push_at(name, depth or 0))
+
+    def pop(self) -> str:
+        """
+        Pop the page name queued last, setting `depth` to its depth.
+        It stays in the checkpoint's frontier until `done` is called for it.
+
+        :return: str
+        """
+        self.depth, name = self._stack.pop()
+        self._start(name)
+        return name
+
+    def peek_last(self) -> Optional[str]:
+        return self._stack[-1][1] if self._stack else None
+
+    def upcoming(self, n: int) -> List[str]:
+        """
+        Return the next `n` page names without popping them.
+
+        :param int n: Number of names.
+
+        :return: List[str]
+        """
+        return [name for _, name in islice(reversed(self._stack), n)]
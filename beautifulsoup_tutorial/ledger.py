@@ -0,0 +1,69 @@
+"""Append-only record of which prompts a query run has completed."""
+import json
+import os
+from typing import Set, Tuple
+
+DONE = "done"
+FAILED = "failed"
+
+
+class ProgressLedger:
+    """
+    JSONL ledger of `{"file", "line", "prompt_hash", "status"}` records.
+
+    Each record is appended with a single `write` on a file opened with `O_APPEND`, so a
+    crash can at worst cut off the last line, which is ignored on load. Completed
+    `(file, line, prompt_hash)` keys are kept in a set, so checking a line is O(1).
+    A line whose prompt changed (e.g. a new model) gets a new hash and is done again.
+    """
+
+    def __init__(self, path: str):
+        """
+        :param str path: Ledger file, created if it doesn't exist.
+        """
+        self.path = path
+        self._done: Set[Tuple[str, int, str]] = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Partly written last line of a crashed run
+                        continue
+                    key = (record["file"], record["line"], record["prompt_hash"])
+                    if record["status"] == DONE:
+                        self._done.add(key)
+                    else:
+                        self._done.discard(key)
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def is_done(self, file: str, line: int, prompt_hash: str) -> bool:
+        """
+        :param str file: Source file of the prompt.
+        :param int line: Line number of the prompt in the file.
+        :param str prompt_hash: Hash of the prompt.
+
+        :return: bool
+        """
+        return (file, line, prompt_hash) in self._done
+
+    def record(self, file: str, line: int, prompt_hash: str, status: str = DONE):
+        """
+        Append the outcome of a prompt.
+
+        :param str file: Source file of the prompt.
+        :param int line: Line number of the prompt in the file.
+        :param str prompt_hash: Hash of the prompt.
+        :param str status: DONE, or FAILED to have the prompt tried again on the next run.
+        """
+        record = {"file": file, "line": line, "prompt_hash": prompt_hash, "status": status}
+        os.write(self._fd, (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+        if status == DONE:
+            self._done.add((file, line, prompt_hash))
+
+    def close(self):
+        os.close(self._fd)
@@ -0,0 +1,213 @@
+"""Load Wikipedia pages in batches straight from the MediaWiki API."""
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Union
+from urllib.parse import urlencode
+
+from wikipedia.exceptions import DisambiguationError, PageError, WikipediaException
+
+from beautifulsoup_tutorial.fetch import FetchClient, default_client
+from beautifulsoup_tutorial.page_cache import CachedPage, PageCache
+from beautifulsoup_tutorial.sections import heading_level
+
+API_URL = "https://en.wikipedia.org/w/api.php"
+
+# The API takes at most 50 titles per query
+MAX_BATCH_SIZE = 50
+# and returns at most 20 intro extracts per response
+MAX_INTRO_BATCH_SIZE = 20
+
+# Properties of a full page: URL, disambiguation flag, links and plain-text content
+PAGE_PROPS = {
+    "prop": "info|pageprops|links|extracts",
+    "inprop": "url",
+    "ppprop": "disambiguation",
+    "plnamespace": 0,
+    "pllimit": "max",
+    "explaintext": 1,
+    "exsectionformat": "wiki",
+}
+# Plain-text intro, the text before the first heading
+INTRO_PROPS = {"prop": "extracts", "exintro": 1, "explaintext": 1, "exlimit": MAX_INTRO_BATCH_SIZE}
+
+
+def sections_from_content(content: str) -> List[str]:
+    """
+    List the section titles of an article from the headings in its plain-text content,
+    as `WikipediaPage.sections` would without a separate request.
+
+    :param str content: Article content with "== Header ==" headings.
+
+    :return: List[str]
+    """
+    sections = []
+    for line in content.splitlines():
+        if heading_level(line):
+            sections.append(line.strip().strip("=").strip())
+    return sections
+
+
+class MediaWikiClient:
+    """
+    Fetch the title, URL, plain-text content and links of many pages per API query.
+
+    Redirects and title normalization are resolved by the API, so pages come back under
+    the names they were requested with. The API only returns one full extract per
+    response, so content still costs a continuation request per page, but info, links
+    and disambiguation checks are shared by the whole batch, and sections are read from
+    the content headings.
+    """
+
+    def __init__(self, client: FetchClient = default_client, api_url: str = API_URL, batch_size: int = MAX_BATCH_SIZE):
+        """
+        :param FetchClient client: Client making the requests, anything with a `fetch(url)` returning a JSON response.
+        :param str api_url: URL of the MediaWiki `api.php` endpoint.
+        :param int batch_size: Titles per query, at most 50.
+        """
+        self.client = client
+        self.api_url = api_url
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+
+    def _query(self, titles: List[str], props: Dict[str, Union[str, int]] = PAGE_PROPS) -> Dict[str, dict]:
+        """Run one query for `titles`, following continuations, and return the merged pages by title."""
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": 2,
+            "redirects": 1,
+            "titles": "|".join(titles),
+            **props,
+        }
+        pages: Dict[str, dict] = {}
+        aliases: Dict[str, str] = {}
+        continuation: Dict[str, str] = {}
+        while True:
+            data = self.client.fetch(f"{self.api_url}?{urlencode({**params, **continuation})}").json()
+            if "error" in data:
+                raise WikipediaException(data["error"].get("info", data["error"]))
+            query = data.get("query", {})
+            for alias in query.get("normalized", []) + query.get("redirects", []):
+                aliases[alias["from"]] = alias["to"]
+            for result in query.get("pages", []):
+                page = pages.setdefault(result["title"], {"links": []})
+                page.update((key, value) for key, value in result.items() if key != "links")
+                page["links"].extend(link["title"] for link in result.get("links", []))
+            if "continue" not in data:
+                break
+            continuation = data["continue"]
+        # Point the requested titles at their pages, through normalization and redirects
+        for title in titles:
+            resolved = title
+            for _ in range(len(aliases)):
+                if resolved not in aliases:
+                    break
+                resolved = aliases[resolved]
+            if resolved != title and resolved in pages:
+                pages[title] = pages[resolved]
+        return pages
+
+    def fetch_pages(self, titles: Iterable[str]) -> Dict[str, Union[CachedPage, WikipediaException]]:
+        """
+        Load pages by title, `batch_size` titles per query.
+
+        :param Iterable[str] titles: Titles of the pages to load.
+
+        :return: Dict[str, Union[CachedPage, WikipediaException]] from each requested title to its page,
+        or the `PageError` or `DisambiguationError` raised by `wikipedia.page` for it.
+        """
+        titles = list(dict.fromkeys(titles))
+        results: Dict[str, Union[CachedPage, WikipediaException]] = {}
+        for start in range(0, len(titles), self.batch_size):
+            batch = titles[start : start + self.batch_size]
+            pages = self._query(batch)
+            for title in batch:
+                page = pages.get(title)
+                if page is None or page.get("missing") or page.get("invalid"):
+                    results[title] = PageError(None, title)
+                elif "disambiguation" in page.get("pageprops", {}):
+                    results[title] = DisambiguationError(page["title"], page["links"])
+                else:
+                    content = page.get("extract", "")
+                    results[title] = CachedPage(
+                        page["title"], page["fullurl"], content, sections_from_content(content), page["links"]
+                    )
+        return results
+
+    def fetch_intros(self, titles: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Load the plain-text intros of pages by title, up to 20 titles per query. An intro costs
+        a fraction of a full page, which makes it a cheap look at a page before deciding to load it.
+
+        :param Iterable[str] titles: Titles of the pages.
+
+        :return: Dict[str, Optional[str]] from each requested title to its intro, None for missing and invalid pages
+        """
+        titles = list(dict.fromkeys(titles))
+        batch_size = min(self.batch_size, MAX_INTRO_BATCH_SIZE)
+        intros: Dict[str, Optional[str]] = {}
+        for start in range(0, len(titles), batch_size):
+            batch = titles[start : start + batch_size]
+            pages = self._query(batch, INTRO_PROPS)
+            for title in batch:
+                page = pages.get(title)
+                missing = page is None or page.get("missing") or page.get("invalid")
+                intros[title] = None if missing else page.get("extract", "")
+        return intros
+
+
+class BatchPageLoader:
+    """
+    Page source for the BFS crawl, a drop-in for `PagePrefetcher` that loads the pages
+    at the head of the frontier together in one `MediaWikiClient` batch.
+    """
+
+    def __init__(self, client: MediaWikiClient, cache: Optional[PageCache] = None):
+        """
+        :param MediaWikiClient client: Client loading the batches.
+        :param Optional[PageCache] cache: Cache to look pages up in and store them to.
+        """
+        self.client = client
+        self.cache = cache
+        self.lookahead = client.batch_size
+        self._upcoming: List[str] = []
+        self._loaded: Dict[str, Union[CachedPage, WikipediaException]] = {}
+
+    def schedule(self, names: Iterable[str]):
+        """
+        Remember the upcoming page names, to be loaded along with the next page requested.
+        Pages loaded before that are no longer upcoming are dropped, so they don't pile up in memory.
+
+        :param Iterable[str] names: Page names in the order they will be requested.
+        """
+        self._upcoming = list(islice(names, self.lookahead))
+        for title in set(self._loaded).difference(self._upcoming):
+            del self._loaded[title]
+
+    def get(self, name: str) -> CachedPage:
+        """
+        Return the loaded page for `name`, raising its `PageError` or `DisambiguationError` if it has none.
+
+        :param str name: Page name.
+
+        :return: CachedPage
+        """
+        if name not in self._loaded:
+            batch = []
+            for title in [name] + self._upcoming:
+                if title in self._loaded or title in batch:
+                    continue
+                cached = self.cache.get(title) if self.cache is not None else None
+                if cached is not None:
+                    self._loaded[title] = cached
+                else:
+                    batch.append(title)
+            for title, result in self.client.fetch_pages(batch[: self.lookahead]).items():
+                if self.cache is not None and isinstance(result, CachedPage):
+                    result = self.cache.put(result, keys=(title,))
+                self._loaded[title] = result
+        result = self._loaded.pop(name)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def close(self):
+        self._loaded.clear()
@@ -0,0 +1,139 @@
+"""Persistent on-disk cache of loaded Wikipedia pages."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Iterable, List, NamedTuple, Optional
+
+
+class CachedPage(NamedTuple):
+    """The parts of a `WikipediaPage` the crawlers use, loaded from the cache."""
+
+    title: str
+    url: str
+    content: str
+    sections: List[str]
+    links: List[str]
+
+
+class PageCache:
+    """
+    Cache of pages on disk, looked up by page title or URL.
+
+    Pages are stored compressed under the hash of their data, so the title and URL of a page
+    share one file. An SQLite index tracks when entries were stored and last read: entries
+    older than `ttl` seconds are ignored, and the least recently read are evicted once the
+    files take more than `max_bytes`. Safe to share between threads.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024**3, ttl: Optional[float] = 7 * 24 * 3600):
+        """
+        :param str directory: Directory holding the cache, created if it doesn't exist.
+        :param int max_bytes: Max total size of the cached page files.
+        :param Optional[float] ttl: Seconds a cached page stays valid, or None to keep pages forever.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, digest TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+            CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+            CREATE TABLE IF NOT EXISTS objects (digest TEXT PRIMARY KEY, size INTEGER NOT NULL);
+            """
+        )
+        self.conn.commit()
+        # Total size of the page files, kept up to date as they are added and evicted
+        self._total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM objects").fetchone()[0]
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "objects", digest[:2], digest)
+
+    def get(self, key: str) -> Optional[CachedPage]:
+        """
+        Look up a page by title or URL.
+
+        :param str key: Page title or URL.
+
+        :return: Optional[CachedPage]
+        """
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT digest, stored_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                self.misses += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        try:
+            with open(self._object_path(row[0]), "rb") as f:
+                return CachedPage(*json.loads(zlib.decompress(f.read())))
+        except (OSError, ValueError, zlib.error):
+            # File was evicted or damaged under us, treat as a miss
+            return None
+
+    def put(self, page, keys: Iterable[str] = ()) -> CachedPage:
+        """
+        Store a page under its title, its URL and any extra keys.
+
+        :param page: `WikipediaPage` or `CachedPage`.
+        :param Iterable[str] keys: Extra keys, such as the name the page was requested with.
+
+        :return: CachedPage
+        """
+        cached = CachedPage(page.title, page.url, page.content, list(page.sections), list(page.links))
+        data = zlib.compress(json.dumps(cached).encode("utf-8"))
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        now = time.time()
+        with self._lock, self.conn:
+            # The digest is a hash of the data, so an object already stored has the same size
+            if self.conn.execute("INSERT OR IGNORE INTO objects VALUES (?, ?)", (digest, len(data))).rowcount:
+                self._total += len(data)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                ((key, digest, now, now) for key in {cached.title, cached.url, *keys}),
+            )
+            if self._total > self.max_bytes:
+                self._evict()
+        return cached
+
+    def _evict(self):
+        """Drop the least recently read entries until the cache fits in `max_bytes`. Called holding the lock."""
+        while self._total > self.max_bytes:
+            row = self.conn.execute("SELECT key, digest FROM entries ORDER BY accessed_at LIMIT 1").fetchone()
+            if row is None:
+                break
+            key, digest = row
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            if self.conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone() is None:
+                size = self.conn.execute("SELECT size FROM objects WHERE digest = ?", (digest,)).fetchone()[0]
+                self.conn.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+                try:
+                    os.remove(self._object_path(digest))
+                except OSError:
+                    pass
+                self._total -= size
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
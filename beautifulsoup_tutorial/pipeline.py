@@ -0,0 +1,194 @@
+"""Score and split fetched articles on worker processes, and write them out on a writer thread."""
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from beautifulsoup_tutorial.corpus import CorpusWriter
+from beautifulsoup_tutorial.relevance import RelevanceScore, RelevanceScorer
+from beautifulsoup_tutorial.sections import iter_sections
+
+
+class ParsedArticle(NamedTuple):
+    """CPU-bound results for one article."""
+
+    relevance: RelevanceScore
+    sections: List[Tuple[str, str]]  # Empty unless the article passed the relevance check
+    lines: int
+
+
+# Scorers built in each worker process, by (keywords, threshold)
+_scorers: Dict[Tuple[Tuple[str, ...], int], RelevanceScorer] = {}
+
+
+def parse_article(title: str, content: str, keywords: Tuple[str, ...], threshold: int) -> ParsedArticle:
+    """
+    Score an article's relevance and, if it passes, split it into sections.
+
+    :param str title: Article title.
+    :param str content: Plain-text article content.
+    :param Tuple[str, ...] keywords: Relevance keywords.
+    :param int threshold: Distinct keywords needed to pass.
+
+    :return: ParsedArticle
+    """
+    scorer = _scorers.get((keywords, threshold))
+    if scorer is None:
+        scorer = _scorers[(keywords, threshold)] = RelevanceScorer(keywords, threshold)
+    relevance = scorer.score(content)
+    sections = list(iter_sections(content, title)) if relevance.passed else []
+    return ParsedArticle(relevance, sections, content.count("\n") + 1)
+
+
+class ArticlePipeline:
+    """
+    Parse articles on a pool of worker processes while the crawl keeps fetching.
+
+    Results are handed back in the order the articles were submitted, so the crawl can
+    apply them (e.g. queue neighbors) exactly as if it had parsed each page inline. At
+    most `max_pending` articles are in flight; submitting more waits for the oldest.
+    With no workers, articles are parsed inline on submit.
+    """
+
+    def __init__(self, scorer: RelevanceScorer, workers: int = 0, max_pending: Optional[int] = None):
+        """
+        :param RelevanceScorer scorer: Scorer whose keywords and threshold the workers use.
+        :param int workers: Number of worker processes, 0 to parse inline.
+        :param Optional[int] max_pending: Max number of articles in flight. Defaults to 4 per worker.
+        """
+        self.keywords = tuple(scorer.keywords)
+        self.threshold = scorer.threshold
+        self.max_pending = max_pending or max(1, workers * 4)
+        self._executor = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._pending = deque()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def __bool__(self) -> bool:
+        return bool(self._pending)
+
+    def submit(self, context: Any, title: str, content: str) -> List[Tuple[Any, ParsedArticle]]:
+        """
+        Queue an article for parsing.
+
+        :param Any context: Caller's data for the article, handed back with its result.
+        :param str title: Article title.
+        :param str content: Plain-text article content.
+
+        :return: List[Tuple[Any, ParsedArticle]] of the (context, result) pairs that are done, in submission order
+        """
+        if self._executor is None:
+            return [(context, parse_article(title, content, self.keywords, self.threshold))]
+        future = self._executor.submit(parse_article, title, content, self.keywords, self.threshold)
+        self._pending.append((context, future))
+        return self.completed(block=len(self._pending) > self.max_pending)
+
+    def completed(self, block: bool = False) -> List[Tuple[Any, ParsedArticle]]:
+        """
+        Take the results that are done, stopping at the oldest one still running.
+
+        :param bool block: Wait for at least the oldest article.
+
+        :return: List[Tuple[Any, ParsedArticle]]
+        """
+        done = []
+        while self._pending and (block or self._pending[0][1].done()):
+            context, future = self._pending.popleft()
+            done.append((context, future.result()))
+            block = False
+        return done
+
+    def drain(self) -> List[Tuple[Any, ParsedArticle]]:
+        """
+        Wait for every article in flight.
+
+        :return: List[Tuple[Any, ParsedArticle]]
+        """
+        done = []
+        while self._pending:
+            done.extend(self.completed(block=True))
+        return done
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+
+class BackgroundWriter:
+    """
+    Write articles to a corpus on a thread, through a bounded queue so a slow disk holds back
+    the crawl instead of letting articles pile up in memory. With `max_queued` 0, writes are inline.
+
+    Each article can come with a key, e.g. its page name, handed back by `written` once the
+    article is written, so the caller only records a page as done once its article is out.
+    """
+
+    def __init__(self, corpus: CorpusWriter, max_queued: int = 64):
+        """
+        :param CorpusWriter corpus: Sink to write to.
+        :param int max_queued: Max number of articles waiting to be written, 0 to write inline.
+        """
+        self.corpus = corpus
+        self._error: Optional[BaseException] = None
+        # Keys of the articles written, appended by the writer thread and taken by `written`
+        self._written = deque()
+        self._queue: Optional[queue.Queue] = None
+        if max_queued > 0:
+            self._queue = queue.Queue(maxsize=max_queued)
+            self._thread = threading.Thread(target=self._run, name="corpus-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            article = self._queue.get()
+            if article is None:
+                return
+            *article, key = article
+            try:
+                self.corpus.write_article(*article)
+            except BaseException as e:
+                self._error = e
+            else:
+                self._written.append(key)
+
+    def write_article(
+        self, title: str, url: str, sections: Iterable[Tuple[str, str]], seen_count: int = 0, key: Any = None
+    ):
+        """
+        Queue an article for writing, re-raising any error from writing earlier ones.
+
+        :param str title: Article title.
+        :param str url: Article URL.
+        :param Iterable[Tuple[str, str]] sections: `(header_path, description)` records.
+        :param int seen_count: Number of urls seen so far, used to name a duplicate title's file.
+        :param Any key: Key handed back by `written` once the article is written.
+        """
+        if self._error is not None:
+            raise self._error
+        if self._queue is None:
+            self.corpus.write_article(title, url, sections, seen_count)
+            self._written.append(key)
+        else:
+            self._queue.put((title, url, sections, seen_count, key))
+
+    def written(self) -> List[Any]:
+        """
+        Take the keys of the articles written since the last call, in the order they were written.
+
+        :return: List[Any]
+        """
+        keys = []
+        while self._written:
+            keys.append(self._written.popleft())
+        return keys
+
+    def close(self):
+        """Finish writing the queued articles and close the corpus."""
+        if self._queue is not None:
+            self._queue.put(None)
+            self._thread.join()
+        self.corpus.close()
+        if self._error is not None:
+            raise self._error
@@ -0,0 +1,65 @@
+"""Fetch upcoming crawl pages concurrently on a bounded worker pool."""
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable
+
+
+class PagePrefetcher:
+    """
+    Load the pages at the head of the crawl frontier on a pool of worker threads.
+
+    The crawl loop still pops and processes pages one at a time in frontier order, so
+    level bookkeeping and output files are unchanged; only the network wait overlaps.
+    With a single worker no threads are started and `get()` loads pages inline.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], workers: int = 1):
+        """
+        :param Callable loader: Function loading a page from its name.
+        :param int workers: Number of pages fetched at the same time.
+        """
+        self.loader = loader
+        self.workers = max(1, workers)
+        # Keep a few finished pages ready so workers stay busy while a page is processed
+        self.lookahead = self.workers * 2 if self.workers > 1 else 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self._pending: Dict[str, Future] = {}
+
+    def schedule(self, names: Iterable[str]):
+        """
+        Start loading the given upcoming page names, up to the lookahead window.
+        Pages scheduled before that are no longer in the window, e.g. because better pages were queued
+        best first, are dropped so they don't hold the window's slots. They are loaded inline if requested.
+
+        :param Iterable[str] names: Page names in the order they will be requested.
+        """
+        if self._executor is None:
+            return
+        window = list(islice(names, self.lookahead))
+        for name in set(self._pending).difference(window):
+            self._pending.pop(name).cancel()
+        for name in window:
+            if name not in self._pending:
+                self._pending[name] = self._executor.submit(self.loader, name)
+
+    def get(self, name: str) -> Any:
+        """
+        Return the loaded page for `name`, re-raising any error from loading it.
+        Pages that were not scheduled (e.g. retries) are loaded inline.
+
+        :param str name: Page name.
+
+        :return: Any
+        """
+        future = self._pending.pop(name, None)
+        if future is None:
+            return self.loader(name)
+        return future.result()
+
+    def close(self):
+        """Drop pages that were scheduled but never requested and stop the workers."""
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
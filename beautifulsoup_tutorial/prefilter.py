@@ -0,0 +1,69 @@
+"""Drop neighbor links that are unlikely to be relevant before their pages are loaded."""
+from typing import Iterable, List, MutableSet, Optional
+
+from beautifulsoup_tutorial.mediawiki import MediaWikiClient
+from beautifulsoup_tutorial.relevance import RelevanceScorer
+
+TITLE = "title"
+INTRO = "intro"
+
+
+class LinkPrefilter:
+    """
+    Cheap relevance check of page names before their full content is downloaded.
+
+    In TITLE mode a name is kept if the title itself has at least `threshold` of the keywords.
+    In INTRO mode names whose title passes are kept outright, and the others are kept if the
+    intro of their page does, with the intros loaded in batches from the MediaWiki API. Pages
+    the API doesn't know are kept, so loading them reports the error as usual.
+
+    A rejected name is remembered, so it costs nothing when other pages link to it again.
+    `skipped` counts the page loads saved, one per rejected name.
+    """
+
+    def __init__(
+        self,
+        scorer: RelevanceScorer,
+        mode: str = TITLE,
+        threshold: int = 1,
+        client: Optional[MediaWikiClient] = None,
+        rejected_set: Optional[MutableSet[str]] = None,
+    ):
+        """
+        :param RelevanceScorer scorer: Scorer whose keywords are looked for.
+        :param str mode: TITLE or INTRO.
+        :param int threshold: Number of distinct keywords a title or intro needs to be kept.
+        :param Optional[MediaWikiClient] client: Client loading the intros. Defaults to a new `MediaWikiClient`.
+        :param Optional[MutableSet[str]] rejected_set: Store for the rejected names. Defaults to a set.
+        """
+        if mode not in (TITLE, INTRO):
+            raise ValueError(f"Unknown prefilter mode: {mode}")
+        self.mode = mode
+        self.scorer = RelevanceScorer(scorer.keywords, threshold)
+        self.client = MediaWikiClient() if client is None and mode == INTRO else client
+        self.checked = 0
+        self.skipped = 0
+        self._rejected = rejected_set if rejected_set is not None else set()
+
+    def filter(self, names: Iterable[str]) -> List[str]:
+        """
+        Keep the names worth loading, in their original order.
+
+        :param Iterable[str] names: Page names not queued or seen yet.
+
+        :return: List[str]
+        """
+        names = [name for name in dict.fromkeys(names) if name not in self._rejected]
+        kept = {name for name in names if self.scorer.score(name).passed}
+        if self.mode == INTRO:
+            unsure = [name for name in names if name not in kept]
+            if unsure:
+                for name, intro in self.client.fetch_intros(unsure).items():
+                    if intro is None or self.scorer.score(intro).passed:
+                        kept.add(name)
+        self.checked += len(names)
+        for name in names:
+            if name not in kept:
+                self._rejected.add(name)
+                self.skipped += 1
+        return [name for name in names if name in kept]
@@ -0,0 +1,70 @@
+"""Persistent cache of model responses, so identical prompts are only paid for once."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+def prompt_key(model: str, system_message: str, prompt: str, temperature: float) -> str:
+    """
+    Hash of everything that determines a response.
+
+    :param str model: Model queried.
+    :param str system_message: System message sent before the prompt.
+    :param str prompt: User message.
+    :param float temperature: Sampling temperature.
+
+    :return: str
+    """
+    data = json.dumps([model, system_message, prompt, float(temperature)], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """SQLite store of responses by `prompt_key`, with hit and miss counts. Safe to share between threads."""
+
+    def __init__(self, path: str):
+        """
+        :param str path: SQLite database file, created if it doesn't exist.
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, model TEXT, response TEXT, created_at REAL)"
+            " WITHOUT ROWID"
+        )
+        self.conn.commit()
+
+    def get(self, model: str, system_message: str, prompt: str, temperature: float) -> Optional[str]:
+        """
+        Look up the response to a prompt.
+
+        :return: Optional[str]
+        """
+        key = prompt_key(model, system_message, prompt, temperature)
+        with self._lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def put(self, model: str, system_message: str, prompt: str, temperature: float, response: str):
+        """Store the response to a prompt."""
+        key = prompt_key(model, system_message, prompt, temperature)
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)", (key, model, response, time.time())
+            )
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
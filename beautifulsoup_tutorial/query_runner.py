@@ -0,0 +1,157 @@
+"""Send many chat completion requests concurrently, with a bounded number in flight."""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AuthenticationError,
+    InternalServerError,
+    OpenAI,
+    PermissionDeniedError,
+    RateLimitError,
+)
+
+from beautifulsoup_tutorial.prompt_cache import PromptCache
+from beautifulsoup_tutorial.ratelimit import TokenBucket
+from beautifulsoup_tutorial.retry import ABORT, RETRYABLE, SKIP, RetryPolicy
+
+
+def classify_openai_error(error: BaseException) -> str:
+    """
+    Classify an error raised by a chat completion request.
+
+    :param BaseException error: Error raised by the request.
+
+    :returns: str
+    """
+    if isinstance(error, (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)):
+        return RETRYABLE
+    if isinstance(error, (AuthenticationError, PermissionDeniedError)):
+        # Every other request would fail the same way
+        return ABORT
+    return SKIP
+
+
+def openai_retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds the API asked to wait before retrying, from the `Retry-After` header of a rate limited response.
+
+    :param BaseException error: Error raised by the request.
+
+    :returns: Optional[float]
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class QueryRunner:
+    """
+    Query a chat model for many prompts on a pool of threads.
+
+    At most `max_in_flight` requests run at once and only as many prompts are pulled from
+    the input, so arbitrarily long prompt streams use bounded memory. Rate limited and
+    transient failures are retried with `retry_policy`, honoring `Retry-After`. With a
+    `cache`, prompts answered before are served from it without a request.
+    """
+
+    def __init__(
+        self,
+        client: OpenAI,
+        model: str,
+        system_message: str,
+        temperature: float = 0,
+        max_in_flight: int = 8,
+        retry_policy: Optional[RetryPolicy] = None,
+        rate_limiter: Optional[TokenBucket] = None,
+        cache: Optional[PromptCache] = None,
+    ):
+        """
+        :param OpenAI client: Client for the OpenAI-compatible API, e.g. with `base_url` pointing at a local server.
+        :param str model: Model to query.
+        :param str system_message: System message sent before every prompt.
+        :param float temperature: Sampling temperature.
+        :param int max_in_flight: Max number of requests running at once.
+        :param Optional[RetryPolicy] retry_policy: Policy retrying failed requests.
+        :param Optional[TokenBucket] rate_limiter: Limiter to take a token from before each request.
+        :param Optional[PromptCache] cache: Cache of responses to check before querying and store to after.
+        """
+        self.client = client
+        self.model = model
+        self.system_message = system_message
+        self.temperature = temperature
+        self.max_in_flight = max(1, max_in_flight)
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=6, base_delay=1, budget=300, classify=classify_openai_error, retry_after=openai_retry_after
+        )
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+
+    def _create(self, prompt: str) -> str:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": self.system_message},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=self.temperature,
+        )
+        return response.choices[0].message.content
+
+    def query(self, prompt: str) -> str:
+        """
+        Query the model for one prompt, retrying failed requests.
+
+        :param str prompt: User message.
+
+        :return: str response content
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.model, self.system_message, prompt, self.temperature)
+            if cached is not None:
+                return cached
+        response = self.retry_policy.call(self._create, prompt)
+        if self.cache is not None:
+            self.cache.put(self.model, self.system_message, prompt, self.temperature, response)
+        return response
+
+    def run(self, items: Iterable[Dict[str, Any]]) -> Iterator[Tuple[Dict[str, Any], Union[str, Exception]]]:
+        """
+        Query the model for each item's `"prompt"`, yielding results as they complete.
+
+        Items that failed are yielded with their error. An error classified as ABORT is
+        raised instead, after the requests already in flight have finished.
+
+        :param Iterable[Dict[str, Any]] items: Items holding a `"prompt"`, passed back along with their result.
+
+        :return: Iterator[Tuple[Dict[str, Any], Union[str, Exception]]] of (item, response content or error)
+        """
+        items = iter(items)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as executor:
+            in_flight = {}
+            exhausted = False
+            while True:
+                while not exhausted and len(in_flight) < self.max_in_flight:
+                    item = next(items, None)
+                    if item is None:
+                        exhausted = True
+                    else:
+                        in_flight[executor.submit(self.query, item["prompt"])] = item
+                if not in_flight:
+                    return
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = in_flight.pop(future)
+                    error = future.exception()
+                    if error is not None and self.retry_policy.classify(error) == ABORT:
+                        exhausted = True
+                        wait(in_flight)
+                        raise error
+                    yield item, error if error is not None else future.result()
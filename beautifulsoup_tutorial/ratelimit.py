@@ -0,0 +1,70 @@
+"""Token-bucket rate limiting shared by every request to Wikipedia."""
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Allow `rate` requests per second on average, with bursts of up to `burst` requests.
+
+    Safe to share between threads and asyncio tasks: callers reserve their token under a
+    lock and then sleep outside of it, so waiters are served in the order they arrived.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None):
+        """
+        :param Optional[float] rate: Requests per second, or None for no limit.
+        :param Optional[int] burst: Bucket size. Defaults to one second's worth of requests.
+        """
+        self._lock = threading.Lock()
+        self.configure(rate, burst)
+
+    def configure(self, rate: Optional[float], burst: Optional[int] = None):
+        """
+        Change the rate and burst size, starting from a full bucket.
+
+        :param Optional[float] rate: Requests per second, or None for no limit.
+        :param Optional[int] burst: Bucket size. Defaults to one second's worth of requests.
+        """
+        with self._lock:
+            self.rate = rate
+            self.burst = burst if burst is not None else max(1, int(rate or 1))
+            self._tokens = float(self.burst)
+            self._updated = time.monotonic()
+
+    def _reserve(self, tokens: int) -> float:
+        """Take tokens, going into debt if needed, and return how long to wait for them."""
+        if not self.rate:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self, tokens: int = 1):
+        """
+        Block until `tokens` requests may be made.
+
+        :param int tokens: Number of requests about to be made.
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 1):
+        """
+        Wait, without blocking the event loop, until `tokens` requests may be made.
+
+        :param int tokens: Number of requests about to be made.
+        """
+        wait = self._reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+
+# One bucket for all crawl workers, since they all hit the same upstream
+wikipedia_rate_limiter = TokenBucket()
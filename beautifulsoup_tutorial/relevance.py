@@ -0,0 +1,67 @@
+"""Score how law-related a piece of text is."""
+from typing import Dict, Iterable, NamedTuple
+
+LAW_KEYWORDS = [
+    "law",
+    "legal",
+    "statute",
+    "legislative",
+    "judicial",
+    "legislation",
+    "legislature",
+    "government",
+    "court",
+    "due process",
+    "jurisprudence",
+    "jury",
+    "tribunal",
+]
+
+
+class RelevanceScore(NamedTuple):
+    """Keyword hit counts for a text, the number of distinct keywords found and whether that meets the threshold."""
+
+    hits: Dict[str, int]
+    score: int
+    passed: bool
+
+
+class RelevanceScorer:
+    """
+    Match a list of keywords against a text, lowercased once.
+
+    Keywords are matched as case-insensitive substrings, the same as `text.lower().find(keyword)`,
+    each counted with `str.count`, which runs a fast substring search in C over the text.
+    """
+
+    def __init__(self, keywords: Iterable[str] = LAW_KEYWORDS, threshold: int = 2):
+        """
+        :param Iterable[str] keywords: Keywords to look for.
+        :param int threshold: Number of distinct keywords a text needs to pass.
+        """
+        self.keywords = [keyword.lower() for keyword in keywords]
+        self.threshold = threshold
+
+    def score(self, text: str) -> RelevanceScore:
+        """
+        Count keyword hits in a text.
+
+        :param str text: Text to score.
+
+        :return: RelevanceScore
+        """
+        text = text.lower()
+        hits = {keyword: text.count(keyword) for keyword in self.keywords}
+        score = sum(1 for count in hits.values() if count)
+        return RelevanceScore(hits, score, score >= self.threshold)
+
+    def matches_any(self, text: str) -> bool:
+        """
+        Check whether a text contains at least one keyword.
+
+        :param str text: Text to check.
+
+        :return: bool
+        """
+        text = text.lower()
+        return any(keyword in text for keyword in self.keywords)
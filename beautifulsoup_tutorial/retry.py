@@ -0,0 +1,152 @@
+"""Retry failed requests with jittered exponential backoff."""
+import heapq
+import itertools
+import random
+import time
+from typing import Any, Callable, Optional, Tuple
+
+from requests.exceptions import ConnectionError
+from wikipedia.exceptions import DisambiguationError, PageError
+
+# How a failed request should be handled
+RETRYABLE = "retryable"  # Transient, worth trying again later
+SKIP = "skip"  # The page itself is unusable, move on without it
+ABORT = "abort"  # Stop crawling altogether
+
+
+def classify_error(error: BaseException) -> str:
+    """
+    Classify an error raised while loading a page.
+
+    :param BaseException error: Error raised by the request.
+
+    :returns: str
+    """
+    if isinstance(error, (PageError, DisambiguationError)):
+        return SKIP
+    if isinstance(error, ConnectionError) and str(error).find("Connection reset by peer") != -1:
+        # Wikipedia has stopped talking to us
+        return ABORT
+    return RETRYABLE
+
+
+class RetryPolicy:
+    """
+    Retry a call on retryable errors, sleeping a random ("full jitter") delay of up to
+    `base_delay * 2 ** attempt` seconds between attempts, capped at `max_delay`, or longer
+    if the server asked for it. Gives up after `max_attempts` calls or once the delays
+    would exceed `budget` seconds.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 2,
+        max_delay: float = 60,
+        budget: float = 60,
+        classify: Callable[[BaseException], str] = classify_error,
+        retry_after: Optional[Callable[[BaseException], Optional[float]]] = None,
+    ):
+        """
+        :param int max_attempts: Maximum number of calls.
+        :param float base_delay: Delay ceiling in seconds after the first failure.
+        :param float max_delay: Largest delay in seconds between two calls.
+        :param float budget: Total seconds allowed for sleeping between calls.
+        :param Callable classify: Function classifying errors as RETRYABLE, SKIP or ABORT.
+        :param Optional[Callable] retry_after: Function returning the seconds an error asks to wait, if any.
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.classify = classify
+        self.retry_after = retry_after
+
+    def delay(self, attempt: int) -> float:
+        """
+        Seconds to wait after the given (0-based) failed attempt.
+
+        :param int attempt: Number of failed attempts so far, minus one.
+
+        :returns: float
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call `fn`, retrying retryable errors. The last error is raised once retries run out.
+
+        :param Callable fn: Function to call.
+
+        :returns: Any
+        """
+        slept = 0.0
+        for attempt in itertools.count():
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if self.classify(e) != RETRYABLE or attempt + 1 >= self.max_attempts:
+                    raise
+                wait = self.delay(attempt)
+                if self.retry_after is not None:
+                    wait = max(wait, self.retry_after(e) or 0)
+                if slept + wait > self.budget:
+                    raise
+                print(f"{type(e).__name__}: {e}. Retrying in {wait:.1f} seconds...")
+                time.sleep(wait)
+                slept += wait
+
+
+class DeferredRetryQueue:
+    """
+    Pages that failed with a retryable error, parked until their backoff delay has passed
+    so the crawl can keep going in the meantime.
+    """
+
+    def __init__(self, policy: RetryPolicy, max_deferrals: int = 3):
+        """
+        :param RetryPolicy policy: Policy giving the delay before each deferred retry.
+        :param int max_deferrals: Number of times a page may be deferred before giving up on it.
+        """
+        self.policy = policy
+        self.max_deferrals = max_deferrals
+        # Heap of (ready time, insertion order, name, times deferred)
+        self._heap = []
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __bool__(self) -> bool:
+        return bool(self._heap)
+
+    def defer(self, name: str, deferrals: int = 0) -> Optional[float]:
+        """
+        Park a page for a later retry.
+
+        :param str name: Page name.
+        :param int deferrals: Number of times the page was already deferred.
+
+        :returns: Optional[float] seconds until the retry, or None if the page has been deferred too often.
+        """
+        if deferrals >= self.max_deferrals:
+            return None
+        wait = self.policy.delay(deferrals)
+        heapq.heappush(self._heap, (time.monotonic() + wait, next(self._counter), name, deferrals + 1))
+        return wait
+
+    def pop_ready(self) -> Optional[Tuple[str, int]]:
+        """
+        Pop a page whose delay has passed.
+
+        :returns: Optional[Tuple[str, int]] of the page name and the times it was deferred.
+        """
+        if self._heap and self._heap[0][0] <= time.monotonic():
+            _, _, name, deferrals = heapq.heappop(self._heap)
+            return name, deferrals
+        return None
+
+    def wait_until_ready(self):
+        """Sleep until the earliest parked page may be retried."""
+        if self._heap:
+            time.sleep(max(0.0, self._heap[0][0] - time.monotonic()))
@@ -0,0 +1,60 @@
+"""Split the plain-text content of a Wikipedia article into sections."""
+import io
+from typing import Iterator, List, Tuple
+
+# Stop at these h2 sections, which only hold links to outside sources
+STOP_SECTIONS = ("References", "Notes")
+
+
+def heading_level(line: str) -> int:
+    """
+    Return the heading level (2-6) of a line of `WikipediaPage.content`, or 0 for body text.
+    Headings look like "== Header ==", with one "=" per level.
+
+    :param str line: Line of article content.
+
+    :returns: int
+    """
+    for level in range(6, 1, -1):
+        if line.find("=" * level + " ") != -1:
+            return level
+    return 0
+
+
+def iter_sections(content: str, title: str) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily split article content into `(header_path, description)` records.
+
+    `header_path` joins the enclosing headings with " - ", or is the article title for the
+    text before the first heading. `description` is the section text joined onto one line.
+    A record is yielded at every heading, and for the trailing section if it has any text.
+    Parsing stops at a "References" or "Notes" section.
+
+    :param str content: Article content, as in `WikipediaPage.content`.
+    :param str title: Article title.
+
+    :returns: Iterator[Tuple[str, str]]
+    """
+    # Enclosing headings as (level, header), outermost first
+    headings: List[Tuple[int, str]] = []
+    description: List[str] = []
+    for line in io.StringIO(content):
+        text = line.rstrip("\n")
+        level = heading_level(text)
+        if level == 0:
+            description.append(text)
+            continue
+        yield _header_path(headings, title), " ".join(description).strip()
+        header = text.strip().strip("=").strip()
+        while headings and headings[-1][0] >= level:
+            headings.pop()
+        headings.append((level, header))
+        description = []
+        if level == 2 and any(header.find(stop) != -1 for stop in STOP_SECTIONS):
+            return
+    if description:
+        yield _header_path(headings, title), " ".join(description).strip()
+
+
+def _header_path(headings: List[Tuple[int, str]], title: str) -> str:
+    return " - ".join(header for _, header in headings if header) or title
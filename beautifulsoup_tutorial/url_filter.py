@@ -0,0 +1,149 @@
+"""Decide which Wikipedia URLs, page titles and links are worth crawling, from a declarative list of rules."""
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional
+
+# Each rule is a kind and the values it rejects:
+# - namespaces: page namespaces, e.g. "Category" rejects ".../wiki/Category:Law" and the title "Category:Law"
+# - extensions: file extensions at the end of the URL, without the dot
+# - prefixes: strings the URL starts with
+# - contains: substrings of the URL
+# - icontains: substrings of the URL, ignoring case
+# - regex: regular expressions searched for in the URL
+# - text_contains: substrings of a link's text, ignoring case, for `accepts_link`
+DEFAULT_RULES: List[Dict[str, Any]] = [
+    {
+        "kind": "namespaces",
+        "values": ["File", "Wikipedia", "Template", "Template_talk", "Help", "Category", "Talk", "User", "User_talk"],
+    },
+    {"kind": "contains", "values": ["Special:Contributions"]},
+    # Edit links, and any page with "edit" in its name
+    {"kind": "icontains", "values": ["edit"]},
+    {"kind": "extensions", "values": ["svg", "jpg", "png", "js", "mp3", "mp4"]},
+    # Links to a part of the same page
+    {"kind": "prefixes", "values": ["#"]},
+    # Links outside of wikipedia
+    {"kind": "regex", "values": [r"^http(?!.*wikipedia\.org)"]},
+    {"kind": "text_contains", "values": ["edit", "improve this article"]},
+]
+
+RULE_KINDS = ("namespaces", "extensions", "prefixes", "contains", "icontains", "regex", "text_contains")
+
+_NAMESPACE_SEPARATOR = re.compile(r"[/:]")
+
+
+def namespace_of(url: str) -> Optional[str]:
+    """
+    Namespace of the page a URL or page title points to, e.g. "Category" for ".../wiki/Category:Law",
+    with spaces written as underscores. None for articles.
+
+    :param str url: Page URL, or page title.
+
+    :return: Optional[str]
+    """
+    idx = url.find("/wiki/")
+    if idx != -1:
+        name = url[idx + 6 :]
+    elif url.startswith(("http", "/")):
+        return None
+    else:
+        name = url
+    # Only a colon before the first "/" separates a namespace
+    separator = _NAMESPACE_SEPARATOR.search(name)
+    if separator is None or separator.group() != ":":
+        return None
+    return name[: separator.start()].replace(" ", "_")
+
+
+class UrlFilter:
+    """
+    Reject URLs and page titles matching any of a list of rules, checked in one pass per URL.
+
+    The rules are compiled once: namespaces and extensions become sets looked up with the
+    part of the URL they apply to, and every substring, prefix and regex rule is folded into
+    a single regular expression.
+    """
+
+    def __init__(self, rules: Iterable[Dict[str, Any]] = DEFAULT_RULES):
+        """
+        :param Iterable[Dict[str, Any]] rules: Rules as `{"kind": ..., "values": [...]}`, kinds being in `RULE_KINDS`.
+        """
+        self.namespaces = set()
+        self.extensions = set()
+        patterns = []
+        text_patterns = []
+        for rule in rules:
+            kind, values = rule["kind"], rule["values"]
+            if kind == "namespaces":
+                self.namespaces.update(value.replace(" ", "_") for value in values)
+            elif kind == "extensions":
+                self.extensions.update(value.lstrip(".").lower() for value in values)
+            elif kind == "prefixes":
+                patterns.extend(f"^{re.escape(value)}" for value in values)
+            elif kind == "contains":
+                patterns.extend(re.escape(value) for value in values)
+            elif kind == "icontains":
+                patterns.extend(f"(?i:{re.escape(value)})" for value in values)
+            elif kind == "regex":
+                patterns.extend(f"(?:{value})" for value in values)
+            elif kind == "text_contains":
+                text_patterns.extend(re.escape(value) for value in values)
+            else:
+                raise ValueError(f"Unknown url filter rule kind: {kind}. Expected one of {RULE_KINDS}")
+        self._pattern = re.compile("|".join(patterns)) if patterns else None
+        self._text_pattern = re.compile("|".join(text_patterns), re.IGNORECASE) if text_patterns else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "UrlFilter":
+        """
+        Load the rules from a JSON file holding a list of `{"kind": ..., "values": [...]}` rules.
+
+        :param str path: Rules file.
+
+        :return: UrlFilter
+        """
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def accepts(self, url: str) -> bool:
+        """
+        :param str url: Page URL, relative URL or page title.
+
+        :return: bool
+        """
+        if self._pattern is not None and self._pattern.search(url):
+            return False
+        if self.extensions:
+            dot = url.rfind(".")
+            if dot != -1 and url[dot + 1 :].lower() in self.extensions:
+                return False
+        return not self.namespaces or namespace_of(url) not in self.namespaces
+
+    def accepts_link(self, href: Optional[str], text: str = "") -> bool:
+        """
+        Check an `<a>` tag's target and text.
+
+        :param Optional[str] href: Link target, None for a tag without one.
+        :param str text: Link text.
+
+        :return: bool
+        """
+        if href is None:
+            return False
+        if self._text_pattern is not None and self._text_pattern.search(text):
+            return False
+        return self.accepts(href)
+
+    def filter_many(self, urls: Iterable[str]) -> List[str]:
+        """
+        Keep the accepted URLs or page titles, e.g. of a page's links, in their original order.
+
+        :param Iterable[str] urls: Page URLs or titles.
+
+        :return: List[str]
+        """
+        accepts = self.accepts
+        return [url for url in urls if accepts(url)]
+
+
+default_url_filter = UrlFilter()
@@ -0,0 +1,66 @@
+"""Load Wikipedia pages for the crawlers in `search_scrape.py`."""
+from typing import List, Optional, Union
+
+import wikipedia
+
+from beautifulsoup_tutorial.page_cache import CachedPage, PageCache
+from beautifulsoup_tutorial.ratelimit import wikipedia_rate_limiter
+
+_wiki_request = wikipedia.wikipedia._wiki_request
+
+
+def _throttled_wiki_request(params):
+    """Take a token from `wikipedia_rate_limiter`, then make the request."""
+    wikipedia_rate_limiter.acquire()
+    return _wiki_request(params)
+
+
+# Every request the library makes goes through `_wiki_request`, including title searches,
+# redirect and disambiguation lookups and the continuation pages of `links`
+wikipedia.wikipedia._wiki_request = _throttled_wiki_request
+
+
+def load_wikipedia_page(
+    name: str,
+    auto_suggest: bool = True,
+    cache: Optional[PageCache] = None,
+) -> Union[wikipedia.WikipediaPage, CachedPage]:
+    """
+    Load a Wikipedia page by name.
+
+    `WikipediaPage` fetches `content`, `sections` and `links` lazily. They are fetched here,
+    so that a prefetching worker thread pays for those requests instead of the crawl loop.
+    Each request takes a token from `wikipedia_rate_limiter`.
+
+    With a `cache`, a cached copy of the page is returned without touching the network.
+    Pages missing from it are loaded in full and stored before being returned.
+
+    :param str name: Title of the article to load.
+    :param bool auto_suggest: Let Wikipedia suggest a matching title.
+    :param Optional[PageCache] cache: Cache to look the page up in and store it to.
+
+    :return: Union[wikipedia.WikipediaPage, CachedPage]
+    """
+    if cache is not None:
+        cached = cache.get(name)
+        if cached is not None:
+            return cached
+    page = wikipedia.page(name, auto_suggest=auto_suggest)
+    page.content
+    page.sections
+    page.links
+    if cache is not None:
+        return cache.put(page, keys=(name,))
+    return page
+
+
+def search_wikipedia(query: str, results: int = 10) -> List[str]:
+    """
+    Search Wikipedia for page titles.
+
+    :param str query: Search query.
+    :param int results: Max number of titles to return.
+
+    :return: List[str]
+    """
+    return wikipedia.search(query, results=results)
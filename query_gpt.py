@@ -1,87 +1,207 @@
 import os,sys
 import argparse
+import json
+import datetime
 
 # import the OpenAI Python library for calling the OpenAI API
 from openai import OpenAI
 import os
 
-def has_keyword(check: str, keywords: list):
-	for key in keywords:
-		if check.find(key) != -1:
-			return True
-	return False
+from beautifulsoup_tutorial.corpus_reader import iter_corpus, list_corpus_files
+from beautifulsoup_tutorial.batch_query import LocalBatchSubmitter, OpenAIBatchSubmitter, SubmittedBatches, collect_batch, \
+	write_batch_files
+from beautifulsoup_tutorial.ledger import DONE, FAILED, ProgressLedger
+from beautifulsoup_tutorial.prompt_cache import PromptCache, prompt_key
+from beautifulsoup_tutorial.query_runner import QueryRunner
+from beautifulsoup_tutorial.ratelimit import TokenBucket
+from beautifulsoup_tutorial.relevance import LAW_KEYWORDS, RelevanceScorer
 
-KEYWORDS = ["law", "legal", "statute", "legislative", "judicial", "legislation", "legislature", "government", "court", "due process", "jurisprudence", "jury", "tribunal"]
+# Same keywords and matcher as the scraper's law relevance check
+KEYWORDS = LAW_KEYWORDS
+KEYWORD_SCORER = RelevanceScorer(KEYWORDS)
+SYSTEM_MESSAGE = "You are a law topic generator"
 
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY", "<OpenAI API key>"))
+def has_keyword(check: str, scorer: RelevanceScorer = KEYWORD_SCORER):
+	return scorer.matches_any(check)
+
+def iter_prompts(records):
+	"""
+	Go through each section record of the scraped articles and yield a prompt for every section that relates to law
+	Each prompt comes as a dict with the file, line number, title and header it was built from
+	"""
+	prev_title = None
+	for record in records:
+		if record.title != prev_title:
+			print(f"Going through article: {record.title} in {record.file}")
+			title_is_law = has_keyword(record.title)
+			prev_title = record.title
+		# Query
+		header, description = record.header_path, record.description
+		if title_is_law or has_keyword(header) or has_keyword(description):
+			prompt = f"Generate law topics under \"{record.title}\""
+
+			if record.section > 0:
+				# Not the first section
+				headers = header.split(" - ")
+				for i in range(len(headers)):
+					if i == len(headers) - 1:
+						# The most specfic subheader
+						prompt += f", specifically related to \"{headers[i]}\""
+					else:
+						prompt += f" under \"{headers[i]}\""
+			if description.strip() != "":
+				# Make sure description is not empty
+				prompt += f" given this short description: \"{description.strip()}\""
+			yield {"file": record.file, "line": record.line, "title": record.title, "header": header, "prompt": prompt}
 
 parser = argparse.ArgumentParser(description='Pass args for querying GPT')
 parser.add_argument("--model", default="gpt-3.5-turbo", type=str,
 	help="Model to query")
 parser.add_argument('--data_path', default="./scraped_wiki_article_data", type=str,
-	help="path to directory of scraped files")
+	help="path to directory of scraped files, article text files or JSONL shards")
 parser.add_argument("--single_file", default=None, type=str,
 	help="Option to pass in a single file in data_path to prompt with instead of all files in the directory")
+parser.add_argument("--max_files", default=None, type=int,
+	help="Max number of files to go through. All files by default")
+parser.add_argument("--output", default=None, type=str,
+	help="JSONL file the responses are appended to as they come in. Defaults to <data_path>/topics_<model>.jsonl")
+parser.add_argument("--concurrency", default=8, type=int,
+	help="Max number of requests to the model in flight at once")
+parser.add_argument("--requests_per_second", default=None, type=float,
+	help="Max average rate of requests to the model. No limit by default")
+parser.add_argument("--base_url", default=None, type=str,
+	help="Base URL of an OpenAI-compatible API to query instead of OpenAI, e.g. a local server")
+parser.add_argument("--prompt_cache", default=None, type=str,
+	help="SQLite file of cached responses, checked before querying. Defaults to <data_path>/prompt_cache.sqlite3")
+parser.add_argument("--no_prompt_cache", action="store_true",
+	help="Always query the model, without reading or filling the prompt cache")
+parser.add_argument("--batch", action="store_true",
+	help="Send the prompts as Batch API jobs of at most 50,000 requests and 200 MB each, poll until they are done and merge " \
+		"the results back by file and line. Batches submitted by an interrupted run are collected when it is restarted")
+parser.add_argument("--local_batch", action="store_true",
+	help="With --batch, run the batch right away through --base_url instead of the Batch API")
+parser.add_argument("--poll_interval", default=60, type=float,
+	help="Seconds between checks on a submitted batch")
+parser.add_argument("--ledger", default=None, type=str,
+	help="Progress ledger of completed prompts, skipped when the run is restarted. Defaults to <output>.progress.jsonl")
+parser.add_argument("--partition", default=0, type=int,
+	help="Partition of the corpus files to go through, to split a run between --num_partitions processes")
+parser.add_argument("--num_partitions", default=1, type=int,
+	help="Number of partitions the corpus files are split into")
+parser.add_argument("--mmap", action="store_true",
+	help="Read the corpus files through memory maps")
 args = parser.parse_args()
 print(args)
 
-file_count = 0
+# Retries are handled by the query runner, which backs off on rate limits
+client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY", "<OpenAI API key>"), base_url=args.base_url, max_retries=0)
+rate_limiter = TokenBucket(args.requests_per_second) if args.requests_per_second else None
+# Identical prompts answered in earlier runs are served from the cache
+prompt_cache = None
+if not args.no_prompt_cache:
+	prompt_cache = PromptCache(args.prompt_cache or os.path.join(args.data_path, "prompt_cache.sqlite3"))
+runner = QueryRunner(client, args.model, SYSTEM_MESSAGE, temperature=0, max_in_flight=args.concurrency, rate_limiter=rate_limiter, \
+	cache=prompt_cache)
+
 if args.single_file is not None:
 	all_files = [args.single_file]
 else:
-	all_files = os.listdir(args.data_path)
+	# Only the article files or shards, not the responses and cache written next to them
+	all_files = list_corpus_files(args.data_path)
+if args.max_files is not None:
+	all_files = all_files[:args.max_files]
+records = iter_corpus(args.data_path, all_files, partition=args.partition, num_partitions=args.num_partitions, use_mmap=args.mmap)
+
+def collect_submitted(submitter, submitted: SubmittedBatches, batch_id: str, items_path: str):
+	"""
+	Yield the results of a submitted batch once it is done, caching the responses, then log it as collected
+	"""
+	for item, response in collect_batch(submitter, batch_id, items_path, poll_interval=args.poll_interval):
+		if prompt_cache is not None and not isinstance(response, Exception):
+			prompt_cache.put(args.model, SYSTEM_MESSAGE, item["prompt"], 0, response)
+		yield item, response
+	submitted.record_collected(batch_id)
 
-for file in all_files:
-	if file_count == 5:
-		break
-	line_num = 0
-	index = file.find(".txt")
-	title = file[:index].replace("_", " ")
+def query_batch(items):
+	"""
+	Answer cached prompts from the prompt cache and send the rest in batches under the Batch API's limits
+	Batch ids are saved as they are submitted, so a restarted run polls the batches it already paid for instead of
+	submitting them again. Those are collected first, so the ledger has their prompts as done before the corpus is read
+	Yields (item, response or error) like QueryRunner.run
+	"""
+	if args.local_batch:
+		# Uncached prompts reach the submitter already looked up, and are cached once collected, so its runner skips the cache
+		submitter = LocalBatchSubmitter(QueryRunner(client, args.model, SYSTEM_MESSAGE, temperature=0, \
+			max_in_flight=args.concurrency, rate_limiter=rate_limiter))
+	else:
+		submitter = OpenAIBatchSubmitter(client)
+	submitted = SubmittedBatches(output_path + ".batches.jsonl")
+	for batch_id, items_path in submitted.pending():
+		print(f"Collecting batch {batch_id} submitted by an earlier run")
+		yield from collect_submitted(submitter, submitted, batch_id, items_path)
+	uncached = []
+	for item in items:
+		cached = prompt_cache.get(args.model, SYSTEM_MESSAGE, item["prompt"], 0) if prompt_cache is not None else None
+		if cached is not None:
+			yield item, cached
+		else:
+			uncached.append(item)
+	batch_time = datetime.datetime.now()
+	path_prefix = os.path.join(os.path.dirname(output_path) or ".", f"batch_{batch_time.strftime('%Y_%m_%d_%H_%M_%S')}")
+	for input_path, items_path in write_batch_files(uncached, path_prefix, args.model, SYSTEM_MESSAGE, temperature=0):
+		batch_id = submitter.submit(input_path)
+		submitted.record_submitted(batch_id, items_path)
+		print(f"Submitted batch {batch_id} from {os.path.basename(input_path)}")
+	for batch_id, items_path in submitted.pending():
+		yield from collect_submitted(submitter, submitted, batch_id, items_path)
+	submitted.close()
 
-	print(f"Going through file: {file}")
-	# Read in the textfile
-	title_is_law = has_keyword(file, KEYWORDS)
-	with open(os.path.join(args.data_path, file), "r") as f:
-		# Go through each line
-		for line in f:
-			if line_num == 0:
-				# Get the proper title
-				title = line.split("\t")[0]
-			# Query
-			if title_is_law or has_keyword(line, KEYWORDS):
-				header, description = line.split("\t")
-				print(f"Querying {args.model} with line: {line}")
-				prompt = f"Generate law topics under \"{title}\""
+def iter_pending(prompts, ledger: ProgressLedger):
+	"""
+	Skip the prompts the ledger has as done in an earlier run, tagging the rest with their prompt hash
+	"""
+	global skip_count
+	for item in prompts:
+		item["prompt_hash"] = prompt_key(args.model, SYSTEM_MESSAGE, item["prompt"], 0)
+		if ledger.is_done(item["file"], item["line"], item["prompt_hash"]):
+			skip_count += 1
+			continue
+		yield item
 
-				if line_num > 0:
-					# Not the first line
-					headers = header.split(" - ")
-					for i in range(len(headers)):
-						if i == len(headers) - 1:
-							# The most specfic subheader
-							prompt += f", specifically related to \"{headers[i]}\""
-						else:
-							prompt += f" under \"{headers[i]}\""
-				if description.strip() != "":
-					# Make sure description is not empty
-					prompt += f" given this short description: \"{description.strip()}\""
-				
-				# Query the model
-				print(f"Prompt: {prompt}")
-				response = client.chat.completions.create(
-				    model=args.model,
-				    messages=[
-				        {"role": "system", "content": "You are a law topic generator"},
-				        {"role": "user", "content": f"{prompt}"},
-				    ],
-				    temperature=0,
-				)
-				# Get the response
-				print("Response:")
-				print(response.choices[0].message.content)
-				# break
-			line_num += 1
-	file_count += 1
-	# break
+output_name = f"topics_{args.model.replace('/', '-')}"
+if args.num_partitions > 1:
+	# One output per process, so appends from different partitions don't interleave
+	output_name += f"_part{args.partition}of{args.num_partitions}"
+output_path = args.output or os.path.join(args.data_path, output_name + ".jsonl")
+# Completed prompts are recorded as they come in, so a restarted run picks up where this one stopped
+ledger = ProgressLedger(args.ledger or output_path + ".progress.jsonl")
+print(f"Prompts completed in earlier runs: {len(ledger)}")
+query_count = 0
+failure_count = 0
+skip_count = 0
+prompts = iter_pending(iter_prompts(records), ledger)
+with open(output_path, "a") as output:
+	# Responses are written in the order they complete, keyed by file and line
+	for item, response in (query_batch(prompts) if args.batch else runner.run(prompts)):
+		record = {**item, "model": args.model}
+		if isinstance(response, Exception):
+			print(f"Failed to query {args.model} with prompt: {item['prompt']}. Error: {response}")
+			record["error"] = f"{type(response).__name__}: {response}"
+			failure_count += 1
+		else:
+			print(f"Prompt: {item['prompt']}")
+			print("Response:")
+			print(response)
+			record["response"] = response
+		output.write(json.dumps(record) + "\n")
+		output.flush()
+		# Only after the result is written, so a crash in between repeats the prompt rather than losing it
+		ledger.record(item["file"], item["line"], item["prompt_hash"], FAILED if isinstance(response, Exception) else DONE)
+		query_count += 1
+ledger.close()
 
-print(f"FINISHED QUERYING MODEL {args.model}")
\ No newline at end of file
+print(f"Number of prompts: {query_count}, failed: {failure_count}, skipped as done before: {skip_count}. Responses written to {output_path}")
+if prompt_cache is not None:
+	print(f"Prompt cache hits: {prompt_cache.hits}, misses: {prompt_cache.misses}")
+	prompt_cache.close()
+print(f"FINISHED QUERYING MODEL {args.model}")
@@ -1,17 +1,36 @@
 import argparse
-import io
 import re
 import os,sys
 import time
 import datetime
 import wikipedia
-from typing import Optional
-
-from beautifulsoup_tutorial.fetch import fetch_html_from_url
+from functools import partial
+from typing import Callable, MutableSet, Optional
+
+from beautifulsoup_tutorial.bloom import ScalableBloomFilter
+from beautifulsoup_tutorial.canonical import CanonicalIndex
+from beautifulsoup_tutorial.checkpoint import CrawlCheckpoint, load_seen
+from beautifulsoup_tutorial.coordinator import CoordinatorServer, SQLiteCoordinator, open_coordinator
+from beautifulsoup_tutorial.corpus import CorpusWriter, ShardedCorpusWriter, TextCorpusWriter
+from beautifulsoup_tutorial.crawl_log import CrawlLogger
+from beautifulsoup_tutorial.fetch import FetchClient, default_client, fetch_html_from_url
+from beautifulsoup_tutorial.frontier import CrawlFrontier, DepthFirstCrawlFrontier, PriorityCrawlFrontier
+from beautifulsoup_tutorial.mediawiki import BatchPageLoader, MediaWikiClient
+from beautifulsoup_tutorial.page_cache import PageCache
+from beautifulsoup_tutorial.pipeline import ArticlePipeline, BackgroundWriter
+from beautifulsoup_tutorial.prefetch import PagePrefetcher
+from beautifulsoup_tutorial.prefilter import LinkPrefilter
+from beautifulsoup_tutorial.ratelimit import wikipedia_rate_limiter
+from beautifulsoup_tutorial.relevance import RelevanceScorer
+from beautifulsoup_tutorial.retry import ABORT, RETRYABLE, DeferredRetryQueue, RetryPolicy, classify_error
 from beautifulsoup_tutorial.scrape import *
+from beautifulsoup_tutorial.sections import iter_sections
+from beautifulsoup_tutorial.url_filter import UrlFilter, default_url_filter, namespace_of
+from beautifulsoup_tutorial.wiki import load_wikipedia_page, search_wikipedia
 
 from bs4 import BeautifulSoup, Comment, NavigableString
 
+import requests
 from requests.exceptions import ConnectionError
 from wikipedia.exceptions import DisambiguationError, PageError, RedirectError
 
@@ -19,6 +38,8 @@ URL = "https://en.wikipedia.org/wiki/List_of_areas_of_law"
 REDIRECTING_URL = "https://en.wikipedia.org/wiki/Corporate_compliance_law"
 ANOTHER_URL = "https://en.wikipedia.org/wiki/Category:Corporate_law"
 BASE_URL = "https://en.wikipedia.org"
+# Redirects remembered by the frontier with --seen_store bloom, beyond which the oldest are forgotten
+BLOOM_MAX_ALIASES = 100000
 
 def prepare_full_url(href: str) -> str:
 	if href.startswith("/"):
@@ -35,21 +56,16 @@ def is_href_in_neighbors(href: str, neighbors: list):
 	return False
 
 
-def identify_redirecting_urls(seen_urls: list, resp: Optional[str]):
+def identify_redirecting_urls(seen_urls: CanonicalIndex, resp: Optional[requests.Response]):
 	"""
 	If a url redirects to a url that was already seen before, mark it a true
+	Urls are compared in canonical form (no "#" fragment, absolute, decoded title) with one lookup in the index
+	resp is None when fetch_html_from_url couldn't load the url, which isn't a redirect
 	"""
-	for href in seen_urls:
-		if href.startswith("/"):
-			full_url = BASE_URL + href
-		else:
-			full_url = href
-		compare = remove_pound_from_urls(resp.url)
-		if compare == full_url or full_url.startswith(compare):
-			print("*****Detected redirected url*********")
-			print("full_url: ", full_url)
-			print("resp.url: ", resp.url)
-			return True
+	if resp is not None and seen_urls.has_url(resp.url):
+		print("*****Detected redirected url*********")
+		print("resp.url: ", resp.url)
+		return True
 	return False
 
 
@@ -69,94 +85,33 @@ def is_metadata_page(url: str):
 	"""
 	Find if url contains "/wiki/", then look for colon after that
 	"""
-	idx = url.find("/wiki/")
-	if idx == -1:
-		return False
-	else:
-		# Get substring starting from right after wiki
-		tokens_after_wiki = url[idx+6:].split("/")
-		if len(tokens_after_wiki) > 0 and tokens_after_wiki[0].find(":") != -1:
-			print(f"Found a metadata page!!! Filter out: {url}")
-			return True
-		else:
-			return False
-
-def filter_wikipedia_a_links(a: BeautifulSoup):
-	# Ignore a tags that don't have href
-	# Ignore "edit" urls and urls that point to part of the same page with "#"
-	# Ignore "improve this article" links
-	# Ignore urls with "File" that usually points to some asset like an image
-	# Ignore any urls that end with ".svg" or ".jpg", which are images
-	# Ignore urls that are about contributing to wikipedia, "Wikipedia:"
-	# Ignore template pages, "Template:"
-	# Ignore urls about help for setting up/writing wikipedia articles, "Help:"
-	# Ignore urls about categories, "Category:"
-	# Ignore urls about the quality of the articles for now, "Talk:"
-	# TODO: for now, ignore non-wikipedia urls
-	# and not is_metadata_page(a["href"]) \
-	return a.has_attr("href") and a.get_text().lower().find("edit") == -1 \
-	and a.get_text().lower().find("improve this article") == -1 \
-	and a["href"].find("File:") == -1 \
-	and a["href"].find("Wikipedia:") == -1 \
-	and a["href"].find("Template:") == -1 \
-	and a["href"].find("Template_talk:") == -1 \
-	and a["href"].find("Help:") == -1 \
-	and a["href"].find("Category:") == -1 \
-	and a["href"].find("Talk:") == -1 \
-	and a["href"].find("User:") == -1 \
-	and a["href"].find("User_talk:") == -1 \
-	and a["href"].find("Special:Contributions") == -1 \
-	and not a["href"].endswith(".svg") \
-	and not a["href"].endswith(".jpg") \
-	and not a["href"].endswith(".png") \
-	and not a["href"].endswith(".js") \
-	and not a["href"].endswith(".mp3") \
-	and not a["href"].endswith(".mp4") \
-	and not a["href"].startswith("#") \
-	and a["href"].lower().find("edit") == -1 \
-	and not (a["href"].startswith("http") and a["href"].find("wikipedia.org") == -1)
-
-
-def accepted_url(url: str):
-	# and not is_metadata_page(url) \
-	return url.find("File:") == -1 \
-	and url.find("Wikipedia:") == -1 \
-	and url.find("Template:") == -1 \
-	and url.find("Template_talk:") == -1 \
-	and url.find("Help:") == -1 \
-	and url.find("Category:") == -1 \
-	and url.find("Talk:") == -1 \
-	and url.find("User:") == -1 \
-	and url.find("User_talk:") == -1 \
-	and url.find("Special:Contributions") == -1 \
-	and url.lower().find("edit") == -1 \
-	and not url.endswith(".svg") \
-	and not url.endswith(".jpg") \
-	and not url.endswith(".png") \
-	and not url.endswith(".js") \
-	and not url.endswith(".mp3") \
-	and not url.endswith(".mp4") \
-	and not url.startswith("#") \
-	and not (url.startswith("http") and url.find("wikipedia.org") == -1)
-
-
-def get_headers_hierarchy(page: wikipedia.WikipediaPage):
+	if url.find("/wiki/") != -1 and namespace_of(url) is not None:
+		print(f"Found a metadata page!!! Filter out: {url}")
+		return True
+	return False
+
+def filter_wikipedia_a_links(a: BeautifulSoup, url_filter: UrlFilter = default_url_filter):
+	# Ignore a tags that don't have href, "edit" and "improve this article" links, urls in the filter's
+	# namespaces (File:, Wikipedia:, Template:, Help:, Category:, Talk:, User:...), images and other assets,
+	# urls that point to part of the same page with "#", and for now, non-wikipedia urls
+	return url_filter.accepts_link(a.get("href"), a.get_text())
+
+
+def accepted_url(url: str, url_filter: UrlFilter = default_url_filter):
+	return url_filter.accepts(url)
+
+
+def get_headers_hierarchy(page: wikipedia.WikipediaPage, client: FetchClient = default_client, \
+	retry_policy: RetryPolicy = RetryPolicy()):
 	# Attempt to get a hierarchy of headers
-	response = None
-	retry = 3
-	while (response is None):
-		if (retry == 0):
-			# Can't load page
-			print("3 tries. Unable to fetch/get the page for headers hierarchy. Returning empty list")
-			return []
-		try:
-			response = fetch_html_from_url(page.url)
-			html = BeautifulSoup(response.content, "html.parser")
-		except Exception as e:
-			print(f"Exception: {e}. Sleep for 300 seconds (5 minutes)...")
-			page = None
-			time.sleep(300)
-			retry -= 1
+	# The client's pooled session reuses the connection to wikipedia between pages
+	try:
+		response = retry_policy.call(client.fetch, page.url)
+		html = BeautifulSoup(response.content, "html.parser")
+	except Exception as e:
+		# Can't load page
+		print(f"Exception: {e}. Unable to fetch/get the page for headers hierarchy. Returning empty list")
+		return []
 
 	# Get the main content div
 	overall_div = get_wikipedia_page_main_content(html)
@@ -173,7 +128,7 @@ def get_headers_hierarchy(page: wikipedia.WikipediaPage):
 	header_strs_only = []
 	header_map_list = []
 	# Include the title in header_map_list to handle first text written out to file
-	header_map_list.append((title, []))
+	header_map_list.append((page.title, []))
 	prev_h2 = ""
 	prev_h3 = ""
 	prev_h4 = ""
@@ -208,139 +163,182 @@ def get_headers_hierarchy(page: wikipedia.WikipediaPage):
 	return header_map_list, header_strs_only
 
 
-def create_logger_name(date: datetime.datetime, data_path:str):
+def open_crawl_logger(args: argparse.Namespace) -> CrawlLogger:
+	"""
+	Open the crawl log under <data_path>/log, one subdirectory per day
+	Files are rotated by size and age so no single log grows without bound
+	"""
+	rotate_every = args.log_rotate_hours * 3600 if args.log_rotate_hours > 0 else None
+	logger = CrawlLogger(os.path.join(args.data_path, "log"), level=args.log_level,
+		max_bytes=int(args.log_max_mb * 1024 * 1024), rotate_every=rotate_every)
+	logger.info("Starting crawl", args=vars(args))
+	return logger
+
+
+def load_crawl_state(args: argparse.Namespace):
+	"""
+	Open the crawl checkpoint, copy into it the seen urls and page titles loaded from elsewhere, and collect the pending
+	page names to start from, with the depth and parent score they were queued with
+	Without --resume the checkpoint is emptied first, so it only holds the state of this run
+	The seen urls and titles are then read back from the checkpoint row by row, straight into the frontier's stores
+	"""
+	# Keep track of the seen urls from each page visit
+	seen_urls = []
+	if args.seen_urls is not None:
+		seen_urls = load_seen(args.seen_urls, "urls")
+		print(f"Have seen urls loaded. Total num: {len(seen_urls)}")
+
+	# Keep track of seen article titles from wikipedia.page.links
+	seen_page_titles = []
+	if args.seen_page_titles is not None:
+		seen_page_titles = load_seen(args.seen_page_titles, "titles")
+
+	if args.path_to_existing_articles is not None:
+		# Load the directory with files
+		for path in args.path_to_existing_articles:
+			files = os.listdir(path)
+			for file_name in files:
+				idx = file_name.find(".txt")
+				# Saved output files have spaces in article with underscore, replace / with hyphen
+				title = file_name[:idx].replace("_", " ")
+				# title2 = title + "_SeenUrls" + str(len(seen_urls)) + ".txt"
+				seen_page_titles.append(title)
+
+	checkpoint_path = args.checkpoint if args.checkpoint is not None else os.path.join(args.data_path, "crawl_checkpoint.sqlite3")
+	checkpoint = CrawlCheckpoint(checkpoint_path)
+	if not args.resume:
+		checkpoint.reset()
+	# Copy state loaded from elsewhere into the checkpoint so it's complete on its own
+	checkpoint.record_seen_many(seen_urls, seen_page_titles)
+	pending = []
+	if args.resume:
+		pending = checkpoint.pending_entries()
+		print(f"Resuming from checkpoint {checkpoint_path}. Pending pages: {len(pending)}")
+	return checkpoint, pending
+
+
+def open_corpus_writer(args: argparse.Namespace) -> CorpusWriter:
+	"""
+	Open the sink the accepted articles are written to
+	txt writes one file per article into <data_path>, jsonl and jsonl.gz append to shards in <data_path>/corpus
+	"""
+	if args.output_format == "txt":
+		return TextCorpusWriter(args.data_path)
+	return ShardedCorpusWriter(os.path.join(args.data_path, "corpus"), max_shard_bytes=int(args.shard_size_mb * 1024 * 1024),
+		compress=args.output_format == "jsonl.gz")
+
+
+def open_page_cache(args) -> Optional[PageCache]:
 	"""
-	Create logger path for the loggers during the DFS
+	Open the on-disk page cache, shared across runs so re-crawls with different settings skip the network
+	Defaults to <data_path>/page_cache, disabled with --no_page_cache
 	"""
-	return os.path.join(data_path, f"{date.year}_{date.month}_{date.day}_{date.hour}_log.txt")
+	if args.no_page_cache:
+		return None
+	cache_dir = args.page_cache or os.path.join(args.data_path, "page_cache")
+	ttl = args.page_cache_ttl_hours * 3600 if args.page_cache_ttl_hours > 0 else None
+	print(f"Using page cache at {cache_dir}")
+	return PageCache(cache_dir, max_bytes=int(args.page_cache_size_mb * 1024 * 1024), ttl=ttl)
 
 
-def create_log_dir(current_time: datetime.datetime, data_path: str):
-	log_dir = os.path.join(data_path, "log")
-	current_log_dir = os.path.join(log_dir, f"{current_time.year}-{current_time.month}-{current_time.day}")
-	return current_log_dir
+def open_name_store(args: argparse.Namespace) -> MutableSet[str]:
+	"""
+	In-memory store for page names the crawl only ever adds to, a Bloom filter of a few bytes per name with
+	--seen_store bloom
+	"""
+	if args.seen_store == "bloom":
+		return ScalableBloomFilter(capacity=args.bloom_capacity, error_rate=args.bloom_error_rate)
+	return set()
 
 
-def explore_page(name: str, seen_urls: list, seen_page_titles: set, data_path: str, logger: io.TextIOWrapper, \
-	prev_datetime: datetime.datetime, failure_counter: int):
+def open_seen_stores(args: argparse.Namespace):
 	"""
-	Retrieve all the content on the page
-	Prevent duplicates by verifying it's not in the seen_urls list
-	writer: io.TextIOWrapper
+	Stores for the frontier's seen urls and titles and the names it queued, along with the max number of redirects it
+	remembers. All None with --seen_store set, for the frontier's own sets
+	With --seen_store bloom, the seen urls and titles are Bloom filters mapped from <data_path>/seen_bloom. They are
+	rebuilt from the checkpoint on every run, which only records pages once they are done, so a page in progress
+	when a crawl stopped isn't taken for seen. The redirects remembered are capped, as they are full strings
 	"""
-	# Check if logger is open
-	if logger.closed:
-		print("Logger is closed. Opening up logger again")
-		current_time = datetime.datetime.now()
-		current_log_dir = create_log_dir(current_time, data_path)
-		current_log_path = create_logger_name(current_time, current_log_dir)
-		logger = open(current_log_path, "a")
-	# Load the web page
-	# Try loading page 3 times with 5 minute sleep. If not, then log as page that didn't get scraped
-	page = None
-	retry = 3
-	while (page is None):
-		if retry == 0:
-			# Can't scrape this page, log it and return
-			logger.write("$$$$$$$$$$$$$$ Retried 3 times, unable to scrape page: " + name + "\n")
-			print(f"Retried 3 times, unable to scrape page {name}. Returning")
-			failure_counter += 1 # TODO: since this is an int, this won't update in recursive calls...
-			# Also maybe should keep track of the urls that have failed to load multiple times
-			return failure_counter, logger, ""
+	if args.seen_store != "bloom":
+		return None, None, None, None
+	bloom_dir = os.path.join(args.data_path, "seen_bloom")
+	os.makedirs(bloom_dir, exist_ok=True)
+	url_set, title_set = (ScalableBloomFilter(os.path.join(bloom_dir, kind), capacity=args.bloom_capacity, \
+		error_rate=args.bloom_error_rate, reset=True) for kind in ("urls", "titles"))
+	return url_set, title_set, open_name_store(args), BLOOM_MAX_ALIASES
+
+
+def load_page(name: str, loader: Callable[..., wikipedia.WikipediaPage], logger: CrawlLogger, \
+	fallback: Optional[Callable[..., wikipedia.WikipediaPage]] = None):
+	"""
+	Load a page with the given loader
+	On DisambiguationError or PageError, which are sometimes due to auto_suggest being true, try again with the fallback loader
+	(auto_suggest set to false), if there is one
+	"""
+	try:
+		return loader(name)
+	except (DisambiguationError, PageError) as e:
+		if fallback is None:
+			raise e
+		e1 = f"{type(e).__name__} for {name}. Trying with auto_suggest set to false..."
+		print(e1)
+		logger.info(e1, name=name)
 		try:
-			# response = fetch_html_from_url(full_url)
-			# html = BeautifulSoup(response.content, "html.parser")
-			page = wikipedia.page(name)
-		except DisambiguationError as e:
-			# Page is a disambiguation page
-			e1 = f"DisambiguationError for {name}. Trying with auto_suggest set to false...\n"
-			print(e1)
-			logger.write(e1)
-			try:
-				page = wikipedia.page(name, auto_suggest=False)
-			except Exception as f:
-				error = f"Error: {f}. This page: {name}, is a disambiguation page. Returning...\n"
-				logger.write(error)
-				print(error)
-				return failure_counter, logger, ""
-		except PageError as e:
-			# Page doesn't exist, however sometimes this error is due to auto_suggest being true
-			# Try calling again with auto_suggest set to false
-			e1 = f"Page error for {name}. Trying with auto_suggest set to false...\n"
-			print(e1)
-			logger.write(e1)
-			try:
-				page = wikipedia.page(name, auto_suggest=False)
-			except Exception as f:
-				error = f"Error: {f}. This page: {name}, doesn't exist. Returning...\n"
-				logger.write(error)
-				print(error)
-				return failure_counter, logger, ""
-		except RecursionError as err:
-			# Reached maximum depth of recursion for python (default 1000)
-			# To increase, can do sys.setrecursionlimit(n) but this is dangerous because it can lead to overflow/crash
-			# Raise exception to the recursive call and search through branch instead
-			error = f"RecursionError: {err}. Raising exception to return to previous level\n"
+			return fallback(name)
+		except Exception as f:
+			error = f"Error: {f}. This page: {name}, is a disambiguation page or doesn't exist. Returning..."
+			logger.warning(error, name=name)
 			print(error)
-			if logger.closed:
-				current_time = datetime.datetime.now()
-				current_log_dir = create_log_dir(current_time, data_path)
-				logger = open(current_log_dir, "a")
-			logger.write(error)
-			return failure_counter, logger, error
-			#raise err
-		except ValueError as e:
-			# ValueError: I/O operation on closed file.
-			# open the current datetime as logger
-			current_time = datetime.datetime.now()
-			e_str = f"ValueError in recursive call: {e} at {str(current_time)}. Open logger at current time\n"
-			if logger.closed:
-				current_log_dir = create_log_dir(current_time, data_path)
-				logger = open(current_log_dir, "a")
-			print(e_str)
-			logger.write(e_str)
-		except Exception as e:
-			print(f"Exception: {e}. Sleep for 300 seconds (5 minutes)...")
-			page = None
-			time.sleep(300)
-			retry -= 1
+			raise f
+
+
+def new_neighbors(links: list, frontier: CrawlFrontier, prefilter: Optional[LinkPrefilter] = None, \
+	url_filter: UrlFilter = default_url_filter) -> list:
+	"""
+	Neighbors worth queuing: links the url filter would reject once loaded are dropped up front, and with a
+	prefilter, links not queued or seen yet are checked for relevance before their pages are ever loaded
+	"""
+	links = url_filter.filter_many(links)
+	if prefilter is None:
+		return links
+	return prefilter.filter(link for link in links if not frontier.is_known(link))
+
+
+def explore_page(name: str, frontier: CrawlFrontier, scorer: RelevanceScorer, corpus: CorpusWriter, logger: CrawlLogger, \
+	failure_counter: int, retry_policy: RetryPolicy = RetryPolicy(), page_cache: Optional[PageCache] = None):
+	"""
+	Retrieve all the content on the page
+	Prevent duplicates by verifying it's not in the frontier's seen urls
+	Returns the failure counter and the page's links to explore next (empty if the page was skipped)
+	"""
+	# Load the web page, retrying transient errors with a short backoff. If not, then log as page that didn't get scraped
+	try:
+		page = retry_policy.call(load_page, name, partial(load_wikipedia_page, cache=page_cache), logger, \
+			partial(load_wikipedia_page, auto_suggest=False, cache=page_cache))
+	except Exception as e:
+		if classify_error(e) == ABORT:
+			raise e
+		logger.error(f"Unable to scrape page: {name}. Error: {e}", name=name)
+		print(f"Unable to scrape page {name}. Error: {e}. Returning")
+		failure_counter += 1
+		return failure_counter, []
 
-	# Set up logger in hourly increments. Save each day's logs in its own subdirectory
 	current_time = datetime.datetime.now()
-	current_log_dir = create_log_dir(current_time, data_path)
-	if prev_datetime.day != current_time.day or prev_datetime.month != current_time.month or prev_datetime.year != current_time.year:
-		# Create new directory for log of new day/month/year
-		print("Creating new logger subdirectory")
-		os.makedirs(current_log_dir, exist_ok=True)
-	
-	if prev_datetime.hour != current_time.hour:
-		# Only write out seen urls and seen page titles at the end of the current hour's log once
-		logger.write("seen urls list: " + str(seen_urls) + "\n")
-		logger.write("seen page titles list: " + str(seen_page_titles) + "\n")
-		# Close the logger and create a new one
-		logger.close()
-		log_path = create_logger_name(current_time, current_log_dir)
-		print(f"New hour reached. Closing previous logger and creating new logger: {log_path}")
-		logger = open(log_path, "a")
-	
-	# Wait 3 seconds between each request
-	# time.sleep(3)
+	# Requests are throttled by wikipedia_rate_limiter (--requests_per_second)
 	# If url redirected to a previously seen url, then return. No need to explore this page
-	# redirect check identify_redirecting_urls(seen_urls, response)
-	if page.url in seen_urls or not accepted_url(page.url):
+	# redirect check identify_redirecting_urls(frontier.index, response)
+	if frontier.has_seen_url(page.url) or not accepted_url(page.url):
 		print(f"*********Redirected or already seen url or should be filtered out. Returning***************")
-		logger.write(f"*********Redirected or already seen url or should be filtered out. Returning***************\n")
-		return failure_counter, logger, ""
+		logger.info("Redirected or already seen url or should be filtered out", name=name, url=page.url)
+		return failure_counter, []
 
-	# Mark this url as seen
-	seen_urls.append(page.url)
-	seen_page_titles.add(name)
+	# Mark this url, and the title the page was found under, as seen
+	frontier.mark_seen(page.url, name, page.title)
 	# print("seen urls list: ", seen_urls)
 	# print("seen page titles set: ", seen_page_titles)
 	print(f"Exploring url: {page.url} at {str(current_time)}")
 	print("Failure counter so far: " + str(failure_counter))
-	logger.write("Exploring url: " + page.url + " at " + str(current_time) +"\n")
-	logger.write(f"Failure counter so far: {failure_counter}\n")
+	logger.info("Exploring url", name=name, url=page.url, failures=failure_counter)
 
 	# Get the wikipedia page visible title
 	title = page.title
@@ -353,73 +351,26 @@ def explore_page(name: str, seen_urls: list, seen_page_titles: set, data_path: s
 	# Create new text file for this article
 	if title is None or title == "":
 		# Can't find title
-		logger.write("Title couldn't be found for article! Returning\n")
+		logger.warning("Title couldn't be found for article", url=page.url)
 		print("Title couldn't be found for article!")
-		return failure_counter, logger, ""
+		return failure_counter, []
 
 	# Extract all the content on the page
 	# Set any header type tags to be the "topic" and the text within to be the description
 	# Separate topic and description with a tab "\t"
 	overall_visible_str_cat = page.content
-
-	containsLaw = False
-	# This won't work since the term "notes" can show up earlier, not just at the header
-	# Should have at least 2 of these terms to pass
-	law_check = overall_visible_str_cat.lower().find("law") != -1
-	legal_check = overall_visible_str_cat.lower().find("legal") != -1
-	statute_check = overall_visible_str_cat.lower().find("statute") != -1
-	legislative_check = overall_visible_str_cat.lower().find("legislative") != -1
-	judicial_check = overall_visible_str_cat.lower().find("judicial") != -1
-	legislation_check = overall_visible_str_cat.lower().find("legislation") != -1
-	legislature_check = overall_visible_str_cat.lower().find("legislature") != -1
-	gov_check = overall_visible_str_cat.lower().find("government") != -1
-	court_check = overall_visible_str_cat.lower().find("court") != -1
-	due_process = overall_visible_str_cat.lower().find("due process") != -1
-	jurisprudence = overall_visible_str_cat.lower().find("jurisprudence") != -1
-	jury = overall_visible_str_cat.lower().find("jury") != -1
-	checks = [law_check, legal_check, statute_check, legislative_check, judicial_check, legislation_check, gov_check, \
-	court_check, due_process, jurisprudence, legislature_check, jury]
-
-	num_pass = sum(checks)
-	print(f"number of law checks that pass: {num_pass} / {len(checks)}")
-	if num_pass >= 2:
-		print(f"Contains law: {law_check}")
-		print(f"Contains legal: {legal_check}")
-		print(f"Contains statute: {statute_check}")
-		print(f"Contains legislative: {legislative_check}")
-		print(f"Contains judicial: {judicial_check}")
-		print(f"Contains legislation: {legislation_check}")
-		print(f"Contains legislature: {legislature_check}")
-		print(f"Contains government: {gov_check}")
-		print(f"Contains court: {court_check}")
-		print(f"Contains due process: {due_process}")
-		print(f"Contains jurisprudence: {jurisprudence}")
-		print(f"Contains jury: {jury}")
-		logger.write(f"Contains law: {law_check}\n")
-		logger.write(f"Contains legal: {legal_check}\n")
-		logger.write(f"Contains statute: {statute_check}\n")
-		logger.write(f"Contains legislative: {legislative_check}\n")
-		logger.write(f"Contains judicial: {judicial_check}\n")
-		logger.write(f"Contains legislation: {legislation_check}\n")
-		logger.write(f"Contains legislature: {legislature_check}\n")
-		logger.write(f"Contains government: {gov_check}\n")
-		logger.write(f"Contains court: {court_check}\n")
-		logger.write(f"Contains due process: {due_process}\n")
-		logger.write(f"Contains jurisprudence: {jurisprudence}\n")
-		logger.write(f"Contains jury: {jury}\n")
-		containsLaw = True
+	# If the page doesn't mention at least `threshold` of the law keywords, treat as unrelated content and skip the page
+	# All keywords are matched in one pass over the lowercased article
+	relevance = scorer.score(overall_visible_str_cat)
+	print(f"number of law checks that pass: {relevance.score} / {len(relevance.hits)}")
+	logger.debug("Law keyword hits", url=page.url, score=relevance.score, hits=relevance.hits)
+	containsLaw = relevance.passed
 
 	if not containsLaw:
 		print(f"Does not contain law or legal content: {page.url} \n")
-		logger.write(f"Does not contain law or legal content: {page.url} \n")
-		return failure_counter, logger, ""
+		logger.info("Does not contain law or legal content", url=page.url, score=relevance.score)
+		return failure_counter, []
 
-	# Replace spaces in article with underscore, replace / with hyphen
-	article_path = os.path.join(data_path, title.replace(" ", "_").replace("/", "-"))
-	if os.path.exists(article_path + ".txt"):
-		writer = open(article_path + "_SeenUrls" + str(len(seen_urls)) + ".txt", "w")
-	else:
-		writer = open(article_path + ".txt", "w")
 	print("\n")
 
 	# Find all headers, creating a list of headers where each element is a tuple of (header, list of parents)
@@ -427,237 +378,53 @@ def explore_page(name: str, seen_urls: list, seen_page_titles: set, data_path: s
 	# print("\n")
 	# print("List of headers: " + str(header_map_list))
 	print("From wikipediaPage sections for headers: " + str(page.sections))
-	# logger.write("\nList of headers: " + str(header_map_list) + "\n")
-	logger.write("From wikipediaPage sections for headers: " + str(page.sections) + "\n")
+	# logger.debug("List of headers", headers=header_map_list)
+	logger.debug("From wikipediaPage sections for headers", url=page.url, sections=page.sections)
 
-	# Ignore info in figures
-	header = title
-	# hdr_index = 0 # Headers must be found in order, otherwise it's not a header
-	description = ""
-	prev_h2 = ""
-	prev_h3 = ""
-	prev_h4 = ""
-	prev_h5 = ""
-	prev_h6 = ""
-
-	num = len(overall_visible_str_cat.split("\n"))
+	# Split the article into sections, one (header path, description) record per line of the output file
+	num = overall_visible_str_cat.count("\n") + 1
 	print(f"Number of tokens split by newline: {num}")
-	logger.write(f"Number of tokens split by newline: {num}\n")
-	# Iterate through the tokens in the concatenated string of all visible text in overal_div (main body content)
-	# split by newline
-	# Remove anything in brackets like "[<stuff>]", can be reference or something else for Wikipedia article
-	# https://stackoverflow.com/questions/22225006/how-to-replace-only-the-contents-within-brackets-using-regular-expressions
-	for text in overall_visible_str_cat.split("\n"):
-		# print("line: " + text)
-		logger.write("line: " + text + "\n")
-		if text.find("====== ") != -1:
-			# found h6 header
-			print(f"found h6 header {text}")
-			logger.write(f"found h6 header {text}\n")
-
-			total_header = ""
-			if prev_h2 != "":
-				total_header += prev_h2
-			if prev_h3 != "":
-				total_header += " - " + prev_h3
-			if prev_h4 != "":
-				total_header += " - " + prev_h4
-			if prev_h5 != "":
-				total_header += " - " + prev_h5
-			if prev_h6 != "":
-				total_header += " - " + prev_h6
-			if total_header == "":
-				total_header += header
-			writer.write(total_header + "\t" + description.strip() + "\n")
-			# Reset
-			header = text.replace("===", "").strip()
-			prev_h6 = header
-			description = ""
-		elif text.find("===== ") != -1:
-			# found h5 header
-			print(f"found h5 header {text}")
-			logger.write(f"found h5 header {text}\n")
-
-			total_header = ""
-			if prev_h2 != "":
-				total_header += prev_h2
-			if prev_h3 != "":
-				total_header += " - " + prev_h3
-			if prev_h4 != "":
-				total_header += " - " + prev_h4
-			if prev_h5 != "":
-				total_header += " - " + prev_h5
-			if prev_h6 != "":
-				total_header += " - " + prev_h6
-			if total_header == "":
-				total_header += header
-			writer.write(total_header + "\t" + description.strip() + "\n")
-			# Reset
-			header = text.replace("===", "").strip()
-			prev_h5 = header
-			prev_h6 = ""
-			description = ""
-		elif text.find("==== ") != -1:
-			# found h4 header
-			print(f"found h4 header {text}")
-			logger.write(f"found h4 header {text}\n")
-
-			total_header = ""
-			if prev_h2 != "":
-				total_header += prev_h2
-			if prev_h3 != "":
-				total_header += " - " + prev_h3
-			if prev_h4 != "":
-				total_header += " - " + prev_h4
-			if prev_h5 != "":
-				total_header += " - " + prev_h5
-			if prev_h6 != "":
-				total_header += " - " + prev_h6
-			if total_header == "":
-				total_header += header
-			writer.write(total_header + "\t" + description.strip() + "\n")
-			# Reset
-			header = text.replace("====", "").strip()
-			prev_h4 = header
-			prev_h5 = ""
-			prev_h6 = ""
-			description = ""
-		elif text.find("=== ") != -1:
-			# found h3 header
-			print(f"found h3 header {text}")
-			logger.write(f"found h3 header {text}\n")
-
-			total_header = ""
-			if prev_h2 != "":
-				total_header += prev_h2
-			if prev_h3 != "":
-				total_header += " - " + prev_h3
-			if prev_h4 != "":
-				total_header += " - " + prev_h4
-			if prev_h5 != "":
-				total_header += " - " + prev_h5
-			if prev_h6 != "":
-				total_header += " - " + prev_h6
-			if total_header == "":
-				total_header += header
-			writer.write(total_header + "\t" + description.strip() + "\n")
-			# Reset
-			header = text.replace("===", "").strip()
-			prev_h3 = header
-			prev_h4 = ""
-			prev_h5 = ""
-			prev_h6 = ""
-			description = ""
-		# if text.find("[ edit ]") != -1 or text.strip() in header_strs_only:
-		elif text.find("== ") != -1:
-			# h2 header
-			print(f"found h2 header {text}")
-			logger.write(f"found h2 header {text}\n")
-
-			# This is a h2 header
-			# Find all parents if it is a subheader
-			# assert(header_map_list[hdr_index][0] == header)
-			total_header = ""
-			if prev_h2 != "":
-				total_header += prev_h2
-			if prev_h3 != "":
-				total_header += " - " + prev_h3
-			if prev_h4 != "":
-				total_header += " - " + prev_h4
-			if prev_h5 != "":
-				total_header += " - " + prev_h5
-			if prev_h6 != "":
-				total_header += " - " + prev_h6
-			if total_header == "":
-				total_header += header
-
-			# Remove references in "[]"
-			# description = re.sub(r"\[.*?\]", "", description)
-			writer.write(total_header + "\t" + description.strip() + "\n")
-			# if text.find("[ edit ]") != -1:
-			# 	header = text[:text.find("[ edit ]")].strip() # substring up to [edit]
-			# else:
-			# 	header = text.strip()
-			header = text.replace("==", "").strip()
-			prev_h2 = header
-			prev_h3 = ""
-			prev_h4 = ""
-			prev_h5 = ""
-			prev_h6 = ""
-			description = ""
-			# hdr_index += 1 # increment to next expected header
-
-			# TODO: For now, ignore the info in "Notes" and "References" to external urls
-			# Also ignore "See Also" sections?
-			if header.find("References") != -1 or header.find("Notes") != -1:
-				print("Found references or Notes, breaking...")
-				logger.write("Found references or Notes, breaking...\n")
-				break
-		else:
-			description += text + " "
-	
-	# Write out the final header's info if didn't end earlier
-	if description != "":
-		print("Final header and description")
-		# for h in header_map_list[-1][1]:
-		# 	total_header += h + " - "
-		# total_header += header
-		total_header = ""
-		if prev_h2 != "":
-			total_header += prev_h2
-		if prev_h3 != "":
-			total_header += " - " + prev_h3
-		if prev_h4 != "":
-			total_header += " - " + prev_h4
-		if prev_h5 != "":
-			total_header += " - " + prev_h5
-		if prev_h6 != "":
-			total_header += " - " + prev_h6
-		if total_header == "":
-			total_header += header
-
-		# description = re.sub(r"\[.*?\]", "", description)
-		writer.write(total_header + "\t" + description.strip() + "\n")
-
-	# Close the writer
-	writer.close()
+	num_sections = corpus.write_article(title, page.url, iter_sections(overall_visible_str_cat, title), len(frontier.seen_urls))
+	logger.info("Wrote article", url=page.url, title=title, lines=num, sections=num_sections, score=relevance.score)
 	# return
 
 	# Find neighbors from list of wikipedia page links on the current page, excluding metadata pages
-	logger.write(f"Upcoming neighbors: {str(page.links)}\n")
-	for n in page.links:
-		if n not in seen_page_titles:
-			if logger.closed:
-				current_time = datetime.datetime.now()
-				current_log_dir = create_log_dir(current_time, data_path)
-				current_log_path = create_logger_name(current_time, current_log_dir)
-				logger = open(current_log_path, "a")
-			print("neighboring page to crawl through next: ", n)
-			logger.write("neighboring page to crawl through next: " + n + "\n\n")
-			try:
-				# Need to update failure_counter and logger whenever new loggers are created
-				failure_counter, logger, msg = explore_page(n, seen_urls, seen_page_titles, data_path, logger, current_time, failure_counter)
-				if msg.find("RecursionError") != -1:
-					# Return to previous depth
-					print(f"Found RecursionError msg, max depth reached. Return to previous depth: {msg}")
-					if logger.closed:
-						# If logger is closed, open it again
-						current_log_dir = create_log_dir(current_time, data_path)
-						current_log_path = create_logger_name(current_time, current_log_dir)
-						logger = open(current_log_path, "a")
-					logger.write(f"Found RecursionError, max depth reached. Return to previous depth: {msg}\n")
-					return failure_counter, logger, ""
-			except RecursionError as err:
-				# The recurse has reached max recursion depth. Go back to previous depth
-				print(f"Recursion at max depth reached. Return to previous depth: {err}")
-				if logger.closed:
-					# If logger is closed, open it again
-					current_log_dir = create_log_dir(current_time, data_path)
-					current_log_path = create_logger_name(current_time, current_log_dir)
-					logger = open(current_log_path, "a")
-				logger.write(f"Recursion at max depth reached. Return to previous depth: {err}\n")
-				return failure_counter, logger, f"RecursionError: {err}. Recursion at max depth reached. Return to previous"
-			
+	# The caller decides which of them to explore next
+	logger.debug("Upcoming neighbors", url=page.url, links=page.links)
+	return failure_counter, page.links
+
+
+def explore_depth_first(start_name: Optional[str], frontier: DepthFirstCrawlFrontier, scorer: RelevanceScorer, corpus: CorpusWriter, \
+	logger: CrawlLogger, failure_counter: int, max_depth: Optional[int] = None, retry_policy: RetryPolicy = RetryPolicy(), \
+	page_cache: Optional[PageCache] = None):
+	"""
+	DFS from start_name, after the pages already on the frontier's stack, e.g. those restored from the checkpoint
+	The stack of page names is explicit instead of recursion, so no branch is dropped at python's recursion limit
+	A page is pushed at most once, however many pages link to it, so the stack stays bounded by the number of distinct
+	pending pages. Pushed pages stay in the checkpoint until they are done, so --resume picks the stack up again
+	"""
+	if start_name is not None:
+		frontier.push(start_name)
+	while frontier:
+		name = frontier.pop()
+		depth = frontier.depth
+		if frontier.has_seen_title(name):
+			frontier.done(name)
+			continue
+		print(f"Exploring page at depth {depth}: {name}. Pages left on stack: {len(frontier)}")
+		logger.debug("Exploring page", name=name, depth=depth, stack=len(frontier))
+		failure_counter, neighbors = explore_page(name, frontier, scorer, corpus, logger, failure_counter, retry_policy, page_cache)
+
+		if max_depth is not None and depth >= max_depth:
+			if neighbors:
+				print(f"Hit max depth {max_depth} at {name}, not exploring its neighbors")
+				logger.info(f"Hit max depth {max_depth}, not exploring its neighbors", name=name)
+		else:
+			# Push in reverse so the first link on the page is explored first, like the recursive order
+			frontier.extend(reversed(neighbors), depth + 1)
+		# Its article is written and its neighbors pushed
+		frontier.done(name)
+	return failure_counter
 
 
 def starting_run():
@@ -667,23 +434,65 @@ def starting_run():
 	parser.add_argument("--num_results", default=100, type=int,
 		help="Max number of results to return from the search query")
 	parser.add_argument("--seen_urls", default=None, type=str,
-		help="Text file with a list of seen urls")
+		help="Crawl checkpoint, or legacy text file with a list of seen urls")
 	parser.add_argument("--seen_page_titles", default=None, type=str,
-		help="Text file with a list of seen page titles")
+		help="Crawl checkpoint, or legacy text file with a list of seen page titles")
+	parser.add_argument("--checkpoint", default=None, type=str,
+		help="SQLite file the crawl state is recorded in as it goes. Defaults to <data_path>/crawl_checkpoint.sqlite3")
+	parser.add_argument("--resume", action="store_true",
+		help="Resume from the seen urls, seen page titles and pending DFS stack in --checkpoint")
 	parser.add_argument("--path_to_existing_articles", default=None, type=str, nargs="*",
 		help="Directory path to folder of already scraped articles")
+	parser.add_argument("--seen_store", default="set", choices=["set", "bloom"],
+		help="Keep seen urls and titles in sets, or in Bloom filters of a few bytes per page mapped from " \
+			"<data_path>/seen_bloom, at the cost of skipping a small share of unseen pages")
+	parser.add_argument("--bloom_error_rate", default=0.001, type=float,
+		help="Max share of unseen pages mistaken for seen ones with --seen_store bloom")
+	parser.add_argument("--bloom_capacity", default=1000000, type=int,
+		help="Pages held by the first layer of each Bloom filter. Larger layers are added as needed")
 	# parser.add_argument('--url', default=URL, type=str,
 	#                     help='wikipedia URL to start scraping for law/legal content ')
 	parser.add_argument('--data_path', default="./scraped_wiki_article_data", type=str,
 		help="path to create an output directory to save the scraped files")
+	parser.add_argument("--max_depth", default=None, type=int,
+		help="max depth of the DFS from each search result")
+	parser.add_argument("--max_retries", default=3, type=int,
+		help="Attempts at loading a page before giving up on it")
+	parser.add_argument("--requests_per_second", default=None, type=float,
+		help="Max average rate of requests to wikipedia, shared by all workers. No limit by default")
+	parser.add_argument("--burst", default=None, type=int,
+		help="Max number of requests to wikipedia allowed at once under --requests_per_second")
+	parser.add_argument("--retry_budget", default=60, type=float,
+		help="Max seconds to back off while retrying a page")
+	parser.add_argument("--relevance_threshold", default=2, type=int,
+		help="Number of distinct law keywords an article needs to be kept")
+	parser.add_argument("--page_cache", default=None, type=str,
+		help="Directory of the on-disk cache of loaded pages. Defaults to <data_path>/page_cache")
+	parser.add_argument("--no_page_cache", action="store_true",
+		help="Always load pages from wikipedia, without reading or filling the page cache")
+	parser.add_argument("--page_cache_size_mb", default=1024, type=float,
+		help="Max size of the page cache in MB, least recently used pages are evicted past it")
+	parser.add_argument("--page_cache_ttl_hours", default=24 * 7, type=float,
+		help="Hours a cached page stays valid before it is loaded again. 0 keeps pages forever")
+	parser.add_argument("--output_format", default="txt", choices=["txt", "jsonl", "jsonl.gz"],
+		help="Write one text file per article, or append section records to JSONL shards in <data_path>/corpus")
+	parser.add_argument("--shard_size_mb", default=256, type=float,
+		help="Uncompressed size in MB at which a new JSONL shard is started")
+	parser.add_argument("--log_level", default="info", choices=["debug", "info", "warning", "error"],
+		help="Lowest level of crawl log records written. debug adds per-page keyword hits, sections and links")
+	parser.add_argument("--log_max_mb", default=64, type=float,
+		help="Size in MB at which the crawl log is rotated to a new file")
+	parser.add_argument("--log_rotate_hours", default=1, type=float,
+		help="Hours after which the crawl log is rotated to a new file. 0 rotates by size only")
 	# parser.add_argument('--sum', dest='accumulate', action='store_const',
 	#                     const=sum, default=max,
 	#                     help='sum the integers (default: find the max)')
 	args = parser.parse_args()
 	print(args)
+	wikipedia_rate_limiter.configure(args.requests_per_second, args.burst)
 
 	# Search for a topic in wikipedia (default limits to 10 results)
-	search_result = wikipedia.search(args.search_query, results=args.num_results)
+	search_result = search_wikipedia(args.search_query, results=args.num_results)
 	# resp = fetch_html_from_url(args.url)
 	# html = BeautifulSoup(resp.content, "html.parser")
 
@@ -694,62 +503,25 @@ def starting_run():
 	# all_a = overall_div.find_all("a")
 
 	# Keeps track of (text in <a> tag, href)
-	# Keep track of the seen urls from each page visit
-	if args.seen_urls is not None:
-		with open(args.seen_urls, "r") as f:
-			line = f.readline()
-			# Identify the start and end square brackets
-			start = line.find("[")+1 if line.find("[") != -1 else 0
-			end = line.find("]") if line.find("]") != -1 else len(line)
-			substr = line[start:end]
-			tokens = substr.split(",")
-			seen_urls = [x.replace("'", "").strip() for x in tokens]
-		print(f"Have seen urls loaded. Total num: {len(seen_urls)}")
-	else:
-		seen_urls = []
-
 	# write content into a textfile output
 	data_path = args.data_path
 	os.makedirs(data_path, exist_ok=True)
-
-	# Keep track of seen article titles from wikipedia.page.links
-	seen_page_titles = []
-	if args.seen_page_titles is not None:
-		with open(args.seen_page_titles, "r") as f:
-			line = f.readline()
-			# Identify the start and end square brackets
-			start = line.find("[")+1 if line.find("[") != -1 else 0
-			end = line.find("]") if line.find("]") != -1 else len(line)
-			substr = line[start:end]
-			tokens = substr.split(",")
-			seen_page_titles = [x.replace("'", "").strip() for x in tokens]
+	corpus = open_corpus_writer(args)
+
+	# Seen urls and titles, recorded in the checkpoint as the crawl goes
+	checkpoint, pending = load_crawl_state(args)
+	url_set, title_set, queued_set, max_aliases = open_seen_stores(args)
+	frontier = DepthFirstCrawlFrontier(seen_urls=checkpoint.seen_urls(), seen_titles=checkpoint.seen_titles(), \
+		checkpoint=checkpoint, url_set=url_set, title_set=title_set, queued_set=queued_set, max_aliases=max_aliases)
+	# The stack the checkpointed crawl left, explored before the search results
+	frontier.restore(pending)
+	print(f"Total number of seen page titles: {len(frontier.seen_titles)}")
+	scorer = RelevanceScorer(threshold=args.relevance_threshold)
+	retry_policy = RetryPolicy(max_attempts=args.max_retries, budget=args.retry_budget)
+	page_cache = open_page_cache(args)
 	
-	if args.path_to_existing_articles is not None:
-		# Load the directory with files
-		for path in args.path_to_existing_articles:
-			files = os.listdir(path)
-			for file_name in files:
-				idx = file_name.find(".txt")
-				# Saved output files have spaces in article with underscore, replace / with hyphen
-				title = file_name[:idx].replace("_", " ")
-				# title2 = title + "_SeenUrls" + str(len(seen_urls)) + ".txt"
-				if title not in seen_page_titles:
-					seen_page_titles.append(title)
-	seen_page_titles = set(seen_page_titles) # prevent duplicates
-	print(f"Total number of seen page titles: {len(seen_page_titles)}")
-	
-	# Logger
-	# Split logger files by datetime so it doesn't all output to one gigantic log
-	start_time = datetime.datetime.now()
-	log_dir = os.path.join(data_path, "log")
-	os.makedirs(log_dir, exist_ok=True)
-	current_log_dir = create_log_dir(start_time, data_path)
-	os.makedirs(current_log_dir, exist_ok=True)
-
-	log_path = os.path.join(current_log_dir, f"start_{start_time.year}_{start_time.month}_{start_time.day}_{start_time.hour}_log.txt")
-	logger = open(log_path, "w")
-	logger.write("args: " + str(args))
-	logger.write("start time: " + str(start_time) + "\n")
+	# Logger, rotated by size and age under <data_path>/log
+	logger = open_crawl_logger(args)
 
 	# DFS
 	# counter to keep track of how many pages had exceptions that were unable to be loaded
@@ -757,73 +529,172 @@ def starting_run():
 	# depth = 0
 
 	print(search_result)
-	logger.write("unseen links: " + str(search_result) + "\n")
+	logger.info("Search results", links=search_result)
 	count = 0
+	if frontier:
+		print(f"Finishing the DFS left in the checkpoint. Pages on stack: {len(frontier)}")
+		logger.info("Finishing the DFS left in the checkpoint", stack=len(frontier))
+		try:
+			failure_counter = explore_depth_first(None, frontier, scorer, corpus, logger, failure_counter, args.max_depth, retry_policy, \
+				page_cache)
+		except Exception as err:
+			err_str = f"An error occurred at top level: {err}"
+			print(err_str)
+			logger.error(err_str)
 	for page_title in search_result:
 		# if (count == 1):
 		# 	break
 		# explore_page(url[0], url[1], seen_urls, data_path, logger)
 		try:
 			print("From starting page, exploring page: ", page_title)
-			if logger.closed:
-				# If logger is closed, open it again
-				current_time = datetime.datetime.now()
-				current_log_dir = create_log_dir(current_time, data_path)
-				current_log_path = create_logger_name(current_time, current_log_dir)
-				logger = open(current_log_path, "a")
-			logger.write("From starting page, exploring page: " + str(page_title) + "\n")
-			failure_counter, logger, msg = explore_page(page_title, seen_urls, seen_page_titles, data_path, logger, start_time, failure_counter)
-		except ValueError as e:
-			# ValueError: I/O operation on closed file.
-			# open the current datetime as logger
-			current_time = datetime.datetime.now()
-			e_str = f"ValueError: {e} at {str(current_time)}. Open logger at current time\n"
-			print(e_str)
-			if logger.closed:
-				current_log_dir = create_log_dir(current_time, data_path)
-				current_log_path = create_logger_name(current_time, current_log_dir)
-				logger = open(current_log_path, "a")
-			logger.write(e_str)
+			logger.info("From starting page, exploring page", name=page_title)
+			failure_counter = explore_depth_first(page_title, frontier, scorer, corpus, logger, failure_counter, args.max_depth, retry_policy, \
+				page_cache)
 		except Exception as err:
-			err_str = f"An error occurred at top level: {err}\n"
+			err_str = f"An error occurred at top level: {err}"
 			print(err_str)
-			if logger.closed:
-				# If logger is closed, open it again
-				current_time = datetime.datetime.now()
-				current_log_dir = create_log_dir(current_time, data_path)
-				current_log_path = create_logger_name(current_time, current_log_dir)
-				logger = open(current_log_path, "a")
-			logger.write(err_str)
+			logger.error(err_str, name=page_title)
 		count += 1
-	
-	if not logger.closed:
-		# Close logger if it's open
-		logger.close()
-	# Final logger
-	# TODO: split logger files by datetime so it doesn't all output to one gigantic log
-	end_time = datetime.datetime.now()
-	current_log_dir = os.path.join(log_dir, f"{end_time.year}-{end_time.month}-{end_time.day}")
-	os.makedirs(current_log_dir, exist_ok=True)
-
-	end_log_path = os.path.join(current_log_dir, f"end_{end_time.year}_{end_time.month}_{end_time.day}_{end_time.hour}_log.txt")
-	end_logger = open(end_log_path, "w")
-	end_logger.write("end time: " + str(end_time) + "\n")
+
 	print(f"!!!!!!!!!!!!!Finished!!!!!!!!!! Number of main urls searched through: {count}")
-	end_logger.write(f"Finished!!!!!!!!!! Number of main urls searched through: {count}")
 	print(f"Number of failure cases: {failure_counter} / {count}")
-	end_logger.write(f"Number of failure cases: {failure_counter} / {count}\n")
-	end_logger.close()
-
-	# Write seen_urls out to a text file
-	with open(os.path.join(data_path, "seen_urls.txt"), "w") as file:
-		file.write(str(seen_urls))
-	
-	# Write seen_page_titles out to a text file
-	with open(os.path.join(data_path, "seen_page_titles.txt"), "w") as f:
-		f.write(str(seen_page_titles))
+	logger.info("Finished", searched=count, failures=failure_counter, seen_urls=len(frontier.seen_urls))
+	logger.close()
+
+	# Seen urls and page titles have been recorded in the checkpoint all along
+	print(f"Crawl state saved in checkpoint: {checkpoint.path}")
+	checkpoint.close()
+	if args.seen_store == "bloom":
+		for bloom in (url_set, title_set, queued_set):
+			bloom.close()
+	corpus.close()
+	if page_cache is not None:
+		print(f"Page cache hits: {page_cache.hits}, misses: {page_cache.misses}")
+		page_cache.close()
 	print("END")
 
 
+def serve_coordinator(args: argparse.Namespace):
+	"""
+	Serve the SQLite coordinator at --coordinator over HTTP, for workers on other machines
+	"""
+	coordinator = SQLiteCoordinator(args.coordinator, args.num_workers)
+	server = CoordinatorServer(coordinator, host=args.coordinator_host, port=args.serve_coordinator, token=args.coordinator_token)
+	print(f"Serving coordinator {args.coordinator} for {args.num_workers} workers on {args.coordinator_host}:{args.serve_coordinator}")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		coordinator.close()
+
+
+def crawl_partition(args: argparse.Namespace):
+	"""
+	Crawl one partition of a distributed crawl
+	The frontier and seen pages are shared with the other workers through the coordinator, which hands this worker
+	the pages whose titles hash to its partition. Neighbors are queued for whichever worker owns them, and pages are
+	written to this worker's own output under its --data_path
+	"""
+	os.makedirs(args.data_path, exist_ok=True)
+	corpus = open_corpus_writer(args)
+	logger = open_crawl_logger(args)
+	coordinator = open_coordinator(args.coordinator, args.num_workers, token=args.coordinator_token)
+	partition = args.worker_id
+	# Pages this worker took before it was stopped are crawled again
+	requeued = coordinator.requeue(partition)
+
+	# Every worker queues the start pages, so none of them finds the crawl over before they are. Only the first one counts
+	if args.start_page is None:
+		start_links = search_wikipedia(args.search_query, results=args.num_results)
+	else:
+		start_links = [args.start_page]
+	queued = coordinator.push(start_links, 0)
+	print(f"Worker {partition} of {args.num_workers}. Start links queued: {queued}, requeued: {requeued}")
+	logger.info("Start links", links=start_links, queued=queued, requeued=requeued, worker=partition)
+
+	scorer = RelevanceScorer(threshold=args.relevance_threshold)
+	retry_policy = RetryPolicy(max_attempts=args.max_retries, budget=args.retry_budget)
+	url_filter = UrlFilter.from_file(args.url_rules) if args.url_rules else default_url_filter
+	prefilter = None
+	if args.prefilter != "none":
+		prefilter = LinkPrefilter(scorer, mode=args.prefilter, threshold=args.prefilter_threshold, \
+			client=MediaWikiClient(batch_size=args.batch_size), rejected_set=open_name_store(args))
+	page_cache = open_page_cache(args)
+	if args.page_source == "mediawiki":
+		prefetcher = BatchPageLoader(MediaWikiClient(batch_size=args.batch_size), cache=page_cache)
+		fallback = None
+	else:
+		prefetcher = PagePrefetcher(partial(load_wikipedia_page, cache=page_cache), workers=args.workers)
+		fallback = partial(load_wikipedia_page, auto_suggest=False, cache=page_cache)
+
+	count = 0
+	failure_counter = 0
+	aborted = False
+	while not aborted:
+		batch = coordinator.pop(partition, max(1, prefetcher.lookahead))
+		if not batch:
+			if coordinator.finished():
+				break
+			# Other workers are still crawling, and may queue pages for this one
+			time.sleep(args.poll_interval)
+			continue
+		prefetcher.schedule(name for name, _ in batch)
+		for name, depth in batch:
+			try:
+				page = retry_policy.call(load_page, name, prefetcher.get, logger, fallback)
+			except Exception as e:
+				if classify_error(e) == ABORT:
+					# "Connection reset by peer". Pages left taken are requeued when the worker is restarted
+					print(f"ConnectionError: {str(e)}. Breaking outer while search loop...")
+					logger.error(f"ConnectionError: {str(e)}. Breaking outer while search loop", name=name)
+					aborted = True
+					break
+				logger.error(f"Unable to scrape page: {name}. Error: {e}", name=name)
+				print(f"Unable to scrape page {name}. Error: {e}")
+				failure_counter += 1
+				coordinator.done([name])
+				continue
+
+			# Skip pages another worker, or this one, already wrote under another name
+			if not accepted_url(page.url, url_filter) or not coordinator.claim(page.url, name, [page.title]):
+				print(f"*********Redirected or already seen url {page.url} or should be filtered out. Returning***************")
+				logger.info("Redirected or already seen url or should be filtered out", name=name, url=page.url)
+				coordinator.done([name])
+				continue
+
+			print(f"Exploring url: {page.url} at depth {depth}")
+			relevance = scorer.score(page.content)
+			logger.debug("Law keyword hits", url=page.url, score=relevance.score, hits=relevance.hits)
+			if not relevance.passed or not page.title:
+				print(f"Does not contain law or legal content: {page.url} \n")
+				logger.info("Does not contain law or legal content", url=page.url, score=relevance.score)
+				coordinator.done([name])
+				continue
+			num_sections = corpus.write_article(page.title, page.url, iter_sections(page.content, page.title), count)
+			logger.info("Wrote article", url=page.url, title=page.title, sections=num_sections, score=relevance.score)
+			count += 1
+
+			# Queue the neighbors before marking the page done, so the crawl can't look finished in between
+			if args.bfs_level is None or depth < args.bfs_level:
+				links = url_filter.filter_many(page.links)
+				if prefilter is not None:
+					# Only the links no worker has queued or crawled yet are worth checking
+					links = prefilter.filter(coordinator.unknown(links))
+				coordinator.push(links, depth + 1)
+			coordinator.done([name])
+
+	prefetcher.close()
+	print(f"!!!!!!!!!!!!!Finished!!!!!!!!!! Worker {partition}. Number of main urls searched through: {count}")
+	print(f"Number of failure cases: {failure_counter} / {count}")
+	logger.info("Finished", searched=count, failures=failure_counter, worker=partition)
+	logger.close()
+	coordinator.close()
+	corpus.close()
+	if page_cache is not None:
+		page_cache.close()
+
 
 def bfs():
 	"""
@@ -835,237 +706,351 @@ def bfs():
 	parser.add_argument("--num_results", default=100, type=int,
 		help="Max number of results to return from the search query")
 	parser.add_argument("--seen_urls", default=None, type=str,
-		help="Text file with a list of seen urls")
+		help="Crawl checkpoint, or legacy text file with a list of seen urls")
 	parser.add_argument("--seen_page_titles", default=None, type=str,
-		help="Text file with a list of seen page titles")
+		help="Crawl checkpoint, or legacy text file with a list of seen page titles")
+	parser.add_argument("--checkpoint", default=None, type=str,
+		help="SQLite file the crawl state is recorded in as it goes. Defaults to <data_path>/crawl_checkpoint.sqlite3")
+	parser.add_argument("--resume", action="store_true",
+		help="Resume from the seen urls, seen page titles and pending queue in --checkpoint")
 	parser.add_argument("--path_to_existing_articles", default=None, type=str, nargs="*",
 		help="Directory path to folder of already scraped articles")
+	parser.add_argument("--seen_store", default="set", choices=["set", "bloom"],
+		help="Keep seen urls and titles in sets, or in Bloom filters of a few bytes per page mapped from " \
+			"<data_path>/seen_bloom, at the cost of skipping a small share of unseen pages")
+	parser.add_argument("--bloom_error_rate", default=0.001, type=float,
+		help="Max share of unseen pages mistaken for seen ones with --seen_store bloom")
+	parser.add_argument("--bloom_capacity", default=1000000, type=int,
+		help="Pages held by the first layer of each Bloom filter. Larger layers are added as needed")
 	parser.add_argument('--start_page', default=None, type=str,
 	                    help='wikipedia name page to start at')
 	parser.add_argument('--data_path', default="./scraped_wiki_article_data", type=str,
 		help="path to create an output directory to save the scraped files")
 	parser.add_argument("--bfs_level", default=None, type=int,
 		help="max level of bfs depth")
+	parser.add_argument("--crawl_order", default="bfs", choices=["bfs", "best_first"],
+		help="Crawl the queue in order, or best first by the law keywords of each link's title and of the page " \
+			"linking to it, less a penalty for depth. --bfs_level then caps the depth below the start pages")
+	parser.add_argument("--max_pages", default=None, type=int,
+		help="Stop the crawl after loading this many pages. The rest of the queue stays in the checkpoint")
+	parser.add_argument("--relevance_threshold", default=2, type=int,
+		help="Number of distinct law keywords an article needs to be kept")
+	parser.add_argument("--prefilter", default="none", choices=["none", "title", "intro"],
+		help="Check neighbors for law keywords in their title, or in the intro loaded in batches from the MediaWiki API, " \
+			"before loading their full page")
+	parser.add_argument("--prefilter_threshold", default=1, type=int,
+		help="Number of distinct law keywords a neighbor's title or intro needs to be queued under --prefilter")
+	parser.add_argument("--url_rules", default=None, type=str,
+		help="JSON file of the rules rejecting urls and neighbor links, replacing the default rules")
+	parser.add_argument("--page_source", default="wikipedia", choices=["wikipedia", "mediawiki"],
+		help="Load pages one by one with the wikipedia library, or in batches from the MediaWiki API")
+	parser.add_argument("--batch_size", default=50, type=int,
+		help="Pages loaded per MediaWiki API query with --page_source mediawiki (max 50)")
+	parser.add_argument("--workers", default=1, type=int,
+		help="Number of upcoming pages to fetch concurrently. Pages are still processed in BFS order")
+	parser.add_argument("--parse_workers", default=0, type=int,
+		help="Processes scoring and splitting articles while the next pages are fetched, with articles written on a " \
+			"separate thread. 0 does both inline")
+	parser.add_argument("--max_retries", default=3, type=int,
+		help="Attempts at loading a page before it is deferred")
+	parser.add_argument("--requests_per_second", default=None, type=float,
+		help="Max average rate of requests to wikipedia, shared by all workers. No limit by default")
+	parser.add_argument("--burst", default=None, type=int,
+		help="Max number of requests to wikipedia allowed at once under --requests_per_second")
+	parser.add_argument("--retry_budget", default=60, type=float,
+		help="Max seconds to back off while retrying a page before it is deferred")
+	parser.add_argument("--max_deferrals", default=3, type=int,
+		help="Times a failing page is parked for a later retry before giving up on it")
+	parser.add_argument("--page_cache", default=None, type=str,
+		help="Directory of the on-disk cache of loaded pages. Defaults to <data_path>/page_cache")
+	parser.add_argument("--no_page_cache", action="store_true",
+		help="Always load pages from wikipedia, without reading or filling the page cache")
+	parser.add_argument("--page_cache_size_mb", default=1024, type=float,
+		help="Max size of the page cache in MB, least recently used pages are evicted past it")
+	parser.add_argument("--page_cache_ttl_hours", default=24 * 7, type=float,
+		help="Hours a cached page stays valid before it is loaded again. 0 keeps pages forever")
+	parser.add_argument("--output_format", default="txt", choices=["txt", "jsonl", "jsonl.gz"],
+		help="Write one text file per article, or append section records to JSONL shards in <data_path>/corpus")
+	parser.add_argument("--shard_size_mb", default=256, type=float,
+		help="Uncompressed size in MB at which a new JSONL shard is started")
+	parser.add_argument("--log_level", default="info", choices=["debug", "info", "warning", "error"],
+		help="Lowest level of crawl log records written. debug adds per-page keyword hits, sections and links")
+	parser.add_argument("--log_max_mb", default=64, type=float,
+		help="Size in MB at which the crawl log is rotated to a new file")
+	parser.add_argument("--log_rotate_hours", default=1, type=float,
+		help="Hours after which the crawl log is rotated to a new file. 0 rotates by size only")
+	parser.add_argument("--coordinator", default=None, type=str,
+		help="Crawl one partition of a distributed crawl, sharing the frontier through this SQLite file, or the url " \
+			"of a --serve_coordinator server. Levels are counted by page depth, and --checkpoint is not used")
+	parser.add_argument("--num_workers", default=1, type=int,
+		help="Number of workers, and partitions of page titles, of the distributed crawl")
+	parser.add_argument("--worker_id", default=0, type=int,
+		help="Partition crawled by this worker, from 0 to --num_workers - 1. Output goes to <data_path>/worker-<id>")
+	parser.add_argument("--poll_interval", default=5, type=float,
+		help="Seconds a worker with nothing to crawl waits for other workers to queue pages for it")
+	parser.add_argument("--serve_coordinator", default=None, type=int,
+		help="Serve the SQLite --coordinator file over HTTP on this port instead of crawling")
+	parser.add_argument("--coordinator_host", default="127.0.0.1", type=str,
+		help="Interface --serve_coordinator listens on. 0.0.0.0 serves workers on other machines, along with a " \
+			"--coordinator_token")
+	parser.add_argument("--coordinator_token", default=os.environ.get("COORDINATOR_TOKEN"), type=str,
+		help="Token shared by --serve_coordinator and the workers connecting to it, which it refuses requests without. " \
+			"Defaults to $COORDINATOR_TOKEN")
 	args = parser.parse_args()
 	print(args)
+	wikipedia_rate_limiter.configure(args.requests_per_second, args.burst)
 
-	# Keep track of the seen urls from each page visit
-	if args.seen_urls is not None:
-		with open(args.seen_urls, "r") as f:
-			line = f.readline()
-			# Identify the start and end square brackets
-			start = line.find("[")+1 if line.find("[") != -1 else 0
-			end = line.find("]") if line.find("]") != -1 else len(line)
-			substr = line[start:end]
-			tokens = substr.split(",")
-			seen_urls = [x.replace("'", "").strip() for x in tokens]
-		print(f"Have seen urls loaded. Total num: {len(seen_urls)}")
-	else:
-		seen_urls = []
+	if args.serve_coordinator is not None:
+		serve_coordinator(args)
+		return
+	if args.coordinator is not None:
+		args.data_path = os.path.join(args.data_path, f"worker-{args.worker_id:03d}")
+		crawl_partition(args)
+		return
 
 	# write content into a textfile output
 	data_path = args.data_path
 	os.makedirs(data_path, exist_ok=True)
+	corpus = open_corpus_writer(args)
 
-	# Keep track of seen article titles from wikipedia.page.links
-	seen_page_titles = []
-	if args.seen_page_titles is not None:
-		with open(args.seen_page_titles, "r") as f:
-			line = f.readline()
-			# Identify the start and end square brackets
-			start = line.find("[")+1 if line.find("[") != -1 else 0
-			end = line.find("]") if line.find("]") != -1 else len(line)
-			substr = line[start:end]
-			tokens = substr.split(",")
-			seen_page_titles = [x.replace("'", "").strip() for x in tokens]
+	# Seen urls and titles, and the pending queue when resuming, recorded in the checkpoint as the crawl goes
+	checkpoint, pending = load_crawl_state(args)
 	
-	if args.path_to_existing_articles is not None:
-		# Load the directory with files
-		for path in args.path_to_existing_articles:
-			files = os.listdir(path)
-			for file_name in files:
-				idx = file_name.find(".txt")
-				# Saved output files have spaces in article with underscore, replace / with hyphen
-				title = file_name[:idx].replace("_", " ")
-				# title2 = title + "_SeenUrls" + str(len(seen_urls)) + ".txt"
-				if title not in seen_page_titles:
-					seen_page_titles.append(title)
-	seen_page_titles = set(seen_page_titles) # remove duplicates
-	print(f"Total number of seen page titles: {len(seen_page_titles)}")
-	
-	# Logger
-	# Split logger files by datetime so it doesn't all output to one gigantic log
-	start_time = datetime.datetime.now()
-	log_dir = os.path.join(data_path, "log")
-	os.makedirs(log_dir, exist_ok=True)
-	current_log_dir = create_log_dir(start_time, data_path)
-	os.makedirs(current_log_dir, exist_ok=True)
-
-	log_path = os.path.join(current_log_dir, f"start_{start_time.year}_{start_time.month}_{start_time.day}_{start_time.hour}_log.txt")
-	logger = open(log_path, "w")
-	logger.write("args: " + str(args))
-	logger.write("start time: " + str(start_time) + "\n")
+	# Logger, rotated by size and age under <data_path>/log
+	logger = open_crawl_logger(args)
 
 	# Search for a query and get result
-	if args.start_page is None:
-		unseen_links = wikipedia.search(args.search_query, results=args.num_results)
+	if pending:
+		# Pick up the queue where the checkpointed crawl left off
+		start_links = [name for name, _, _ in pending]
+	elif args.start_page is None:
+		start_links = search_wikipedia(args.search_query, results=args.num_results)
 	else:
 		# Use the given article name as starting point
-		unseen_links = [args.start_page]
-
-	print(unseen_links)
-	logger.write("unseen links: " + str(unseen_links) + "\n")
-
-	# Cap the level of BFS
+		start_links = [args.start_page]
+
+	print(start_links)
+	logger.info("Start links", links=start_links)
+	# Queue of unseen links, along with the seen urls and titles
+	url_set, title_set, queued_set, max_aliases = open_seen_stores(args)
+	frontier_class = PriorityCrawlFrontier if args.crawl_order == "best_first" else CrawlFrontier
+	# The seen urls and titles are streamed from the checkpoint into their stores, without a copy in between
+	frontier = frontier_class(seen_urls=checkpoint.seen_urls(), seen_titles=checkpoint.seen_titles(), \
+		checkpoint=checkpoint, url_set=url_set, title_set=title_set, queued_set=queued_set, max_aliases=max_aliases)
+	print(f"Total number of seen page titles: {len(frontier.seen_titles)}")
+	if pending:
+		# Best first, the pending pages keep the depth and parent score they were queued with
+		frontier.restore(pending)
+	else:
+		frontier.extend(start_links)
+	# Cap the level of BFS. Best first, levels are counted by each page's depth instead, as there is no last link in a level
 	bfs_level_cap = args.bfs_level
 	if bfs_level_cap is not None:
-		last_link_in_level = unseen_links[-1]
+		last_link_in_level = frontier.peek_last()
 	else:
 		last_link_in_level = None
 
 	# Counters
 	failure_counter = 0
 	count = 0
+	loaded = 0
 	prev_datetime = datetime.datetime.now()
 
-	# BFS
-	while (unseen_links):
-		# Check if logger is open
-		if logger.closed:
-			print("Logger is closed. Opening up logger again")
-			current_time = datetime.datetime.now()
-			current_log_dir = create_log_dir(current_time, data_path)
-			logger = open(current_log_dir, "a")
-		# Act as queue, pop off the oldest item first
-		name = unseen_links.pop(0)
-		print(f"Number of unseen_links left: {len(unseen_links)}")
-		logger.write(f"Number of unseen_links left: {len(unseen_links)}\n")
-
-		# If max BFS depth is set, decrement whenever a level of search is done
+	scorer = RelevanceScorer(threshold=args.relevance_threshold)
+
+	# Pages that failed with a transient error wait here for a later retry
+	retry_policy = RetryPolicy(max_attempts=args.max_retries, budget=args.retry_budget)
+	deferred = DeferredRetryQueue(RetryPolicy(base_delay=60, max_delay=900), max_deferrals=args.max_deferrals)
+	# Depths of the parked pages, best first
+	deferred_depths = {}
+
+	# Fetch the next pages in the queue on worker threads while the current one is processed
+	page_cache = open_page_cache(args)
+	if args.page_source == "mediawiki":
+		# Load the pages at the head of the queue in batches, with redirects resolved by the API so no fallback is needed
+		prefetcher = BatchPageLoader(MediaWikiClient(batch_size=args.batch_size), cache=page_cache)
+		fallback = None
+	else:
+		prefetcher = PagePrefetcher(partial(load_wikipedia_page, cache=page_cache), workers=args.workers)
+		fallback = partial(load_wikipedia_page, auto_suggest=False, cache=page_cache)
+
+	# Drop neighbors that are metadata pages, assets or external links, and those that don't look law related,
+	# before downloading their full content
+	url_filter = UrlFilter.from_file(args.url_rules) if args.url_rules else default_url_filter
+	prefilter = None
+	if args.prefilter != "none":
+		prefilter = LinkPrefilter(scorer, mode=args.prefilter, threshold=args.prefilter_threshold, \
+			client=MediaWikiClient(batch_size=args.batch_size), rejected_set=open_name_store(args))
+
+	# Score and split articles on worker processes while the next pages are fetched, and write them out on a thread.
+	# Both stages are bounded, so a slow stage holds back fetching instead of piling up pages in memory
+	pipeline = ArticlePipeline(scorer, workers=args.parse_workers)
+	writer = BackgroundWriter(corpus, max_queued=pipeline.max_pending if args.parse_workers > 0 else 0)
+	# Whether the last page of the current level is still being parsed. Its neighbors decide where the next level ends
+	level_end_pending = False
+
+	def handle_parsed(context, parsed):
+		"""
+		Write a parsed article and queue its neighbors. Articles come back in the order their pages were
+		fetched, and the level cap is the one the page was popped with, so the queue grows as it would inline
+		"""
+		nonlocal count, bfs_level_cap, last_link_in_level, level_end_pending
+		name, page, level_cap, seen_count, depth = context
 		if last_link_in_level is not None and name == last_link_in_level:
-			bfs_level_cap -= 1
-			print(f"Hit the last link in the current level: {name}. Decrementing bfs_level_cap: {bfs_level_cap}")
-			logger.write(f"Hit the last link in the current level: {name}. Decrementing bfs_level_cap: {bfs_level_cap}\n")
+			level_end_pending = False
+		# If the page doesn't mention at least `threshold` of the law keywords, treat as unrelated content and skip the page
+		relevance = parsed.relevance
+		print(f"number of law checks that pass: {relevance.score} / {len(relevance.hits)}")
+		logger.debug("Law keyword hits", url=page.url, score=relevance.score, hits=relevance.hits)
+		if not relevance.passed:
+			print(f"Does not contain law or legal content: {page.url} \n")
+			logger.info("Does not contain law or legal content", url=page.url, score=relevance.score)
+			frontier.done(name)
+			return
+
+		print("\n")
+		print("From wikipediaPage sections for headers: " + str(page.sections))
+		logger.debug("From wikipediaPage sections for headers", url=page.url, sections=page.sections)
+
+		# One (header path, description) record per line of the output file
+		print(f"Number of tokens split by newline: {parsed.lines}")
+		writer.write_article(page.title, page.url, parsed.sections, seen_count, key=name)
+		logger.info("Wrote article", url=page.url, title=page.title, lines=parsed.lines, sections=len(parsed.sections), \
+			score=relevance.score)
+		count += 1
+
+		# Find neighbors from list of wikipedia page links on the current page, excluding metadata pages
+		logger.debug("Upcoming neighbors", url=page.url, links=page.links)
+
+		# Add unseen neighbors to queue
+		if depth is not None:
+			# Best first, ranked by how law related this page is
+			if args.bfs_level is None or depth < args.bfs_level:
+				frontier.extend(new_neighbors(page.links, frontier, prefilter, url_filter), parent_score=relevance.score, \
+					depth=depth + 1)
+			else:
+				print("Hit BFS level cap, not adding additional neighbors")
+				logger.debug("Hit BFS level cap, not adding additional neighbors", name=name, depth=depth)
+		elif level_cap is None or level_cap > 0:
+			frontier.extend(new_neighbors(page.links, frontier, prefilter, url_filter))
+			if last_link_in_level is not None and name == last_link_in_level:
+				last_link_in_level = frontier.peek_last()
+				print(f"Next last link in level: {last_link_in_level}")
+				logger.info("Next last link in level", name=last_link_in_level)
+		elif level_cap == 0 and name == last_link_in_level:
+			frontier.extend(new_neighbors(page.links, frontier, prefilter, url_filter))
+			print(f"Last link in the last level: {name}. No more neighbors will be added after this")
+			logger.info("Last link in the last level. No more neighbors will be added after this", name=name)
+			bfs_level_cap -= 1 # This will be -1 now
+		else:
+			print("Hit BFS level cap, not adding additional neighbors")
+			logger.debug("Hit BFS level cap, not adding additional neighbors", name=name)
+		# The page is done in the checkpoint once the writer has written its article, see mark_written. A crash before
+		# then crawls it again, along with its neighbors
+
+	def mark_written():
+		"""
+		Record the pages whose articles the writer has written as done, now that their neighbors are queued too
+		"""
+		for written_name in writer.written():
+			frontier.done(written_name)
+
+	# BFS
+	while (frontier or deferred or pipeline):
+		mark_written()
+		if args.max_pages is not None and loaded >= args.max_pages:
+			print(f"Loaded {loaded} pages, the --max_pages budget. Stopping the crawl")
+			logger.info("Reached the max pages budget", loaded=loaded, queued=len(frontier))
+			break
+		if level_end_pending or not frontier:
+			# The next page may be one of the neighbors still being parsed, or end a level that isn't known yet
+			for context, parsed in pipeline.drain():
+				handle_parsed(context, parsed)
+			if not (frontier or deferred):
+				break
+		# Retry parked pages once their backoff has passed, otherwise take the next page in the queue
+		ready = deferred.pop_ready()
+		if ready is None and not frontier:
+			# Only parked pages are left, wait for the earliest one
+			deferred.wait_until_ready()
+			ready = deferred.pop_ready()
+		if ready is not None:
+			name, deferrals = ready
+			depth = deferred_depths.pop(name, None)
+			print(f"Retrying deferred page: {name}. Times deferred: {deferrals}")
+			logger.info("Retrying deferred page", name=name, deferrals=deferrals)
+		else:
+			deferrals = 0
+			prefetcher.schedule(frontier.upcoming(prefetcher.lookahead))
+			# Act as queue, pop off the oldest item first
+			name = frontier.pop()
+			depth = frontier.depth if args.crawl_order == "best_first" else None
+			print(f"Number of unseen_links left: {len(frontier)}")
+			logger.debug("Popped page", name=name, queued=len(frontier), depth=depth)
+
+			# If max BFS depth is set, decrement whenever a level of search is done
+			if last_link_in_level is not None and name == last_link_in_level:
+				bfs_level_cap -= 1
+				print(f"Hit the last link in the current level: {name}. Decrementing bfs_level_cap: {bfs_level_cap}")
+				logger.info("Hit the last link in the current level", name=name, bfs_level_cap=bfs_level_cap)
 
 		# Explore the page
-		# Load the web page
-		# Try loading page 3 times with 5 minute sleep. If not, then log as page that didn't get scraped
-		page = None
-		retry = 3
+		# Load the web page, retrying transient errors with a short backoff. If it still fails, park the page
+		# in the deferred queue and move on instead of stalling the crawl
 		try:
-			while (page is None):
-				if retry == 0:
-					# Can't scrape this page, log it and return
-					logger.write("$$$$$$$$$$$$$$ Retried 3 times, unable to scrape page: " + name + "\n")
-					print(f"Retried 3 times, unable to scrape page {name}. Returning")
-					failure_counter += 1 # TODO: since this is an int, this won't update in recursive calls...
-					# Also maybe should keep track of the urls that have failed to load multiple times
-					raise Exception("RetryError: retry 3 times failed")
-				try:
-					# response = fetch_html_from_url(full_url)
-					# html = BeautifulSoup(response.content, "html.parser")
-					page = wikipedia.page(name)
-				except DisambiguationError as e:
-					# Page is a disambiguation page
-					e1 = f"DisambiguationError for {name}. Trying with auto_suggest set to false...\n"
-					print(e1)
-					logger.write(e1)
-					try:
-						page = wikipedia.page(name, auto_suggest=False)
-					except Exception as f:
-						error = f"Error: {f}. This page: {name}, is a disambiguation page. Returning...\n"
-						logger.write(error)
-						print(error)
-						raise e
-				except PageError as e:
-					# Page doesn't exist, however sometimes this error is due to auto_suggest being true
-					# Try calling again with auto_suggest set to false
-					e1 = f"Page error for {name}. Trying with auto_suggest set to false...\n"
-					print(e1)
-					logger.write(e1)
-					try:
-						page = wikipedia.page(name, auto_suggest=False)
-					except Exception as f:
-						error = f"Error: {f}. This page: {name}, doesn't exist. Returning...\n"
-						logger.write(error)
-						print(error)
-						raise e
-				except ValueError as e:
-					# ValueError: I/O operation on closed file.
-					# open the current datetime as logger
-					current_time = datetime.datetime.now()
-					e_str = f"ValueError in recursive call: {e} at {str(current_time)}. Open logger at current time\n"
-					if logger.closed:
-						current_log_dir = create_log_dir(current_time, data_path)
-						logger = open(current_log_dir, "a")
-					print(e_str)
-					logger.write(e_str)
-					page = None
-					retry -= 1
-				except ConnectionError as e:
-					# Check if it's "Connection reset by peer". If so, then break and stop the scraping
-					if str(e).find("Connection reset by peer") != -1:
-						raise e
-					else:
-						print(f"ConnectionError: {e}. Sleep for 300 seconds (5 minutes)...")
-						page = None
-						time.sleep(300)
-						retry -= 1
-				except Exception as e:
-					print(f"Exception: {e}. Sleep for 300 seconds (5 minutes)...")
-					page = None
-					time.sleep(300)
-					retry -= 1
-		except ConnectionError as e:
-			# This must be a "Connection reset by peer" error. Break the loop
-			print(f"ConnectionError: {str(e)}. Breaking outer while search loop...")
-			logger.write(f"ConnectionError: {str(e)}. Breaking outer while search loop...")
-			break
+			page = retry_policy.call(load_page, name, prefetcher.get, logger, fallback)
 		except Exception as e:
-			# There was some error when trying to open the page. continue to next page
+			category = classify_error(e)
+			if category == ABORT:
+				# "Connection reset by peer". Break the loop
+				print(f"ConnectionError: {str(e)}. Breaking outer while search loop...")
+				logger.error(f"ConnectionError: {str(e)}. Breaking outer while search loop", name=name)
+				break
+			wait = deferred.defer(name, deferrals) if category == RETRYABLE else None
+			if wait is not None:
+				# Parked pages stay in the checkpoint's frontier, so a crash or --max_pages stop doesn't lose them
+				if depth is not None:
+					deferred_depths[name] = depth
+				print(f"Exception: {e}. Deferring {name}, retrying in {wait:.0f} seconds")
+				logger.warning(f"Exception: {e}. Deferring page", name=name, retry_in=round(wait))
+			else:
+				logger.error(f"Unable to scrape page: {name}. Error: {e}", name=name)
+				print(f"Unable to scrape page {name}. Error: {e}")
+				failure_counter += 1
+				frontier.done(name)
+			if last_link_in_level is not None and name == last_link_in_level:
+				for context, parsed in pipeline.drain():
+					handle_parsed(context, parsed)
+				# The level's last page has no neighbors to add, so the level ends with what is queued now
+				if bfs_level_cap > 0:
+					last_link_in_level = frontier.peek_last()
+				else:
+					bfs_level_cap -= 1
+			# Continue to next page
 			continue
 
-		# Set up logger in hourly increments. Save each day's logs in its own subdirectory
+		loaded += 1
 		current_time = datetime.datetime.now()
-		current_log_dir = create_log_dir(current_time, data_path)
-		if prev_datetime.day != current_time.day or prev_datetime.month != current_time.month or prev_datetime.year != current_time.year:
-			# Create new directory for log of new day/month/year
-			print("Creating new logger subdirectory")
-			os.makedirs(current_log_dir, exist_ok=True)
-		
 		if prev_datetime.hour != current_time.hour:
-			# Only write out seen urls and seen page titles at the end of the current hour's log once
-			logger.write("seen urls list: " + str(seen_urls) + "\n")
-			logger.write("seen page titles set: " + str(seen_page_titles) + "\n")
-			# Close the logger and create a new one
-			logger.close()
-			log_path = create_logger_name(current_time, current_log_dir)
-			print(f"New hour reached. Closing previous logger and creating new logger: {log_path}")
-			logger = open(log_path, "a")
-		
+			# Hourly progress summary. The seen urls and titles themselves are in the checkpoint
+			logger.info("Progress", searched=count, failures=failure_counter, queued=len(frontier), \
+				deferred=len(deferred), seen_urls=len(frontier.seen_urls), seen_titles=len(frontier.seen_titles), \
+				prefilter_skipped=prefilter.skipped if prefilter is not None else None)
+		prev_datetime = current_time
+
 		# If url redirected to a previously seen url, then return. No need to explore this page
-		# redirect check identify_redirecting_urls(seen_urls, response)
-		if page.url in seen_urls or not accepted_url(page.url):
+		# redirect check identify_redirecting_urls(frontier.index, response)
+		if frontier.has_seen_url(page.url) or not accepted_url(page.url, url_filter):
 			print(f"*********Redirected or already seen url {page.url} or should be filtered out. Returning***************")
-			logger.write(f"*********Redirected or already seen url {page.url} or should be filtered out. Returning***************\n")
+			logger.info("Redirected or already seen url or should be filtered out", name=name, url=page.url)
+			frontier.done(name)
 			continue
 
-		# Mark this url as seen
-		try:
-			if page.url not in seen_urls:
-				seen_urls.append(page.url)
-		except Exception as err:
-			print(f"Can't add anymore urls to seen_urls: {page.url}")
-		
-		try:
-			# If unable to add anymore items into set
-			seen_page_titles.add(name)
-		except Exception as error:
-			print(f"Unable to add anymore names to seen_page_titles set: {name}")
+		# Mark this url, and the title the page was found under, as seen
+		frontier.mark_seen(page.url, name, page.title)
 		print(f"Exploring url: {page.url} at {str(current_time)}")
 		print("Failure counter so far: " + str(failure_counter))
-		logger.write("Exploring url: " + page.url + " at " + str(current_time) +"\n")
-		logger.write(f"Failure counter so far: {failure_counter}\n")
+		logger.info("Exploring url", name=name, url=page.url, failures=failure_counter)
 
 		# Get the wikipedia page visible title
 		title = page.title
@@ -1073,326 +1058,51 @@ def bfs():
 		# Create new text file for this article
 		if title is None or title == "":
 			# Can't find title
-			logger.write("Title couldn't be found for article! Returning\n")
+			logger.warning("Title couldn't be found for article", url=page.url)
 			print("Title couldn't be found for article!")
+			frontier.done(name)
 			continue
 
 		# Extract all the content on the page
 		# Set any header type tags to be the "topic" and the text within to be the description
 		# Separate topic and description with a tab "\t"
-		overall_visible_str_cat = page.content
-		containsLaw = False
-		# If the page doesn't ever mention "law" or "legal", then treat as unrelated content and skip the page
-		# This won't work since the term "notes" can show up earlier, not just at the header
-		# Should have at least 2 of these terms to pass
-		law_check = overall_visible_str_cat.lower().find("law") != -1
-		legal_check = overall_visible_str_cat.lower().find("legal") != -1
-		statute_check = overall_visible_str_cat.lower().find("statute") != -1
-		legislative_check = overall_visible_str_cat.lower().find("legislative") != -1
-		judicial_check = overall_visible_str_cat.lower().find("judicial") != -1
-		legislation_check = overall_visible_str_cat.lower().find("legislation") != -1
-		legislature_check = overall_visible_str_cat.lower().find("legislature") != -1
-		gov_check = overall_visible_str_cat.lower().find("government") != -1
-		court_check = overall_visible_str_cat.lower().find("court") != -1
-		due_process = overall_visible_str_cat.lower().find("due process") != -1
-		jurisprudence = overall_visible_str_cat.lower().find("jurisprudence") != -1
-		jury = overall_visible_str_cat.lower().find("jury") != -1
-		tribunal_check = overall_visible_str_cat.lower().find("tribunal") != -1
-		checks = [law_check, legal_check, statute_check, legislative_check, judicial_check, legislation_check, gov_check, \
-		court_check, due_process, jurisprudence, legislature_check, jury, tribunal_check]
-
-		num_pass = sum(checks)
-		print(f"number of law checks that pass: {num_pass} / {len(checks)}")
-		if num_pass >= 2:
-			print(f"Contains law: {law_check}")
-			print(f"Contains legal: {legal_check}")
-			print(f"Contains statute: {statute_check}")
-			print(f"Contains legislative: {legislative_check}")
-			print(f"Contains judicial: {judicial_check}")
-			print(f"Contains legislation: {legislation_check}")
-			print(f"Contains legislature: {legislature_check}")
-			print(f"Contains government: {gov_check}")
-			print(f"Contains court: {court_check}")
-			print(f"Contains due process: {due_process}")
-			print(f"Contains jurisprudence: {jurisprudence}")
-			print(f"Contains jury: {jury}")
-			print(f"Contains tribunal: {tribunal_check}")
-			logger.write(f"Contains law: {law_check}\n")
-			logger.write(f"Contains legal: {legal_check}\n")
-			logger.write(f"Contains statute: {statute_check}\n")
-			logger.write(f"Contains legislative: {legislative_check}\n")
-			logger.write(f"Contains judicial: {judicial_check}\n")
-			logger.write(f"Contains legislation: {legislation_check}\n")
-			logger.write(f"Contains legislature: {legislature_check}\n")
-			logger.write(f"Contains government: {gov_check}\n")
-			logger.write(f"Contains court: {court_check}\n")
-			logger.write(f"Contains due process: {due_process}\n")
-			logger.write(f"Contains jurisprudence: {jurisprudence}\n")
-			logger.write(f"Contains jury: {jury}\n")
-			logger.write(f"Contains tribunal: {tribunal_check}")
-			containsLaw = True
-
-		if not containsLaw:
-			print(f"Does not contain law or legal content: {page.url} \n")
-			logger.write(f"Does not contain law or legal content: {page.url} \n")
-			continue
-
-		# Replace spaces in article with underscore, replace / with hyphen
-		article_path = os.path.join(data_path, title.replace(" ", "_").replace("/", "-"))
-		if os.path.exists(article_path + ".txt"):
-			writer = open(article_path + "_SeenUrls" + str(len(seen_urls)) + ".txt", "w")
-		else:
-			writer = open(article_path + ".txt", "w")
-		print("\n")
-		print("From wikipediaPage sections for headers: " + str(page.sections))
-		logger.write("From wikipediaPage sections for headers: " + str(page.sections) + "\n")
-
-		# Ignore info in figures
-		header = title
-		description = ""
-		prev_h2 = ""
-		prev_h3 = ""
-		prev_h4 = ""
-		prev_h5 = ""
-		prev_h6 = ""
-
-		num = len(overall_visible_str_cat.split("\n"))
-		print(f"Number of tokens split by newline: {num}")
-		logger.write(f"Number of tokens split by newline: {num}\n")
-		# Iterate through the tokens in the concatenated string of all visible text in overal_div (main body content)
-		# split by newline
-		# Remove anything in brackets like "[<stuff>]", can be reference or something else for Wikipedia article
-		# https://stackoverflow.com/questions/22225006/how-to-replace-only-the-contents-within-brackets-using-regular-expressions
-		for text in overall_visible_str_cat.split("\n"):
-			# print("line: " + text)
-			logger.write("line: " + text + "\n")
-			if text.find("====== ") != -1:
-				# found h6 header
-				print(f"found h6 header {text}")
-				logger.write(f"found h6 header {text}\n")
-
-				total_header = ""
-				if prev_h2 != "":
-					total_header += prev_h2
-				if prev_h3 != "":
-					total_header += " - " + prev_h3
-				if prev_h4 != "":
-					total_header += " - " + prev_h4
-				if prev_h5 != "":
-					total_header += " - " + prev_h5
-				if prev_h6 != "":
-					total_header += " - " + prev_h6
-				if total_header == "":
-					total_header += header
-				writer.write(total_header + "\t" + description.strip() + "\n")
-				# Reset
-				header = text.replace("===", "").strip()
-				prev_h6 = header
-				description = ""
-			elif text.find("===== ") != -1:
-				# found h5 header
-				print(f"found h5 header {text}")
-				logger.write(f"found h5 header {text}\n")
-
-				total_header = ""
-				if prev_h2 != "":
-					total_header += prev_h2
-				if prev_h3 != "":
-					total_header += " - " + prev_h3
-				if prev_h4 != "":
-					total_header += " - " + prev_h4
-				if prev_h5 != "":
-					total_header += " - " + prev_h5
-				if prev_h6 != "":
-					total_header += " - " + prev_h6
-				if total_header == "":
-					total_header += header
-				writer.write(total_header + "\t" + description.strip() + "\n")
-				# Reset
-				header = text.replace("===", "").strip()
-				prev_h5 = header
-				prev_h6 = ""
-				description = ""
-			elif text.find("==== ") != -1:
-				# found h4 header
-				print(f"found h4 header {text}")
-				logger.write(f"found h4 header {text}\n")
-
-				total_header = ""
-				if prev_h2 != "":
-					total_header += prev_h2
-				if prev_h3 != "":
-					total_header += " - " + prev_h3
-				if prev_h4 != "":
-					total_header += " - " + prev_h4
-				if prev_h5 != "":
-					total_header += " - " + prev_h5
-				if prev_h6 != "":
-					total_header += " - " + prev_h6
-				if total_header == "":
-					total_header += header
-				writer.write(total_header + "\t" + description.strip() + "\n")
-				# Reset
-				header = text.replace("====", "").strip()
-				prev_h4 = header
-				prev_h5 = ""
-				prev_h6 = ""
-				description = ""
-			elif text.find("=== ") != -1:
-				# found h3 header
-				print(f"found h3 header {text}")
-				logger.write(f"found h3 header {text}\n")
-
-				total_header = ""
-				if prev_h2 != "":
-					total_header += prev_h2
-				if prev_h3 != "":
-					total_header += " - " + prev_h3
-				if prev_h4 != "":
-					total_header += " - " + prev_h4
-				if prev_h5 != "":
-					total_header += " - " + prev_h5
-				if prev_h6 != "":
-					total_header += " - " + prev_h6
-				if total_header == "":
-					total_header += header
-				writer.write(total_header + "\t" + description.strip() + "\n")
-				# Reset
-				header = text.replace("===", "").strip()
-				prev_h3 = header
-				prev_h4 = ""
-				prev_h5 = ""
-				prev_h6 = ""
-				description = ""
-			# if text.find("[ edit ]") != -1 or text.strip() in header_strs_only:
-			elif text.find("== ") != -1:
-				# h2 header
-				print(f"found h2 header {text}")
-				logger.write(f"found h2 header {text}\n")
-
-				# This is a h2 header
-				# Find all parents if it is a subheader
-				# assert(header_map_list[hdr_index][0] == header)
-				total_header = ""
-				if prev_h2 != "":
-					total_header += prev_h2
-				if prev_h3 != "":
-					total_header += " - " + prev_h3
-				if prev_h4 != "":
-					total_header += " - " + prev_h4
-				if prev_h5 != "":
-					total_header += " - " + prev_h5
-				if prev_h6 != "":
-					total_header += " - " + prev_h6
-				if total_header == "":
-					total_header += header
-
-				# Remove references in "[]"
-				# description = re.sub(r"\[.*?\]", "", description)
-				writer.write(total_header + "\t" + description.strip() + "\n")
-				# if text.find("[ edit ]") != -1:
-				# 	header = text[:text.find("[ edit ]")].strip() # substring up to [edit]
-				# else:
-				# 	header = text.strip()
-				header = text.replace("==", "").strip()
-				prev_h2 = header
-				prev_h3 = ""
-				prev_h4 = ""
-				prev_h5 = ""
-				prev_h6 = ""
-				description = ""
-				# hdr_index += 1 # increment to next expected header
-
-				# TODO: For now, ignore the info in "Notes" and "References" to external urls
-				# Also ignore "See Also" sections?
-				if header.find("References") != -1 or header.find("Notes") != -1:
-					print("Found references or Notes, breaking...")
-					logger.write("Found references or Notes, breaking...\n")
-					break
-			else:
-				description += text + " "
-		
-		# Write out the final header's info if didn't end earlier
-		if description != "":
-			print("Final header and description")
-			# for h in header_map_list[-1][1]:
-			# 	total_header += h + " - "
-			# total_header += header
-			total_header = ""
-			if prev_h2 != "":
-				total_header += prev_h2
-			if prev_h3 != "":
-				total_header += " - " + prev_h3
-			if prev_h4 != "":
-				total_header += " - " + prev_h4
-			if prev_h5 != "":
-				total_header += " - " + prev_h5
-			if prev_h6 != "":
-				total_header += " - " + prev_h6
-			if total_header == "":
-				total_header += header
-
-			# description = re.sub(r"\[.*?\]", "", description)
-			writer.write(total_header + "\t" + description.strip() + "\n")
-
-		# Close the writer
-		writer.close()
-		count += 1
-		# return
-
-		# Find neighbors from list of wikipedia page links on the current page, excluding metadata pages
-		logger.write(f"Upcoming neighbors: {str(page.links)}\n")
-
-		# Add unseen neighbors to queue
-		if bfs_level_cap is None or bfs_level_cap > 0:
-			for n in page.links:
-				if n not in seen_page_titles:
-					unseen_links.append(n)
-			if last_link_in_level is not None and name == last_link_in_level:
-				last_link_in_level = unseen_links[-1]
-				print(f"Next last link in level: {last_link_in_level}")
-				logger.write(f"Next last link in level: {last_link_in_level}\n")
-		elif bfs_level_cap == 0 and name == last_link_in_level:
-			for n in page.links:
-				if n not in seen_page_titles:
-					unseen_links.append(n)
-			print(f"Last link in the last level: {name}. No more neighbors will be added after this")
-			logger.write(f"Last link in the last level: {name}. No more neighbors will be added after this\n")
-			bfs_level_cap -= 1 # This will be -1 now
-		else:
-			print("Hit BFS level cap, not adding additional neighbors")
-			logger.write("Hit BFS level cap, not adding additional neighbors")
-		# update datetime
-		prev_datetime = current_time
+		# Keyword scoring and section splitting run on the parse workers, and the articles done so far are written
+		if last_link_in_level is not None and name == last_link_in_level:
+			level_end_pending = True
+		context = (name, page, bfs_level_cap, len(frontier.seen_urls), depth)
+		for context, parsed in pipeline.submit(context, title, page.content):
+			handle_parsed(context, parsed)
 
 	# main while loop ended
-	if not logger.closed:
-		# Close logger if it's open
-		logger.close()
-	# Final logger
-	end_time = datetime.datetime.now()
-	current_log_dir = os.path.join(log_dir, f"{end_time.year}-{end_time.month}-{end_time.day}")
-	os.makedirs(current_log_dir, exist_ok=True)
-
-	end_log_path = os.path.join(current_log_dir, f"end_{end_time.year}_{end_time.month}_{end_time.day}_{end_time.hour}_log.txt")
-	end_logger = open(end_log_path, "w")
-	end_logger.write("end time: " + str(end_time) + "\n")
+	for context, parsed in pipeline.drain():
+		handle_parsed(context, parsed)
+	pipeline.close()
+	prefetcher.close()
+	# Write out the queued articles before the checkpoint records their pages as done and is closed
+	writer.close()
+	mark_written()
 	print(f"!!!!!!!!!!!!!Finished!!!!!!!!!! Number of main urls searched through: {count}")
-	end_logger.write(f"Finished!!!!!!!!!! Number of main urls searched through: {count}")
 	print(f"Number of failure cases: {failure_counter} / {count}")
-	end_logger.write(f"Number of failure cases: {failure_counter} / {count}\n")
-	end_logger.close()
-
-	# Write seen_urls out to a text file
-	with open(os.path.join(data_path, "seen_urls.txt"), "w") as file:
-		file.write(str(seen_urls))
-	
-	# Write seen_page_titles out to a text file
-	with open(os.path.join(data_path, "seen_page_titles.txt"), "w") as f:
-		f.write(str(seen_page_titles))
+	print(f"Articles kept per page loaded: {count} / {loaded}")
+	logger.info("Finished", searched=count, failures=failure_counter, loaded=loaded, seen_urls=len(frontier.seen_urls))
+	if prefilter is not None:
+		print(f"Prefilter skipped {prefilter.skipped} of {prefilter.checked} neighbor page loads")
+		logger.info("Prefilter", checked=prefilter.checked, skipped=prefilter.skipped)
+	logger.close()
+
+	# Seen urls and page titles have been recorded in the checkpoint all along
+	print(f"Crawl state saved in checkpoint: {checkpoint.path}")
+	checkpoint.close()
+	if args.seen_store == "bloom":
+		for bloom in (url_set, title_set, queued_set):
+			bloom.close()
+	if page_cache is not None:
+		print(f"Page cache hits: {page_cache.hits}, misses: {page_cache.misses}")
+		page_cache.close()
 	print("BFS END")
 
-bfs()
+if __name__ == "__main__":
+	bfs()
 
 #starting_run()
 